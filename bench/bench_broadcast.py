@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Broadcast Coalescing Benchmark
+Plays matches through the scoring engine in bursts - N points applied
+between two flushes, as when sensor hits or quick manual corrections land
+in one scoring batch or one broadcast window - and queues the events the
+uart backend broadcasts (pointscored, sideswitchrequired, matchwon) in a
+BroadcastScheduler. Compares separate emits (one per event plus a
+gamestatedelta) with one combined scoringupdate per flush: emits per
+display, JSON bytes and encode time.
+
+Usage:
+    python3 bench/bench_broadcast.py [--bursts 1 2 4 16] [--points 20000] [--displays 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from broadcast_scheduler import BroadcastScheduler
+from scoring_engine import EVENT_GAME, EVENT_MATCH_WON, EVENT_SIDE_SWITCH, TEAMS, MatchState, apply_point
+from state_delta import StateDeltas
+
+
+def run(points, burst, coalesce, seed):
+    """(emits, bytes, encode seconds) for points played burst at a time"""
+    totals = {"emits": 0, "bytes": 0, "seconds": 0.0}
+
+    def emit(event, data):
+        t0 = time.perf_counter()
+        encoded = json.dumps([event, data])
+        totals["seconds"] += time.perf_counter() - t0
+        totals["emits"] += 1
+        totals["bytes"] += len(encoded)
+
+    rng = random.Random(seed)
+    scheduler = BroadcastScheduler(emit, coalesce=coalesce)
+    deltas = StateDeltas()
+    state = MatchState(gamemode="competition")
+    game_state = dict(state.as_dict(), winner=None, historylength=0, lastupdated=None)
+    deltas.update(game_state)
+
+    for point in range(points):
+        team = rng.randint(0, 1)
+        events = apply_point(state, team)
+        game_state.update(state.as_dict())
+        game_state["historylength"] += 1
+        game_state["lastupdated"] = datetime.now().isoformat()
+        action = "point"
+        for kind, winner, detail in events:
+            if kind == EVENT_GAME:
+                action = "game"
+            elif kind == EVENT_SIDE_SWITCH:
+                scheduler.queue("sideswitchrequired", {
+                    "totalgames": detail, "gamescore": f"{state.game1}-{state.game2}",
+                    "setscore": f"{state.set1}-{state.set2}", "message": "CHANGE SIDES",
+                    "timestamp": game_state["lastupdated"]})
+            elif kind == EVENT_MATCH_WON:
+                scheduler.queue("matchwon", {"winner": {"team": TEAMS[winner]},
+                                             "timestamp": game_state["lastupdated"]})
+        if state.winner is None:
+            scheduler.queue("pointscored", {"team": TEAMS[team], "action": action,
+                                            "timestamp": game_state["lastupdated"]})
+        else:
+            state = MatchState(gamemode="competition")
+        if (point + 1) % burst == 0:
+            scheduler.flush(deltas.update(game_state), deltas.version)
+    scheduler.flush(deltas.update(game_state), deltas.version)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare separate and coalesced scoring broadcasts")
+    parser.add_argument("--bursts", type=int, nargs="+", default=[1, 2, 4, 16])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--displays", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.points} points, {args.displays} displays; per point:")
+    print(f"{'burst':>6s}  {'mode':>9s}  {'emits/display':>13s}  {'bytes to all':>12s}  {'encode':>9s}")
+    for burst in args.bursts:
+        for coalesce in (False, True):
+            totals = run(args.points, burst, coalesce, seed=burst)
+            print(f"{burst:6d}  {'combined' if coalesce else 'separate':>9s}  "
+                  f"{totals['emits'] / args.points:13.2f}  "
+                  f"{totals['bytes'] * args.displays / args.points:12.0f}  "
+                  f"{totals['seconds'] / args.points * 1e6:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+JSON Codec Benchmark
+Plays matches of different lengths through the scoring engine and times
+encoding the payloads the backends send most - the published game state
+(every poll and full-state emit) and a page of match history (/matchhistory)
+- with the stdlib json module as jsonify used it (sorted keys, spaced
+separators, ASCII escapes) and with each codec json_codec.py can pick: stdlib
+compact, orjson and msgpack when installed.
+
+Usage:
+    python3 bench/bench_codec.py [--points 50 200 800] [--repeat 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import json_codec
+from match_history import MatchHistory
+from scoring_engine import TEAMS, MatchState, Rules, apply_point
+from state_delta import StateDeltas
+
+
+def payloads(points, seed=1):
+    """(game state, history page) after points played in one long match"""
+    rules = Rules(sets_to_win=1000)
+    rng = random.Random(seed)
+    state = MatchState(gamemode="competition")
+    history = MatchHistory()
+    for _ in range(points):
+        team = rng.randint(0, 1)
+        before = state.as_dict()
+        apply_point(state, team, rules)
+        history.append("point", TEAMS[team], (before["score1"], before["score2"]),
+                       (state.score1, state.score2), (before["game1"], before["game2"]),
+                       (state.game1, state.game2), (before["set1"], before["set2"]), (state.set1, state.set2))
+    now = datetime.now().isoformat()
+    game_state = dict(state.as_dict(), winner=None, historylength=len(history), matchstarttime=now,
+                      matchendtime=None, lastupdated=now, sethistory=[], matchstorageavailable=False)
+    deltas = StateDeltas()
+    deltas.update(game_state)
+    return deltas.snapshot(), dict(history.page(0), success=True)
+
+
+def codecs():
+    """name -> encode(obj) -> bytes"""
+    found = {
+        "jsonify": lambda obj: json.dumps(obj, sort_keys=True).encode("utf-8"),
+        "stdlib": lambda obj: json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+    }
+    if json_codec.orjson is not None:
+        found["orjson"] = json_codec.orjson.dumps
+    if json_codec.msgpack is not None:
+        found["msgpack"] = json_codec.msgpack.packb
+    return found
+
+
+def timed(encode, payload, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        body = encode(payload)
+    return (time.perf_counter() - t0) / repeat, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON codecs on game state and history payloads")
+    parser.add_argument("--points", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    found = codecs()
+    print(f"json_codec picks: {json_codec.BACKEND}; available: {', '.join(found)}")
+    print(f"{'points':>6s}  {'payload':>9s}  " + "  ".join(f"{name:>17s}" for name in found))
+    for points in args.points:
+        game_state, history = payloads(points)
+        for label, payload in (("gamestate", game_state), ("history", history)):
+            repeat = args.repeat if label == "gamestate" else max(1, args.repeat // 20)
+            cells = []
+            for encode in found.values():
+                seconds, nbytes = timed(encode, payload, repeat)
+                cells.append(f"{seconds * 1e6:8.1f} us {nbytes:6d} B")
+            print(f"{points:6d}  {label:>9s}  " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
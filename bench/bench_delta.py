@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Broadcast Size Benchmark
+Plays a match through the scoring engine, builds the uart backend's
+game_state after every point, and measures what one point costs to
+broadcast to N displays three ways:
+
+  history  gamestateupdate + pointscored, both with the full state and the
+           point-by-point history embedded (as the backend used to send)
+  full     the same two events with the full state, history left out
+  delta    one gamestatedelta with the changed fields + a bare pointscored
+
+Bytes are what all displays receive together; serialization is timed once
+per event, as Socket.IO encodes a broadcast once for every client.
+
+Usage:
+    python3 bench/bench_delta.py [--displays 50] [--points 400]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from match_history import MatchHistory
+from scoring_engine import TEAMS, MatchState, Rules, apply_point
+from state_delta import StateDeltas
+
+
+def encoded(payload):
+    t0 = time.perf_counter()
+    data = json.dumps(payload)
+    return len(data), time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure broadcast bytes and encode time per point")
+    parser.add_argument("--displays", type=int, default=50)
+    parser.add_argument("--points", type=int, default=400, help="points played (one long match)")
+    parser.add_argument("--report", type=int, default=100, help="print a line every N points")
+    args = parser.parse_args()
+
+    rules = Rules(sets_to_win=1000)       # The match must not end before --points
+    rng = random.Random(1)
+    state = MatchState(gamemode="competition")
+    history = MatchHistory()
+    deltas = StateDeltas()
+    game_state = dict(state.as_dict(), winner=None, historylength=0,
+                      matchstarttime=datetime.now().isoformat(), matchendtime=None,
+                      lastupdated=datetime.now().isoformat())
+    deltas.update(game_state)
+    totals = {name: [0, 0.0] for name in ("history", "full", "delta")}
+
+    print(f"{args.displays} displays; bytes sent to all displays and encode time per point")
+    print(f"{'point':>6s}  {'history':>20s}  {'full':>18s}  {'delta':>16s}")
+    for point in range(1, args.points + 1):
+        team = rng.randint(0, 1)
+        before = state.as_dict()
+        apply_point(state, team, rules)
+        game_state.update(state.as_dict())
+        history.append("point", TEAMS[team], (before["score1"], before["score2"]),
+                       (state.score1, state.score2), (before["game1"], before["game2"]),
+                       (state.game1, state.game2), (before["set1"], before["set2"]), (state.set1, state.set2))
+        game_state["historylength"] = len(history)
+        game_state["lastupdated"] = datetime.now().isoformat()
+        scored = {"team": TEAMS[team], "action": "point", "timestamp": game_state["lastupdated"]}
+
+        with_history = dict(game_state, matchhistory=history.to_json())
+        sizes = {
+            "history": [encoded(with_history), encoded(dict(scored, gamestate=with_history))],
+            "full": [encoded(game_state), encoded(dict(scored, gamestate=game_state))],
+            "delta": [encoded(deltas.update(game_state)), encoded(scored)],
+        }
+        line = []
+        for name, events in sizes.items():
+            size = sum(nbytes for nbytes, _ in events) * args.displays
+            seconds = sum(elapsed for _, elapsed in events)
+            totals[name][0] += size
+            totals[name][1] += seconds
+            line.append(f"{size:9d} B {seconds * 1e3:6.3f} ms")
+        if point % args.report == 0:
+            print(f"{point:6d}  " + "  ".join(line))
+
+    print("mean per point:")
+    for name, (size, seconds) in totals.items():
+        print(f"  {name:8s} {size / args.points:10.0f} B  {seconds / args.points * 1e3:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
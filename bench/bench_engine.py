@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Scoring Engine Microbenchmark
+Plays random matches through scoring_engine.py with no backend around it and
+reports points scored per second, for the in-place transition (apply_point)
+and the pure one (add_point, which copies the state every point), with the
+rules of each backend.
+
+Usage:
+    python3 bench/bench_engine.py [--points 2000000] [--bias 0.5] [--repeat 3]
+
+--bias is the chance that BLACK wins a point; a lopsided bias gives short
+matches (more set and match transitions per point), 0.5 gives long ones.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scoring_engine import BLACK, YELLOW, MatchState, Rules, add_point, apply_point
+
+RULES = {
+    "uart backend (advantage, tie-breaks)": Rules(),
+    "padel_backend (golden point, no tie-breaks)": Rules(golden_point=True, tiebreaks=False),
+}
+
+
+def play_in_place(teams, rules):
+    """Score every point in teams; returns matches completed"""
+    state = MatchState(gamemode="competition")
+    matches = 0
+    for team in teams:
+        apply_point(state, team, rules)
+        if state.winner is not None:
+            matches += 1
+            state = MatchState(gamemode="competition")
+    return matches
+
+
+def play_pure(teams, rules):
+    state = MatchState(gamemode="competition")
+    matches = 0
+    for team in teams:
+        state, events = add_point(state, team, rules)
+        if state.winner is not None:
+            matches += 1
+            state = MatchState(gamemode="competition")
+    return matches
+
+
+def measure(play, teams, rules, repeat):
+    """Best of repeat runs: (points per second, matches per run)"""
+    best = float("inf")
+    matches = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        matches = play(teams, rules)
+        best = min(best, time.perf_counter() - t0)
+    return len(teams) / best, matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure scoring engine throughput")
+    parser.add_argument("--points", type=int, default=2_000_000)
+    parser.add_argument("--bias", type=float, default=0.5, help="probability that BLACK wins a point")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    teams = [BLACK if rng.random() < args.bias else YELLOW for _ in range(args.points)]
+
+    print(f"{args.points} points, BLACK wins {args.bias:.0%} of them, best of {args.repeat}")
+    for label, rules in RULES.items():
+        print(f"  {label}")
+        for name, play in (("apply_point", play_in_place), ("add_point", play_pure)):
+            rate, matches = measure(play, teams, rules, args.repeat)
+            print(f"    {name:12s} {rate / 1e6:6.2f} M points/s  "
+                  f"{matches} matches ({args.points / max(matches, 1):.0f} points each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Frame Parser Benchmark
+Compares the old byte-by-byte pipe loop from read_pico_data with the
+chunked FrameParser in pico_frames.py, reading the same recorded pipe data.
+The chunked parser is also timed on the same frames in the binary format.
+
+Usage:
+    python3 bench/bench_frame_parser.py [capture.bin] [--repeat N]
+
+capture.bin is raw pipe traffic, e.g. recorded with:
+    cat /tmp/pico1_serial > capture.bin
+Without a capture file, a synthetic recording of 4x4 frames is generated.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pico_frames import FrameParser, iter_frames, encode_binary_frame
+
+SYNTHETIC_FRAMES = 5000
+
+
+# ============================================================================
+# TEST DATA
+# ============================================================================
+def make_synthetic_capture(frames=SYNTHETIC_FRAMES, seed=1):
+    """Build pipe bytes that look like what the Pico sends"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(frames):
+        lines.append("DATA_START")
+        for _ in range(16):
+            lines.append(f"{rng.randint(20, 2500)},{rng.choice((0, 5, 5, 5, 9))}")
+        lines.append("DATA_END")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def capture_to_binary(data):
+    """Re-encode every frame of a text capture as a binary frame"""
+    out = bytearray()
+    for seq, zones in enumerate(FrameParser().feed(data)):
+        out += encode_binary_frame(seq, seq * 66,
+                                   [z["distance_mm"] for z in zones],
+                                   [z["status"] for z in zones])
+    return bytes(out)
+
+
+# ============================================================================
+# OLD LOOP (copied from read_pico_data before the chunked parser)
+# ============================================================================
+def _legacy_read_line(pipe_fd, limit):
+    line_bytes = b''
+    while True:
+        byte = pipe_fd.read(1)
+        if not byte:
+            raise IOError("Pipe closed")
+        if byte == b'\n':
+            break
+        line_bytes += byte
+        if len(line_bytes) > limit:
+            line_bytes = b''
+            break
+    return line_bytes.decode('utf-8', errors='ignore').strip()
+
+
+def legacy_count_frames(pipe_fd):
+    frames = 0
+    try:
+        while True:
+            line = _legacy_read_line(pipe_fd, 1000)
+            if line == "DATA_START":
+                zones = []
+                for i in range(16):
+                    data_line = _legacy_read_line(pipe_fd, 100)
+                    try:
+                        distance, status = data_line.split(',')
+                        zones.append({"zone": i, "distance_mm": int(distance), "status": int(status)})
+                    except:
+                        continue
+                end_marker = _legacy_read_line(pipe_fd, 100)
+                if end_marker == "DATA_END" and len(zones) == 16:
+                    frames += 1
+    except IOError:
+        pass
+    return frames
+
+
+def chunked_count_frames(pipe_fd):
+    frames = 0
+    for _ in iter_frames(pipe_fd, FrameParser()):
+        frames += 1
+    return frames
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+def run(name, func, path, size, repeat):
+    best = None
+    frames = 0
+    for _ in range(repeat):
+        # Unbuffered like the backend, so every read() is a real syscall
+        with open(path, 'rb', buffering=0) as pipe_fd:
+            start = time.perf_counter()
+            frames = func(pipe_fd)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"  {name:<10} {frames:>8} frames  {best * 1000:9.1f} ms  "
+          f"{size / best / 1e6:8.2f} MB/s  {frames / best:11.0f} frames/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Pico pipe frame parsing")
+    parser.add_argument("capture", nargs="?", help="raw pipe capture (default: synthetic)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, "rb") as f:
+            text_data = f.read()
+        label = args.capture
+    else:
+        text_data = make_synthetic_capture()
+        label = "synthetic"
+    binary_data = capture_to_binary(text_data)
+
+    tmp_paths = []
+    try:
+        for data in (text_data, binary_data):
+            fd, path = tempfile.mkstemp(suffix=".bin")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            tmp_paths.append(path)
+        text_path, binary_path = tmp_paths
+
+        print(f"Input: {label} ({len(text_data)} bytes text, {len(binary_data)} bytes binary)")
+        legacy = run("legacy", legacy_count_frames, text_path, len(text_data), args.repeat)
+        chunked = run("chunked", chunked_count_frames, text_path, len(text_data), args.repeat)
+        binary = run("binary", chunked_count_frames, binary_path, len(binary_data), args.repeat)
+        print(f"  speedup    {legacy / chunked:.1f}x chunked text, {legacy / binary:.1f}x binary")
+    finally:
+        for path in tmp_paths:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Match History Size Benchmark
+Fills a history with N entries both ways - the nested dict per entry the
+backends used to keep in game_state, and match_history.py's columns - and
+reports memory per entry, the size and encode time of a gamestateupdate
+payload, and the cost of building one page of JSON on request.
+
+Usage:
+    python3 bench/bench_history.py [--lengths 100 1000 10000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from match_history import MatchHistory
+from scoring_engine import MatchState
+
+ARGS = ("point", "black", (15, 0), (30, 0), (2, 1), (2, 1), (1, 0), (1, 0))
+
+
+def dict_entry(action, team, scorebefore, scoreafter, gamebefore, gameafter, setbefore, setafter):
+    """add_to_history's entry before the columns"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "action": action,
+        "team": team,
+        "scores": {
+            "before": {"score1": scorebefore[0], "score2": scorebefore[1]},
+            "after": {"score1": scoreafter[0], "score2": scoreafter[1]}
+        },
+        "games": {
+            "before": {"game1": gamebefore[0], "game2": gamebefore[1]},
+            "after": {"game1": gameafter[0], "game2": gameafter[1]}
+        },
+        "sets": {
+            "before": {"set1": setbefore[0], "set2": setbefore[1]},
+            "after": {"set1": setafter[0], "set2": setafter[1]}
+        }
+    }
+
+
+def measure_memory(fill, length):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = fill(length)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return kept, used / length
+
+
+def fill_dicts(length):
+    return [dict_entry(*ARGS) for _ in range(length)]
+
+
+def fill_columns(length):
+    history = MatchHistory()
+    for _ in range(length):
+        history.append(*ARGS)
+    return history
+
+
+def encode(payload, repeat=20):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        data = json.dumps(payload)
+    return len(data), (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict and columnar match history")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    base = dict(MatchState().as_dict(), winner=None, matchstarttime=datetime.now().isoformat(),
+                matchendtime=None, lastupdated=datetime.now().isoformat())
+    print(f"{'entries':>8s}  {'dict B/entry':>12s}  {'column B/entry':>14s}  "
+          f"{'old payload':>18s}  {'new payload':>16s}  {'page of 100':>11s}")
+    for length in args.lengths:
+        entries, dict_bytes = measure_memory(fill_dicts, length)
+        history, column_bytes = measure_memory(fill_columns, length)
+        old_size, old_ms = encode(dict(base, matchhistory=entries))
+        new_size, new_ms = encode(dict(base, historylength=len(history)))
+        t0 = time.perf_counter()
+        json.dumps(history.page(max(0, length - 100), limit=100))
+        page_ms = (time.perf_counter() - t0) * 1000
+        print(f"{length:8d}  {dict_bytes:12.0f}  {column_bytes:14.0f}  "
+              f"{old_size:8d} B {old_ms:6.2f} ms  {new_size:6d} B {new_ms:5.3f} ms  {page_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
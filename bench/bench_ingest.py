@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Ingest Benchmark
+Measures CPU use and frame latency of the single-threaded IngestLoop
+(pico_ingest.py) against one blocking reader thread per source, for 2, 8
+and 32 simulated Picos writing into FIFOs.
+
+A separate producer process writes binary frames to every FIFO at a fixed
+rate. The send time (CLOCK_MONOTONIC, microseconds) is stored in the first
+two distance values so the consumer can compute per-frame latency.
+
+Usage:
+    python3 bench/bench_ingest.py [--sources 2 8 32] [--rate 60] [--duration 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pico_frames import FrameParser, encode_binary_frame, READ_CHUNK_SIZE
+from pico_ingest import IngestLoop
+
+
+# ============================================================================
+# PRODUCER (separate process)
+# ============================================================================
+def now_us():
+    return int(time.monotonic() * 1_000_000) & 0xFFFFFFFF
+
+
+def produce(paths, rate, duration):
+    fds = [os.open(path, os.O_WRONLY) for path in paths]
+    statuses = [5] * 16
+    interval = 1.0 / rate
+    next_send = time.monotonic()
+    end = next_send + duration
+    seq = 0
+
+    while next_send < end:
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        for fd in fds:
+            sent = now_us()
+            distances = [sent & 0xFFFF, sent >> 16] + [1500] * 14
+            os.write(fd, encode_binary_frame(seq, 0, distances, statuses))
+        seq += 1
+        next_send += interval
+
+    for fd in fds:
+        os.close(fd)
+
+
+# ============================================================================
+# CONSUMERS
+# ============================================================================
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+
+    def record(self, frames):
+        received = now_us()
+        with self.lock:
+            for zones in frames:
+                sent = zones[0]["distance_mm"] | (zones[1]["distance_mm"] << 16)
+                self.latencies.append(((received - sent) & 0xFFFFFFFF) / 1000.0)
+
+
+def consume_epoll(paths, stats, done):
+    loop = IngestLoop(lambda name, frames, errors, parser: stats.record(frames))
+    for i, path in enumerate(paths):
+        loop.add_source(f"PICO_{i}", path)
+
+    thread = threading.Thread(target=loop.run, daemon=True)
+    thread.start()
+    done.wait()
+    loop.stop()
+    thread.join()
+
+
+def consume_threads(paths, stats, done):
+    def reader(path):
+        parser = FrameParser()
+        buffer = bytearray(READ_CHUNK_SIZE)
+        view = memoryview(buffer)
+        with open(path, 'rb', buffering=0) as pipe:
+            while True:
+                count = pipe.readinto(buffer)
+                if not count:
+                    return
+                frames = parser.feed(view[:count])
+                if frames:
+                    stats.record(frames)
+
+    threads = [threading.Thread(target=reader, args=(path,), daemon=True) for path in paths]
+    for thread in threads:
+        thread.start()
+    done.wait()
+    for thread in threads:
+        thread.join(timeout=1)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(mode, consumer, sources, rate, duration):
+    tmp_dir = tempfile.mkdtemp(prefix="pico_ingest_")
+    try:
+        paths = [os.path.join(tmp_dir, f"pico{i}") for i in range(sources)]
+        for path in paths:
+            os.mkfifo(path)
+
+        stats = Stats()
+        done = threading.Event()
+        consumer_thread = threading.Thread(target=consumer, args=(paths, stats, done))
+
+        cpu_start = time.process_time()
+        wall_start = time.monotonic()
+        consumer_thread.start()
+
+        producer = multiprocessing.Process(target=produce, args=(paths, rate, duration))
+        producer.start()
+        producer.join()
+        time.sleep(0.2)             # Let the consumer drain the pipes
+        done.set()
+        consumer_thread.join()
+
+        wall = time.monotonic() - wall_start
+        cpu = time.process_time() - cpu_start
+        expected = sources * int(rate * duration)
+        lat = stats.latencies
+        print(f"  {mode:<8} {sources:>3} src  {len(lat):>6}/{expected:<6} frames  "
+              f"CPU {100 * cpu / wall:5.1f}%  "
+              f"latency p50 {percentile(lat, 0.50):6.2f} ms  p99 {percentile(lat, 0.99):6.2f} ms  "
+              f"max {max(lat) if lat else float('nan'):6.2f} ms")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Pico ingest: epoll loop vs thread per source")
+    parser.add_argument("--sources", type=int, nargs="+", default=[2, 8, 32])
+    parser.add_argument("--rate", type=float, default=60.0, help="frames/s per source")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    args = parser.parse_args()
+
+    print(f"{args.rate:.0f} frames/s per source, {args.duration:.0f}s per run")
+    for sources in args.sources:
+        run("epoll", consume_epoll, sources, args.rate, args.duration)
+        run("threads", consume_threads, sources, args.rate, args.duration)
+
+
+if __name__ == "__main__":
+    main()
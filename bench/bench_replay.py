@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Backend Replay Benchmark
+Feeds a capture recorded with pico_capture.py straight into the backend's
+ingest callback (frame parsing, ball detection, scoring and Socket.IO
+broadcasts) in-process, without pipes or a court, and reports throughput
+and per-read latency.
+
+Usage:
+    python3 bench/bench_replay.py match.pcap [--speed 0] [--gamemode basic]
+
+--speed 0 (default) pushes the capture through as fast as possible to find
+the backend's ceiling; --speed 1 keeps the recorded timing. Detection is
+debounced on wall-clock time, so faster replays score fewer points.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")      # No sound card needed
+
+from pico_capture import CaptureReader
+from pico_frames import FrameParser
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a Pico capture through the backend in-process")
+    parser.add_argument("capture")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = real time, 0 = as fast as possible")
+    parser.add_argument("--gamemode", default="basic", help="game mode so detections score points")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import padel_backend_software_uart_FINAL as backend
+
+    backend.game_state["gamemode"] = args.gamemode
+    broadcasts = 0
+    emit = backend.socketio.emit
+
+    def counting_emit(*emit_args, **kwargs):
+        nonlocal broadcasts
+        broadcasts += 1
+        return emit(*emit_args, **kwargs)
+
+    backend.socketio.emit = counting_emit
+
+    reader = CaptureReader(args.capture)
+    parsers = {name: FrameParser(compact=True) for name, _ in reader.sources}
+    latencies = []
+    frames = 0
+    log = io.StringIO()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        for time_us, name, data in reader.records():
+            if args.speed > 0:
+                delay = start + time_us / 1e6 / args.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            t0 = time.perf_counter()
+            parser = parsers[name]
+            batch = parser.feed(data)
+            errors = parser.pop_errors()
+            if batch or errors or parser.events:
+                backend.handle_pico_frames(name, batch, errors, parser)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            frames += len(batch)
+    elapsed = time.perf_counter() - start
+    reader.close()
+
+    detections = sum(detector.detection_count for detector in backend.pico_detectors.values())
+    print(f"{args.capture}: {len(latencies)} reads, {frames} frames in {elapsed:.2f}s "
+          f"({frames / elapsed:.0f} frames/s)")
+    print(f"  per read: p50 {percentile(latencies, 0.5):.3f} ms  p99 {percentile(latencies, 0.99):.3f} ms  "
+          f"max {max(latencies, default=float('nan')):.3f} ms")
+    state = backend.game_state
+    print(f"  {detections} detections, {broadcasts} broadcasts, "
+          f"games {state['game1']}-{state['game2']}, points {state['score1']}-{state['score2']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Sensor Resolution Benchmark
+Runs the backend's per-frame work - parsing, storing the frame in the NumPy
+history and baseline detection - on synthetic 4x4 (16 zone) and 8x8 (64
+zone) streams, and reports how much more an 8x8 frame costs than a 4x4 one.
+
+Usage:
+    python3 bench/bench_resolution.py [--frames N] [--repeat N] [--batch N]
+
+--batch is the number of frames per pipe read (1 = one frame per read, as at
+15 frames/s; larger when the backend catches up after a stall).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pico_frames import FrameParser, encode_binary_frame, resolution_label
+from pico_history import FrameHistory, ZoneBaseline
+from pico_simulator import centre_zones
+
+SYNTHETIC_FRAMES = 5000
+RESOLUTIONS = (16, 64)
+FRAME_INTERVAL = 1 / 15     # Sensor ranging rate
+
+
+# ============================================================================
+# TEST DATA
+# ============================================================================
+def make_frames(zones, frames=SYNTHETIC_FRAMES, seed=1):
+    """(distances, statuses) per frame: noisy empty court plus a ball every 100 frames"""
+    rng = random.Random(seed)
+    baseline = [rng.randint(1500, 2500) for _ in range(zones)]
+    ball = centre_zones(zones)
+    out = []
+    for i in range(frames):
+        distances = [max(0, int(base + rng.gauss(0, 20))) for base in baseline]
+        if i % 100 >= 97:
+            for zone in ball:
+                distances[zone] = 400
+        out.append((distances, [rng.choice((5, 5, 5, 9))] * zones))
+    return out
+
+
+def encode_text(frames):
+    lines = []
+    for distances, statuses in frames:
+        lines.append(b"DATA_START")
+        lines.extend(b"%d,%d" % pair for pair in zip(distances, statuses))
+        lines.append(b"DATA_END")
+    return b"\n".join(lines) + b"\n"
+
+
+def encode_binary(frames):
+    return b"".join(encode_binary_frame(seq, seq * 66, distances, statuses)
+                    for seq, (distances, statuses) in enumerate(frames))
+
+
+def split_reads(data, frames, batch):
+    """Cut the stream into reads of batch frames each"""
+    size = len(data) // frames
+    return [data[start:start + size * batch] for start in range(0, len(data), size * batch)]
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+def run_pipeline(reads, zones, frames):
+    """Parse, store and detect like handle_pico_frames; return (seconds per stage, hits)"""
+    parser = FrameParser(compact=True)
+    history = FrameHistory(zones=zones)
+    baseline = ZoneBaseline(zones, calibration_seconds=1.0)
+    timestamp = 0.0
+    parse = store = detect = 0.0
+    hits = 0
+
+    for data in reads:
+        t0 = time.perf_counter()
+        batch = parser.feed(data)
+        t1 = time.perf_counter()
+        for distances, statuses in batch:
+            history.append(distances, statuses, timestamp)
+            timestamp += FRAME_INTERVAL
+        t2 = time.perf_counter()
+        if baseline.calibrate(history):
+            hits += len(history.hits(len(batch), 1000, 1, baseline))
+        t3 = time.perf_counter()
+        parse += t1 - t0
+        store += t2 - t1
+        detect += t3 - t2
+
+    if parser.frame_count != frames:
+        raise RuntimeError(f"Parsed {parser.frame_count} of {frames} frames")
+    return (parse, store, detect), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare 4x4 and 8x8 frame processing cost")
+    parser.add_argument("--frames", type=int, default=SYNTHETIC_FRAMES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=1, help="frames per pipe read")
+    args = parser.parse_args()
+
+    print(f"{args.frames} frames, {args.batch} per read, best of {args.repeat}")
+    print(f"  {'':<12} {'parse':>9} {'store':>9} {'detect':>9} {'total':>9}  {'frames/s':>10}  hits")
+    results = {}
+    for fmt, encode in (("text", encode_text), ("binary", encode_binary)):
+        for zones in RESOLUTIONS:
+            frames = make_frames(zones, args.frames)
+            reads = split_reads(encode(frames), args.frames, args.batch)
+            best = None
+            for _ in range(args.repeat):
+                stages, hits = run_pipeline(reads, zones, args.frames)
+                if best is None or sum(stages) < sum(best):
+                    best = stages
+            results[fmt, zones] = sum(best)
+            per_frame = [stage / args.frames * 1e6 for stage in best]
+            print(f"  {fmt + ' ' + resolution_label(zones):<12} "
+                  + " ".join(f"{us:7.1f}us" for us in per_frame)
+                  + f" {sum(per_frame):7.1f}us  {args.frames / sum(best):10.0f}  {hits}")
+
+    for fmt in ("text", "binary"):
+        print(f"  8x8 / 4x4 cost ({fmt}): {results[fmt, 64] / results[fmt, 16]:.2f}x for 4x the zones")
+
+
+if __name__ == "__main__":
+    main()
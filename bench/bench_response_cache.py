@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Polled Response Benchmark
+Builds the uart backend's published game state part-way through a match and
+times what one /gamestate poll costs to answer when nothing changed since
+the last one:
+
+  encode   copy the state and json.dumps it (as the route used to, every poll)
+  cached   ResponseCache hit: the stored body
+  gzip     ResponseCache hit for a client sending Accept-Encoding: gzip
+  304      ResponseCache hit for a client sending its ETag back
+
+plus the body bytes each answer puts on the wire. A scoring update every
+--update-every polls invalidates the cache, as publish_gamestate does.
+
+Usage:
+    python3 bench/bench_response_cache.py [--polls 100000] [--update-every 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from response_cache import ResponseCache
+from scoring_engine import MatchState, apply_point
+from state_delta import StateDeltas
+
+
+def published_state(points, seed=1):
+    """Published game state (as the uart backend keeps it) after some points"""
+    rng = random.Random(seed)
+    state = MatchState(gamemode="competition")
+    for _ in range(points):
+        apply_point(state, rng.randint(0, 1))
+    now = datetime.now().isoformat()
+    game_state = dict(state.as_dict(), winner=None, historylength=points, matchstarttime=now,
+                      matchendtime=None, lastupdated=now, sethistory=["6-4", "3-6"],
+                      shouldswitchsides=False, totalgamesinset=state.game1 + state.game2)
+    deltas = StateDeltas()
+    deltas.update(game_state)
+    return deltas.snapshot()
+
+
+def run(mode, published, polls, update_every):
+    """(seconds, body bytes) for polls answered in mode"""
+    cache = ResponseCache(json.dumps)
+
+    def build():
+        data = dict(published)
+        data["matchstorageavailable"] = False
+        return data, 200
+
+    accept = "gzip, deflate" if mode == "gzip" else ""
+    etag = ""
+    nbytes = 0
+    t0 = time.perf_counter()
+    for poll in range(polls):
+        if poll % update_every == 0:
+            cache.invalidate()
+        if mode == "encode":
+            body, _ = build()
+            body = json.dumps(body).encode("utf-8")
+        else:
+            _, body, headers = cache.lookup("gamestate", build, etag, accept)
+            if mode == "304":
+                etag = headers["ETag"]
+        nbytes += len(body)
+    return time.perf_counter() - t0, nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare encoding /gamestate per poll with cached bodies")
+    parser.add_argument("--polls", type=int, default=100000)
+    parser.add_argument("--update-every", type=int, default=50, help="polls between scoring updates")
+    parser.add_argument("--points", type=int, default=60, help="points played before polling")
+    args = parser.parse_args()
+
+    published = published_state(args.points)
+    print(f"{args.polls} polls, a scoring update every {args.update_every}; per poll:")
+    print(f"{'mode':>7s}  {'time':>9s}  {'body bytes':>10s}")
+    for mode in ("encode", "cached", "gzip", "304"):
+        seconds, nbytes = run(mode, published, args.polls, args.update_every)
+        print(f"{mode:>7s}  {seconds / args.polls * 1e6:6.2f} us  {nbytes / args.polls:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
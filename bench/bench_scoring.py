@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Scoring Queue Stress Test
+Hammers the backend's scoring actor from many threads at once - HTTP
+/addpoint and /subtractpoint through Flask's test client, plus sensor
+detections the way the Pico reader threads submit them - for a number of
+complete matches, and checks that:
+
+- every command got its result,
+- the published game state is never torn (scores always match points) and
+  its version never goes backwards,
+- the final state of each match equals replaying the commands the actor
+  applied, in the order it applied them, on a single thread.
+
+Usage:
+    python3 bench/bench_scoring.py [--threads 16] [--matches 20] [--unsafe]
+
+--unsafe calls the scoring functions directly from the threads, as the
+backend did before the queue, and reports the torn states it sees (no
+replay check: there is no order to replay).
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")      # No sound card needed
+
+NORMAL_SCORES = (0, 15, 30, 40)
+TIMESTAMP_KEYS = ("matchstarttime", "matchendtime", "lastupdated", "version")
+WATCH_INTERVAL = 0.0002     # Between reads of the published state (a busy loop would hog the GIL)
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def torn(state):
+    """True if the scores shown do not follow from the points (a half-applied command)"""
+    for point, score in ((state["point1"], state["score1"]), (state["point2"], state["score2"])):
+        expected = NORMAL_SCORES[min(point, 3)] if state["mode"] == "normal" else point
+        if score != expected:
+            return True
+    return False
+
+
+def comparable(state):
+    """State without wall-clock fields, for comparing a run with its replay"""
+    state = {key: value for key, value in state.items() if key not in TIMESTAMP_KEYS}
+    state["matchhistory"] = [{key: value for key, value in entry.items() if key != "timestamp"}
+                             for entry in state["matchhistory"]]
+    if state["winner"]:
+        state["winner"] = {key: value for key, value in state["winner"].items() if key != "matchduration"}
+    return state
+
+
+def play_match(backend, args, rng, applied):
+    """One match from many threads: (latencies in ms, commands sent, torn reads, version regressions)"""
+    scoring = backend.scoring
+    if args.unsafe:
+        backend.reset_match()
+        backend.set_game_mode("competition")
+    else:
+        scoring.call("resetmatch")
+        scoring.call("setgamemode", "competition")
+        applied.clear()
+
+    def state():
+        return dict(backend.game_state) if args.unsafe else backend.published_gamestate
+
+    stop = threading.Event()
+    latencies = [[] for _ in range(args.threads)]
+    sent = [0] * args.threads
+    observed = {"torn": 0, "regressions": 0}
+
+    def player(index):
+        client = backend.app.test_client()
+        local = random.Random(rng.random())
+        while not stop.is_set() and not state()["matchwon"]:
+            team = local.choice(("black", "yellow"))
+            roll = local.random()
+            t0 = time.perf_counter()
+            if roll < args.sensor_share:
+                pico = "PICO_1" if team == backend.sensor_mapping["pico_1_team"] else "PICO_2"
+                if args.unsafe:
+                    backend.apply_ball_detection(pico, 400)
+                else:
+                    backend.score_ball_detection(pico, 400)
+            elif args.unsafe:
+                (backend.process_subtract_point if roll > 0.9 else backend.process_add_point)(team)
+            else:
+                client.post("/subtractpoint" if roll > 0.9 else "/addpoint", json={"team": team})
+            latencies[index].append((time.perf_counter() - t0) * 1000)
+            sent[index] += 1
+
+    def watcher():
+        last_version = 0
+        while not stop.is_set():
+            current = state()
+            if torn(current):
+                observed["torn"] += 1
+            version = current.get("version", 0)
+            if version < last_version:
+                observed["regressions"] += 1
+            last_version = version
+            time.sleep(WATCH_INTERVAL)
+
+    threads = [threading.Thread(target=player, args=(i,)) for i in range(args.threads)]
+    watch = threading.Thread(target=watcher)
+    watch.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if not args.unsafe:
+        scoring.call("barrier")         # Every detection queued before it has been applied
+    stop.set()
+    watch.join()
+    return [ms for per_thread in latencies for ms in per_thread], sum(sent), observed["torn"], observed["regressions"]
+
+
+def replay(backend, commands):
+    """Apply the logged commands again, one after the other; return the final state"""
+    handlers = backend.scoring.handlers
+    handlers["resetmatch"]()
+    handlers["setgamemode"]("competition")
+    for name, command_args in commands:
+        handlers[name](*command_args)
+    return with_history(backend, backend.snapshot_gamestate())
+
+
+def with_history(backend, state):
+    """State plus its full match history (actor thread only)"""
+    return dict(state, matchhistory=backend.match_history.to_json())
+
+
+BENCH_COMMANDS = ("resetmatch", "setgamemode", "barrier", "replay", "final")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the scoring command queue from many threads")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--matches", type=int, default=20)
+    parser.add_argument("--sensor-share", type=float, default=0.3, help="fraction of points from sensors")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--switch-interval", type=float, default=1e-5,
+                        help="sys.setswitchinterval while hammering (smaller = more interleaving)")
+    parser.add_argument("--unsafe", action="store_true", help="bypass the queue, as before")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import padel_backend_software_uart_FINAL as backend
+
+    scoring = backend.scoring
+    applied = []
+    publish = scoring.on_batch
+    batch_sizes = []
+
+    def logged_publish(version, changed, commands):
+        applied.extend((command.name, command.args) for command in commands
+                       if command.name not in BENCH_COMMANDS)
+        batch_sizes.append(len(commands))
+        publish(version, changed, commands)
+
+    scoring.on_batch = logged_publish
+    scoring.command("barrier")(lambda: None)
+    # Runs on the actor thread, so nothing else touches the state meanwhile
+    scoring.command("replay")(lambda commands: replay(backend, commands))
+    scoring.command("final")(lambda: with_history(backend, backend.published_gamestate))
+    if not args.unsafe:
+        threading.Thread(target=scoring.run, daemon=True).start()
+
+    rng = random.Random(args.seed)
+    sys.setswitchinterval(args.switch_interval)
+    print(f"{args.threads} threads, {args.matches} matches, "
+          f"{'direct calls (no queue)' if args.unsafe else 'scoring queue'}")
+
+    latencies = []
+    sent = torn_reads = regressions = mismatches = 0
+    start = time.perf_counter()
+    for _ in range(args.matches):
+        with contextlib.redirect_stdout(io.StringIO()):
+            match_latencies, match_sent, match_torn, match_regressions = play_match(backend, args, rng, applied)
+            if not args.unsafe:
+                final = scoring.call("final")
+                if comparable(scoring.call("replay", list(applied))) != comparable(final):
+                    mismatches += 1
+        latencies += match_latencies
+        sent += match_sent
+        torn_reads += match_torn
+        regressions += match_regressions
+    elapsed = time.perf_counter() - start
+    sys.setswitchinterval(0.005)
+
+    print(f"  {sent} commands in {elapsed:.1f}s ({sent / elapsed:.0f}/s), "
+          f"latency p50 {percentile(latencies, 0.5):.2f} ms  p99 {percentile(latencies, 0.99):.2f} ms")
+    if batch_sizes and not args.unsafe:
+        print(f"  {len(batch_sizes)} batches, {sum(batch_sizes) / len(batch_sizes):.1f} commands/batch avg, "
+              f"max {max(batch_sizes)}")
+    print(f"  torn states seen: {torn_reads}, version regressions: {regressions}")
+    if not args.unsafe:
+        print(f"  replay mismatches: {mismatches} of {args.matches} matches")
+    failed = torn_reads or regressions or mismatches
+    print("FAIL" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Pico State Contention Benchmark
+Feeds frames into the backend's ingest callback at a fixed rate while a
+number of threads poll /picodata (through Flask's test client, in-process),
+and reports how long each ingest call takes - i.e. how much the pollers
+delay frame ingestion - and how many requests the pollers got through.
+
+Usage:
+    python3 bench/bench_snapshot.py [--pollers 0 4 16 64] [--poll-rate 20] [--frames 10] [--locked]
+
+Each poller requests --poll-rate times per second, like a dashboard does;
+--poll-rate 0 polls back to back, which mostly measures how the pollers
+compete with ingestion for the interpreter rather than for the lock.
+
+--locked runs the /picodata view while holding data_lock, as it did before
+it read published snapshots, for comparison.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")      # No sound card needed
+
+from pico_frames import FrameParser
+from pico_simulator import SimulatedPico
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(backend, pollers, args):
+    """One measurement: (ingest latencies in ms, frames fed, requests served)"""
+    rng = random.Random(1)
+    picos = {name: SimulatedPico(name, None, args.zones, rng=random.Random(rng.random()))
+             for name in backend.PICO_CONFIGS}
+    parsers = {name: FrameParser(compact=True) for name in picos}
+    stop = threading.Event()
+    requests = [0] * pollers
+    url = f"/picodata?frames={args.frames}"
+
+    def poll(index):
+        client = backend.app.test_client()
+        poll_interval = 1.0 / args.poll_rate if args.poll_rate else 0.0
+        next_poll = time.perf_counter() + rng.random() * poll_interval
+        while not stop.is_set():
+            client.get(url).get_data()
+            requests[index] += 1
+            if poll_interval:
+                next_poll += poll_interval
+                stop.wait(max(0.0, next_poll - time.perf_counter()))
+
+    threads = [threading.Thread(target=poll, args=(i,), daemon=True) for i in range(pollers)]
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+    fed = 0
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+    next_read = start
+    while time.perf_counter() - start < args.duration:
+        for name, pico in picos.items():
+            parser = parsers[name]
+            batch = parser.feed(pico.frame())
+            t0 = time.perf_counter()
+            backend.handle_pico_frames(name, batch, parser.pop_errors(), parser)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            fed += len(batch)
+        next_read += interval
+        delay = next_read - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, fed, sum(requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ingest delay caused by /picodata pollers")
+    parser.add_argument("--pollers", type=int, nargs="+", default=[0, 4, 16, 64])
+    parser.add_argument("--poll-rate", type=float, default=20.0, help="requests/s per poller, 0 = back to back")
+    parser.add_argument("--frames", type=int, default=10, help="history frames per request (?frames=N)")
+    parser.add_argument("--rate", type=float, default=200.0, help="pipe reads per second per Pico")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per measurement")
+    parser.add_argument("--zones", type=int, choices=(16, 64), default=16)
+    parser.add_argument("--locked", action="store_true", help="hold data_lock while building responses")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import padel_backend_software_uart_FINAL as backend
+
+    if args.locked:
+        view = backend.app.view_functions["getpicodata"]
+
+        def locked_view(*view_args, **kwargs):
+            with backend.data_lock:
+                return view(*view_args, **kwargs)
+
+        backend.app.view_functions["getpicodata"] = locked_view
+
+    print(f"{'locked' if args.locked else 'snapshot'} reads, {args.rate:.0f} reads/s per Pico, "
+          f"{args.poll_rate or 'max'} req/s per poller, "
+          f"?frames={args.frames}, {args.zones} zones")
+    for pollers in args.pollers:
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, fed, requests = run(backend, pollers, args)
+        print(f"  {pollers:3d} pollers  ingest p50 {percentile(latencies, 0.5):6.3f} ms  "
+              f"p99 {percentile(latencies, 0.99):6.3f} ms  max {max(latencies):7.3f} ms  "
+              f"{fed / args.duration:7.0f} frames/s  {requests / args.duration:7.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
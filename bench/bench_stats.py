@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Match Statistics Latency Benchmark
+Times one statistics request at growing match lengths: the history rescans
+calculate_match_statistics used to do (four list comprehensions over
+matchhistory plus parsing sethistory strings) against reading the running
+counters of match_stats.py.
+
+Usage:
+    python3 bench/bench_stats.py [--lengths 100 1000 10000 100000] [--repeat 200]
+
+Points are played through the scoring engine; long lengths are many matches'
+worth of points on one history, which is what a rescan has to walk, while
+the counters keep only the current match's sets.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from match_stats import MatchStats
+from scoring_engine import TEAMS, MatchState, apply_point, apply_subtract
+
+
+def play(length, rng):
+    """(history entries as the backend stores them, sethistory, stats)"""
+    history = []
+    sethistory = []
+    state = MatchState(gamemode="competition")
+    stats = MatchStats()
+    for _ in range(length):
+        team = 0 if rng.random() < 0.5 else 1
+        if rng.random() < 0.03:
+            stats.record_subtract(team, apply_subtract(state, team))
+            history.append({"action": "point_subtract", "team": TEAMS[team]})
+            continue
+        mode = state.mode
+        events = apply_point(state, team)
+        stats.record_point(team, mode, events)
+        action = "point"
+        for kind, winner, detail in events:
+            if kind == "game":
+                action = "game"
+            elif kind == "set":
+                sethistory.append(detail.label)
+                history.append({"action": "set", "team": TEAMS[winner]})
+        history.append({"action": action, "team": TEAMS[team]})
+        if state.winner is not None:
+            state = MatchState(gamemode="competition")
+            stats.set_games.clear()
+    return history, sethistory, stats
+
+
+def rescan(history, sethistory):
+    """calculate_match_statistics before running counters"""
+    black_points = len([h for h in history if h["action"] == "point" and h["team"] == "black"])
+    yellow_points = len([h for h in history if h["action"] == "point" and h["team"] == "yellow"])
+    black_games = len([h for h in history if h["action"] == "game" and h["team"] == "black"])
+    yellow_games = len([h for h in history if h["action"] == "game" and h["team"] == "yellow"])
+    sets_breakdown = []
+    for i, set_score in enumerate(sethistory, 1):
+        games = set_score.split("-")
+        black_g = int(games[0].split("(")[0])
+        yellow_g = int(games[1].split("(")[0])
+        sets_breakdown.append({"setnumber": i, "blackgames": black_g, "yellowgames": yellow_g,
+                               "setwinner": "black" if black_g > yellow_g else "yellow"})
+    return {"totalpoints": {"black": black_points, "yellow": yellow_points},
+            "totalgames": {"black": black_games, "yellow": yellow_games},
+            "setsbreakdown": sets_breakdown}
+
+
+def counters(stats):
+    """calculate_match_statistics now"""
+    result = stats.as_dict()
+    result["setsbreakdown"] = stats.sets_breakdown()
+    return result
+
+
+def timed(function, repeat, *args):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        function(*args)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare history rescans with running match counters")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200, help="requests timed per length")
+    args = parser.parse_args()
+
+    print(f"{'points':>8s}  {'rescan':>11s}  {'counters':>11s}")
+    for length in args.lengths:
+        history, sethistory, stats = play(length, random.Random(length))
+        repeat = max(1, args.repeat * 1000 // max(length, 1000))
+        print(f"{length:8d}  {timed(rescan, repeat, history, sethistory):8.1f} us  "
+              f"{timed(counters, args.repeat, stats):8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
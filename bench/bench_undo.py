@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Undo Latency Benchmark
+Builds command logs of growing length with match_log.py and times undoing
+one command, several, and back to the start, against rebuilding the score
+by replaying the whole log (what undo would cost without snapshots).
+
+Usage:
+    python3 bench/bench_undo.py [--lengths 100 1000 10000] [--snapshot-every 16]
+
+Logs longer than one match are played with tie-breaks off and even teams,
+so the match does not end before the log is full.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from match_log import MatchLog
+from match_stats import ADD_POINT, MatchStats, replay
+from scoring_engine import MatchState, Rules, apply_point
+
+RULES = Rules(tiebreaks=False, sets_to_win=1000)
+
+
+def build(length, snapshot_every, rng):
+    log = MatchLog(RULES, "competition", snapshot_every)
+    state = MatchState(gamemode="competition")
+    stats = MatchStats()
+    for _ in range(length):
+        team = rng.randint(0, 1)
+        mode = state.mode
+        stats.record_point(team, mode, apply_point(state, team, RULES))
+        log.record(ADD_POINT, team, 0, state, stats)
+    return log
+
+
+def time_undo(log, steps, repeat):
+    """Microseconds per undo of steps commands (redone in between, untimed)"""
+    total = 0.0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        log.undo("competition", steps)
+        total += time.perf_counter() - t0
+        log.position += steps       # Back to the end without re-applying
+    return total / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure undo latency against full replay")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--snapshot-every", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"snapshot every {args.snapshot_every} commands")
+    print(f"{'commands':>9s}  {'undo 1':>10s}  {'undo 10':>10s}  {'undo all':>10s}  {'full replay':>12s}")
+    for length in args.lengths:
+        log = build(length, args.snapshot_every, random.Random(length))
+        commands = [(entry.command, entry.team) for entry in log.entries]
+        t0 = time.perf_counter()
+        replay(commands, RULES, "competition")
+        full = (time.perf_counter() - t0) * 1e6
+        print(f"{length:9d}  {time_undo(log, 1, args.repeat):7.1f} us  "
+              f"{time_undo(log, 10, args.repeat):7.1f} us  "
+              f"{time_undo(log, length, args.repeat):7.1f} us  {full:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
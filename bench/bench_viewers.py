@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Scoreboard Viewer Load Test
+Connects N Socket.IO viewers to a running backend, scores points through
+HTTP at a fixed rate, and measures for every viewer how long each update
+took from the POST that caused it to its arrival. The score goes up and
+back down again (/addpoint, /subtractpoint), so the match never ends.
+Each viewer count is reported with:
+- how many viewers connected;
+- the share of updates delivered;
+- the p50 and p99 update latency.
+The largest count within --max-p99 with at least 99% delivered is what the
+server sustains.
+
+With --launch the script starts the backend itself once per --modes
+entry (PADEL_SERVER_MODE) and stops it afterwards, so threading and the
+event loop modes are compared on the same machine:
+
+    python3 bench/bench_viewers.py --launch padel_backend.py --modes threading eventlet
+    python3 bench/bench_viewers.py --url http://127.0.0.1:5000 --viewers 50 200 500
+
+Needs python-socketio (with requests/websocket-client) for the viewers.
+
+Usage:
+    python3 bench/bench_viewers.py [--launch SCRIPT --modes threading eventlet gevent]
+                                   [--url URL] [--viewers 10 50 200] [--points 40] [--rate 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Update events of both backends: coalesced, delta-only (uart) and padel_backend.py
+UPDATE_EVENTS = ("scoringupdate", "gamestatedelta", "game_state_delta")
+# (add, subtract, game mode) routes, uart backend first
+ROUTES = [("/addpoint", "/subtractpoint", "/setgamemode"), ("/add_point", "/subtract_point", None)]
+
+
+def post(url, path, payload):
+    request = urllib.request.Request(url + path, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status
+
+
+def routes_for(url):
+    """Scoring routes the backend at url answers to"""
+    for add, subtract, gamemode in ROUTES:
+        try:
+            if gamemode is not None:
+                post(url, gamemode, {"mode": "competition"})
+            post(url, add, {"team": "black"})
+            post(url, subtract, {"team": "black"})
+            return add, subtract
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                raise
+    raise RuntimeError(f"{url} has neither the uart nor the padel_backend.py scoring routes")
+
+
+class Viewer:
+    """One display: a Socket.IO client recording when updates arrive"""
+
+    def __init__(self, socketio, url):
+        self.arrivals = []
+        self.client = socketio.Client(reconnection=False)
+        for event in UPDATE_EVENTS:
+            self.client.on(event, self._on_update)
+        try:
+            self.client.connect(url, wait_timeout=10)
+        except Exception:
+            self.client = None
+
+    def _on_update(self, data):
+        self.arrivals.append(time.perf_counter())
+
+    def close(self):
+        if self.client is not None:
+            self.client.disconnect()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(socketio, url, viewers, points, rate):
+    """Connected viewers, delivered fraction and latencies for one viewer count"""
+    add, subtract = routes_for(url)
+    clients = [None] * viewers
+
+    def connect(index):
+        clients[index] = Viewer(socketio, url)
+
+    threads = [threading.Thread(target=connect, args=(i,)) for i in range(viewers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connected = [viewer for viewer in clients if viewer.client is not None]
+    time.sleep(1.0)                     # Let connect-time emits settle
+    for viewer in connected:
+        viewer.arrivals.clear()
+
+    interval = 1.0 / rate
+    sent = []
+    for point in range(points):
+        sent.append(time.perf_counter())
+        post(url, add if point % 2 == 0 else subtract, {"team": "black"})
+        time.sleep(max(0.0, sent[-1] + interval - time.perf_counter()))
+    time.sleep(2.0)                     # Stragglers
+
+    latencies = []
+    delivered = 0
+    for viewer in connected:
+        for arrival in viewer.arrivals:
+            # The update belongs to the last point sent before it arrived
+            cause = max((t for t in sent if t <= arrival), default=None)
+            if cause is not None:
+                latencies.append(arrival - cause)
+                delivered += 1
+    for viewer in connected:
+        viewer.close()
+    expected = points * len(connected)
+    return len(connected), min(1.0, delivered / expected) if expected else 0.0, latencies
+
+
+def wait_until_up(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/health", timeout=2):
+                return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def report(socketio, url, args, label):
+    print(f"{label}: {args.points} points at {args.rate}/s")
+    print(f"{'viewers':>8s}  {'connected':>9s}  {'delivered':>9s}  {'p50':>9s}  {'p99':>9s}")
+    sustained = 0
+    for viewers in args.viewers:
+        connected, delivered, latencies = run(socketio, url, viewers, args.points, args.rate)
+        if not latencies:
+            print(f"{viewers:8d}  {connected:9d}  {delivered:8.1%}  {'-':>9s}  {'-':>9s}")
+            continue
+        p50 = percentile(latencies, 0.50) * 1e3
+        p99 = percentile(latencies, 0.99) * 1e3
+        print(f"{viewers:8d}  {connected:9d}  {delivered:8.1%}  {p50:6.1f} ms  {p99:6.1f} ms")
+        if connected == viewers and delivered >= 0.99 and p99 <= args.max_p99:
+            sustained = viewers
+    print(f"sustained: {sustained} viewers (p99 <= {args.max_p99:.0f} ms, >= 99% delivered)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test scoreboard viewers per server mode")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--launch", help="backend script to start once per --modes entry")
+    parser.add_argument("--modes", nargs="+", default=["threading", "eventlet"])
+    parser.add_argument("--viewers", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--points", type=int, default=40)
+    parser.add_argument("--rate", type=float, default=5.0, help="points per second")
+    parser.add_argument("--max-p99", type=float, default=250.0, help="ms")
+    args = parser.parse_args()
+
+    try:
+        import socketio
+    except ImportError:
+        sys.exit("python-socketio is not installed - pip3 install python-socketio[client]")
+
+    if not args.launch:
+        report(socketio, args.url, args, args.url)
+        return
+
+    for mode in args.modes:
+        backend = subprocess.Popen([sys.executable, args.launch], cwd=REPO,
+                                   env=dict(os.environ, PADEL_SERVER_MODE=mode),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_until_up(args.url, 30):
+                print(f"{mode}: backend did not come up")
+                continue
+            report(socketio, args.url, args, f"{args.launch} ({mode})")
+        finally:
+            backend.terminate()
+            backend.wait(10)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,38 @@
 Pigpio Software UART Bridge for Dual Picos
 This script reads from GPIO 23 and GPIO 24 using pigpio
 and makes the data available to the backend via named pipes (FIFOs)
+
+With --transport shm the bridge parses frames itself and publishes them
+into one shared-memory ring per Pico instead (see pico_ring.py), so a slow
+reader can never block the bridge.
+
+With --edge-detect the bridge parses frames and runs ball detection itself,
+and only sends DETECT events (plus every Nth frame with --forward-every N)
+down the pipe. Set PICO_DETECTION = "bridge" in the backend to match.
+
+With --capture-dir and/or --diag-socket the raw stream is also teed into a
+rotating capture file and a Unix socket (see pico_tee.py), each with its own
+backpressure policy, so recording never needs the backend to be stopped.
+
+The backend pipes stay non-blocking: one thread polls every Pico, so a
+backend that stops reading one FIFO gets that Pico's bytes queued (then
+dropped, or the pipe closed - see --backend-policy) instead of stalling
+bb_serial_read for the other GPIO.
 """
 
 import pigpio
+import argparse
+import errno
 import time
 import sys
 import os
 import threading
 
+from pico_detect import BallDetector, DETECTION_THRESHOLD, encode_detection_event
+from pico_frames import FrameParser, FrameCounter, encode_binary_frame, resolution_label
+from pico_ring import RingWriter
+from pico_tee import StreamTee, PipeSink, CaptureSink, SocketServer, POLICIES, DROP_OLDEST, DISCONNECT
+
 # ============================================================================
 # CONFIGURATION - Match your Pico connections
 # ============================================================================
@@ -18,10 +42,27 @@ PICO_1_GPIO = 23        # GPIO pin where Pico 1 TX is connected
 PICO_2_GPIO = 24        # GPIO pin where Pico 2 TX is connected
 BAUD_RATE = 57600
 
+# Adaptive polling of pigpiod (seconds / bytes)
+ACTIVE_INTERVAL = 0.005     # While data is flowing
+IDLE_MIN_INTERVAL = 0.005   # First back-off step once the line goes quiet
+IDLE_MAX_INTERVAL = 0.05    # ~290 bytes at 57600 baud, well inside pigpio's buffer
+BURST_BYTES = 512           # A read this big means we are behind: read again now
+STATS_INTERVAL = 60
+
 # Virtual serial port paths (named pipes)
 PICO_1_PIPE = "/tmp/pico1_serial"
 PICO_2_PIPE = "/tmp/pico2_serial"
 
+# Shared-memory ring names (used with --transport shm)
+PICO_1_RING = "pico1_frames"
+PICO_2_RING = "pico2_frames"
+
+# Stream tee (--capture-dir / --diag-socket)
+PICO_1_CAPTURE = "pico1_capture.bin"
+PICO_2_CAPTURE = "pico2_capture.bin"
+PICO_1_DIAG_SOCKET = "/tmp/pico1_diag.sock"
+PICO_2_DIAG_SOCKET = "/tmp/pico2_diag.sock"
+
 # ============================================================================
 # COLORS FOR OUTPUT
 # ============================================================================
@@ -37,110 +78,306 @@ class Colors:
 # PICO READER CLASS
 # ============================================================================
 class PicoReader:
-    def __init__(self, name, gpio_pin, pipe_path, pi):
+    """One Pico on one GPIO. Has no thread of its own; ReadScheduler polls it."""
+
+    def __init__(self, name, gpio_pin, pipe_path, pi, ring_name=None,
+                 edge_detect=False, forward_every=0, tee=None, backend_policy=DROP_OLDEST):
         self.name = name
         self.gpio_pin = gpio_pin
         self.pipe_path = pipe_path
         self.pi = pi
-        self.running = True
+        self.ring_name = ring_name
+        self.ring = None
+        self.next_open = 0.0
         self.frame_count = 0
         self.error_count = 0
+        self.pigpio_calls = 0
+        self.parser = FrameParser(compact=True)     # shm / edge: frames are parsed here
+        self.counter = FrameCounter()               # fifo: frames are only counted
+
+        # Edge mode: detect here, forward events and every Nth frame only
+        self.detector = BallDetector() if edge_detect else None
+        self.forward_every = forward_every
+        self.forwarded_frames = 0
+
+        # Optional fan-out of the raw stream; in plain fifo mode the backend is one of its sinks
+        self.tee = tee
+        self.backend_policy = backend_policy        # Never block: the scheduler thread serves every Pico
+        self.backend_sink = None                    # Non-blocking PipeSink on the backend FIFO
+        self.backend_dropped = 0                    # Bytes dropped by backend sinks already closed
+
+        # Adaptive polling state (see ReadScheduler)
+        self.interval = IDLE_MIN_INTERVAL
+        self.next_poll = 0.0
+
+    @property
+    def dropped_frames(self):
+        if self.ring is not None or self.detector is not None:
+            return self.parser.dropped_frames
+        return self.counter.dropped_frames
+
+    @property
+    def backend_dropped_bytes(self):
+        live = self.backend_sink.dropped_bytes if self.backend_sink is not None else 0
+        return self.backend_dropped + live
 
     def start(self):
-        """Start reading from Pico via pigpio"""
+        """Open the software serial input and the output transport"""
         # Open software serial
         self.pi.set_mode(self.gpio_pin, pigpio.INPUT)
         self.pi.bb_serial_read_open(self.gpio_pin, BAUD_RATE, 8)
+        self.pigpio_calls += 2
         print(f"{Colors.GREEN}✓ {self.name} - GPIO{self.gpio_pin} opened{Colors.END}")
 
+        if self.ring_name:
+            self.ring = RingWriter(self.ring_name)
+            print(f"{Colors.GREEN}✓ {self.name} - Created shared-memory ring: {self.ring_name}{Colors.END}")
+            return
+
         # Create named pipe (FIFO) if it doesn't exist
         if os.path.exists(self.pipe_path):
             os.remove(self.pipe_path)
         os.mkfifo(self.pipe_path)
         print(f"{Colors.GREEN}✓ {self.name} - Created pipe: {self.pipe_path}{Colors.END}")
-
-        # Start reader thread
-        thread = threading.Thread(target=self._read_loop, daemon=True)
-        thread.start()
-
-    def _read_loop(self):
-        """Continuously read from pigpio and write to pipe"""
-        line_buffer = ""
-
-        # Open pipe for writing (this will block until backend opens for reading)
         print(f"{Colors.CYAN}⏳ {self.name} - Waiting for backend to connect...{Colors.END}")
 
-        while self.running:
-            try:
-                # Open pipe in non-blocking mode initially
-                pipe_fd = os.open(self.pipe_path, os.O_WRONLY | os.O_NONBLOCK)
-
-                # Switch to blocking mode after opening
-                import fcntl
-                flags = fcntl.fcntl(pipe_fd, fcntl.F_GETFL)
-                fcntl.fcntl(pipe_fd, fcntl.F_SETFL, flags & ~os.O_NONBLOCK)
-
-                print(f"{Colors.GREEN}✓ {self.name} - Backend connected!{Colors.END}")
-
-                # Read and forward data
-                while self.running:
-                    (count, data) = self.pi.bb_serial_read(self.gpio_pin)
+    def _open_pipe(self, now):
+        """Try to open the pipe for writing; it only succeeds once the backend reads"""
+        if now < self.next_open:
+            return False
+        try:
+            pipe_fd = os.open(self.pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno != errno.ENXIO:  # ENXIO - no reader yet
+                print(f"{Colors.RED}✗ {self.name} - Pipe error: {e}{Colors.END}")
+            self.next_open = now + 1
+            return False
+
+        # Stays non-blocking: a backend that stops reading fills this reader's queue only
+        self.backend_sink = PipeSink("backend", pipe_fd, self.backend_policy)
+        if self.tee is not None and self.detector is None:
+            self.tee.add(self.backend_sink)
+        print(f"{Colors.GREEN}✓ {self.name} - Backend connected!{Colors.END}")
+        return True
+
+    def _close_pipe(self):
+        if self.backend_sink is None:
+            return
+        self.backend_dropped += self.backend_sink.dropped_bytes
+        if self.tee is not None:
+            self.tee.remove(self.backend_sink)
+        else:
+            self.backend_sink.close()
+        self.backend_sink = None
+
+    def poll(self, now):
+        """Read whatever pigpiod has buffered and forward it; return the byte count"""
+        if self.ring is None and self.backend_sink is None and not self._open_pipe(now) and self.tee is None:
+            return 0
+
+        (count, data) = self.pi.bb_serial_read(self.gpio_pin)
+        self.pigpio_calls += 1
+        if count <= 0:
+            return 0
+
+        try:
+            if self.tee is not None:
+                self.tee.write(data)
+
+            if self.ring is not None:
+                frames = self.parser.feed(data)
+                for distances, statuses in frames:
+                    self.ring.write(distances, statuses)
+                new_frames = len(frames)
+            elif self.detector is not None:
+                new_frames = self._edge_forward(data)
+            else:
+                # Write raw data to pipe (the tee already did), then count frames with a byte scan
+                self._send_backend(data, teed=self.tee is not None)
+                new_frames = self.counter.feed(data)
+
+            for _ in range(new_frames):
+                self.frame_count += 1
+                if self.frame_count % 100 == 0:
+                    print(f"{Colors.CYAN}📊 {self.name} - {self.frame_count} frames forwarded, "
+                          f"{self.dropped_frames} dropped{Colors.END}")
+
+        except BrokenPipeError:
+            print(f"{Colors.YELLOW}⚠ {self.name} - Backend disconnected, waiting...{Colors.END}")
+            self._close_pipe()
+        except Exception as e:
+            self.error_count += 1
+
+        return count
+
+    def _edge_forward(self, data):
+        """Edge mode: parse and detect here, write only events and decimated frames"""
+        out = bytearray()
+        frames = self.parser.feed(data)
+
+        for number, (distances, statuses) in enumerate(frames, self.frame_count + 1):
+            hit = self.detector.update(distances)
+            if hit is not None:
+                out += encode_detection_event(hit)
+                print(f"{Colors.GREEN}🎾 {self.name} - Ball detected at {hit}mm{Colors.END}")
+
+            if self.forward_every and number % self.forward_every == 0:
+                out += encode_binary_frame(self.forwarded_frames, int(time.monotonic() * 1000),
+                                           distances, statuses)
+                self.forwarded_frames += 1
+
+        if out:
+            self._send_backend(out)
+        return len(frames)
+
+    def _send_backend(self, data, teed=False):
+        """Queue-or-write data to the backend FIFO without blocking"""
+        if self.backend_sink is None:
+            return
+        if not teed:
+            self.backend_sink.send(data)
+        if self.backend_sink.closed:
+            raise BrokenPipeError
 
-                    if count > 0:
-                        try:
-                            # Write raw data to pipe
-                            os.write(pipe_fd, data)
+    def stop(self):
+        """Stop reading"""
+        self.pi.bb_serial_read_close(self.gpio_pin)
+        self.pigpio_calls += 1
+        self._close_pipe()
+        if self.tee is not None:
+            self.tee.close()
+        if self.ring is not None:
+            self.ring.close()
+        elif os.path.exists(self.pipe_path):
+            os.remove(self.pipe_path)
 
-                            # Parse for status (optional)
-                            text = data.decode('utf-8', errors='ignore')
-                            line_buffer += text
+# ============================================================================
+# READ SCHEDULER
+# ============================================================================
+class ReadScheduler:
+    """Services every PicoReader from one thread over the shared pigpio connection.
 
-                            while '\n' in line_buffer:
-                                line, line_buffer = line_buffer.split('\n', 1)
+    Each reader is polled on its own adaptive interval:
+    - data arrived          -> poll again after ACTIVE_INTERVAL
+    - big chunk (backlog)   -> poll again immediately (burst)
+    - nothing arrived       -> double the interval, up to IDLE_MAX_INTERVAL
+    """
 
-                                if "DATA_START" in line:
-                                    self.frame_count += 1
-                                    if self.frame_count % 100 == 0:
-                                        print(f"{Colors.CYAN}📊 {self.name} - {self.frame_count} frames forwarded{Colors.END}")
+    def __init__(self, readers):
+        self.readers = readers
+        self.running = False
+        self.thread = None
+        self.cpu_time = 0.0
+        self.started_at = None
 
-                        except Exception as e:
-                            self.error_count += 1
+    @property
+    def pigpio_calls(self):
+        return sum(reader.pigpio_calls for reader in self.readers)
 
-                    time.sleep(0.001)  # 1ms delay
+    def start(self):
+        self.running = True
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
 
-                os.close(pipe_fd)
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
 
-            except OSError as e:
-                if e.errno == 6:  # ENXIO - no reader
-                    time.sleep(1)
+    def _loop(self):
+        cpu_start = time.thread_time()
+        while self.running:
+            now = time.monotonic()
+            for reader in self.readers:
+                if now < reader.next_poll:
                     continue
+                try:
+                    count = reader.poll(now)
+                except Exception as e:
+                    reader.error_count += 1
+                    print(f"{Colors.RED}✗ {reader.name} - Error: {e}{Colors.END}")
+                    count = 0
+
+                if count >= BURST_BYTES:
+                    reader.interval = ACTIVE_INTERVAL
+                    reader.next_poll = now
+                elif count > 0:
+                    reader.interval = ACTIVE_INTERVAL
+                    reader.next_poll = now + ACTIVE_INTERVAL
                 else:
-                    print(f"{Colors.RED}✗ {self.name} - Pipe error: {e}{Colors.END}")
-                    time.sleep(1)
+                    reader.interval = min(max(reader.interval * 2, IDLE_MIN_INTERVAL), IDLE_MAX_INTERVAL)
+                    reader.next_poll = now + reader.interval
 
-            except Exception as e:
-                print(f"{Colors.RED}✗ {self.name} - Error: {e}{Colors.END}")
-                time.sleep(1)
+            self.cpu_time = time.thread_time() - cpu_start
+            delay = min(reader.next_poll for reader in self.readers) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
 
-    def stop(self):
-        """Stop reading"""
-        self.running = False
-        self.pi.bb_serial_read_close(self.gpio_pin)
-        if os.path.exists(self.pipe_path):
-            os.remove(self.pipe_path)
+    def stats(self):
+        """Summary line: pigpiod calls per second and CPU share of the scheduler thread"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9) if self.started_at else 1e-9
+        return (f"{self.pigpio_calls} pigpiod calls ({self.pigpio_calls / elapsed:.0f}/s), "
+                f"CPU {self.cpu_time:.2f}s ({100 * self.cpu_time / elapsed:.1f}%)")
 
 # ============================================================================
 # MAIN
 # ============================================================================
+def build_tee(args, capture_name, socket_path):
+    """StreamTee for one Pico from the command line options, or None"""
+    if not args.capture_dir and not args.diag_socket:
+        return None
+    tee = StreamTee()
+    if args.capture_dir:
+        os.makedirs(args.capture_dir, exist_ok=True)
+        tee.add(CaptureSink("capture", os.path.join(args.capture_dir, capture_name), args.capture_policy))
+    if args.diag_socket:
+        tee.add_server(SocketServer(socket_path, args.diag_policy))
+    return tee
+
 def main():
+    parser = argparse.ArgumentParser(description="Pigpio software UART bridge for dual Picos")
+    parser.add_argument("--transport", choices=("fifo", "shm"), default="fifo",
+                        help="fifo: forward raw bytes to named pipes (default); "
+                             "shm: publish parsed frames to shared-memory rings")
+    parser.add_argument("--edge-detect", action="store_true",
+                        help="detect ball hits in the bridge and send only DETECT events "
+                             "(backend: PICO_DETECTION = \"bridge\")")
+    parser.add_argument("--forward-every", type=int, default=0, metavar="N",
+                        help="with --edge-detect, also forward every Nth frame for diagnostics")
+    parser.add_argument("--capture-dir", metavar="DIR",
+                        help="also write each Pico's raw stream to a rotating capture file in DIR")
+    parser.add_argument("--diag-socket", action="store_true",
+                        help=f"also serve each Pico's raw stream on {PICO_1_DIAG_SOCKET} / {PICO_2_DIAG_SOCKET}")
+    parser.add_argument("--backend-policy", choices=(DROP_OLDEST, DISCONNECT), default=DROP_OLDEST,
+                        help="backpressure for the backend FIFOs (default: drop-oldest); "
+                             "never block, one thread serves both Picos")
+    parser.add_argument("--capture-policy", choices=POLICIES, default=DROP_OLDEST,
+                        help="backpressure for the capture file (default: drop-oldest)")
+    parser.add_argument("--diag-policy", choices=POLICIES, default=DISCONNECT,
+                        help="backpressure for diagnostics clients (default: disconnect)")
+    args = parser.parse_args()
+    use_shm = args.transport == "shm"
+
+    if args.edge_detect and use_shm:
+        parser.error("--edge-detect forwards events through the pipes; use it with --transport fifo")
+
     print(f"{Colors.BOLD}{'='*70}{Colors.END}")
     print(f"{Colors.BOLD}Pigpio Software UART Bridge - Dual Pico Configuration{Colors.END}")
     print(f"{Colors.BOLD}{'='*70}{Colors.END}\n")
 
     print(f"Configuration:")
-    print(f"  PICO_1: GPIO{PICO_1_GPIO} → {PICO_1_PIPE}")
-    print(f"  PICO_2: GPIO{PICO_2_GPIO} → {PICO_2_PIPE}")
-    print(f"  Baud Rate: {BAUD_RATE}\n")
+    print(f"  PICO_1: GPIO{PICO_1_GPIO} → {PICO_1_RING if use_shm else PICO_1_PIPE}")
+    print(f"  PICO_2: GPIO{PICO_2_GPIO} → {PICO_2_RING if use_shm else PICO_2_PIPE}")
+    print(f"  Baud Rate: {BAUD_RATE}")
+    if args.edge_detect:
+        decimation = f", forwarding every {args.forward_every}th frame" if args.forward_every else ""
+        print(f"  Edge detection: < {DETECTION_THRESHOLD}mm{decimation}")
+    if args.capture_dir:
+        print(f"  Capture: {args.capture_dir} ({args.capture_policy})")
+    if args.diag_socket:
+        print(f"  Diagnostics: {PICO_1_DIAG_SOCKET}, {PICO_2_DIAG_SOCKET} ({args.diag_policy})")
+    print()
 
     # Initialize pigpio
     try:
@@ -157,35 +394,64 @@ def main():
         sys.exit(1)
 
     # Create readers for both Picos
-    pico1_reader = PicoReader("PICO_1", PICO_1_GPIO, PICO_1_PIPE, pi)
-    pico2_reader = PicoReader("PICO_2", PICO_2_GPIO, PICO_2_PIPE, pi)
-
-    # Start both readers
+    pico1_reader = PicoReader("PICO_1", PICO_1_GPIO, PICO_1_PIPE, pi, PICO_1_RING if use_shm else None,
+                              args.edge_detect, args.forward_every,
+                              build_tee(args, PICO_1_CAPTURE, PICO_1_DIAG_SOCKET), args.backend_policy)
+    pico2_reader = PicoReader("PICO_2", PICO_2_GPIO, PICO_2_PIPE, pi, PICO_2_RING if use_shm else None,
+                              args.edge_detect, args.forward_every,
+                              build_tee(args, PICO_2_CAPTURE, PICO_2_DIAG_SOCKET), args.backend_policy)
+
+    # Start both readers, serviced by one scheduler thread
     print(f"{Colors.BOLD}Starting readers...{Colors.END}\n")
     pico1_reader.start()
-    time.sleep(0.5)
     pico2_reader.start()
+    scheduler = ReadScheduler([pico1_reader, pico2_reader])
+    scheduler.start()
 
     print(f"\n{Colors.GREEN}✓ Bridge is running!{Colors.END}")
     print(f"\n{Colors.BOLD}Update your backend configuration to:{Colors.END}")
-    print(f"{Colors.CYAN}  PICO_1 port: {PICO_1_PIPE}{Colors.END}")
-    print(f"{Colors.CYAN}  PICO_2 port: {PICO_2_PIPE}{Colors.END}")
+    if use_shm:
+        print(f"{Colors.CYAN}  PICO_TRANSPORT = \"shm\"{Colors.END}")
+        print(f"{Colors.CYAN}  PICO_1 ring: {PICO_1_RING}{Colors.END}")
+        print(f"{Colors.CYAN}  PICO_2 ring: {PICO_2_RING}{Colors.END}")
+    else:
+        print(f"{Colors.CYAN}  PICO_1 port: {PICO_1_PIPE}{Colors.END}")
+        print(f"{Colors.CYAN}  PICO_2 port: {PICO_2_PIPE}{Colors.END}")
+    if args.edge_detect:
+        print(f"{Colors.CYAN}  PICO_DETECTION = \"bridge\"{Colors.END}")
     print(f"\nPress Ctrl+C to stop\n")
 
     # Keep running
     try:
         while True:
-            time.sleep(1)
+            time.sleep(STATS_INTERVAL)
+            print(f"{Colors.CYAN}⚙ Scheduler: {scheduler.stats()}{Colors.END}")
 
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}Stopping...{Colors.END}")
+        scheduler.stop()
         pico1_reader.stop()
         pico2_reader.stop()
         pi.stop()
 
         print(f"\n{Colors.BOLD}Statistics:{Colors.END}")
-        print(f"  PICO_1: {pico1_reader.frame_count} frames, {pico1_reader.error_count} errors")
-        print(f"  PICO_2: {pico2_reader.frame_count} frames, {pico2_reader.error_count} errors")
+        for reader in (pico1_reader, pico2_reader):
+            line = (f"  {reader.name}: {reader.frame_count} frames, {reader.error_count} errors, "
+                    f"{reader.dropped_frames} dropped")
+            if reader.ring is not None or reader.detector is not None:
+                line += f", {reader.parser.crc_errors} CRC errors"     # fifo mode only counts frames
+            if reader.ring is None:
+                line += f", {reader.backend_dropped_bytes} bytes dropped for the backend"
+            print(line)
+            if reader.parser.resolution is not None:
+                print(f"    resolution: {resolution_label(reader.parser.resolution)}")
+            if reader.detector is not None:
+                print(f"    edge: {reader.detector.detection_count} detections, "
+                      f"{reader.forwarded_frames} frames forwarded")
+            if reader.tee is not None:
+                for line in reader.tee.stats():
+                    print(f"    tee {line}")
+        print(f"  Scheduler: {scheduler.stats()}")
         print(f"\n{Colors.GREEN}Bridge stopped{Colors.END}")
 
 if __name__ == "__main__":
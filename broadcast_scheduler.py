@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Coalesced Broadcast Scheduler
+Scoring handlers queue their Socket.IO events (pointscored, sideswitchrequired,
+matchwon, ...) here instead of emitting them. When the scheduler is due - at
+the end of every scoring batch, or once a short window has passed since the
+first thing queued - the backend flushes it with the state delta for
+everything that changed meanwhile, and every client gets one message:
+
+    scoringupdate {"version": 43,
+                   "changes": {"score1": 30, ...},      # apply first
+                   "events": [{"event": "pointscored", "data": {...}}, ...]}
+
+Events keep the order they were queued in; version and changes follow the
+state_delta.py rules (changes is empty and version unchanged when only
+events happened). With coalesce=False the same flush sends the queued events
+one by one and then gamestatedelta, for clients of the separate events.
+
+All methods except the window timer run on the scoring thread.
+"""
+
+import threading
+import time
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+COMBINED_EVENT = "scoringupdate"
+DELTA_EVENT = "gamestatedelta"
+
+
+class BroadcastScheduler:
+    """Collects scoring broadcasts and sends them as one message per flush"""
+
+    def __init__(self, emit, window=0.0, coalesce=True, wake=None):
+        self.emit = emit                # emit(event, data) to every client
+        self.window = window            # Seconds to gather after the first queued change; 0 = per batch
+        self.coalesce = coalesce
+        self.wake = wake                # Called from a timer thread when the window ends
+        self.events = []
+        self.started = None             # time.monotonic() of the first change still pending
+        self.timer = None
+        self.flushes = 0
+        self.events_sent = 0
+        self.emits = 0
+        self.separate_emits = 0         # What the same flushes cost as one emit per event
+
+    def queue(self, event, data):
+        self.events.append((event, data))
+        self.hold()
+
+    def hold(self):
+        """Something changed: start the window if it is not running"""
+        if self.started is None:
+            self.started = time.monotonic()
+            if self.window > 0 and self.wake is not None:
+                self.timer = threading.Timer(self.window, self._fire)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def due(self):
+        if self.window <= 0 or self.started is None:
+            return self.window <= 0
+        return time.monotonic() - self.started >= self.window
+
+    def flush(self, delta, version):
+        """Send what is queued together with delta (a state_delta.py message or None)"""
+        events = self.events
+        self.events = []
+        self.started = None
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not events and delta is None:
+            return
+
+        self.flushes += 1
+        self.events_sent += len(events)
+        self.separate_emits += len(events) + (delta is not None)
+        if self.coalesce:
+            message = {
+                "version": version,
+                "changes": delta["changes"] if delta is not None else {},
+                "events": [{"event": event, "data": data} for event, data in events]
+            }
+            if delta is not None and "removed" in delta:
+                message["removed"] = delta["removed"]
+            self.emit(COMBINED_EVENT, message)
+            self.emits += 1
+        else:
+            for event, data in events:
+                self.emit(event, data)
+            if delta is not None:
+                self.emit(DELTA_EVENT, delta)
+            self.emits += len(events) + (delta is not None)
+
+    def stats(self):
+        return {
+            "window": self.window,
+            "coalesce": self.coalesce,
+            "flushes": self.flushes,
+            "events": self.events_sent,
+            "emits": self.emits,
+            "emits_saved": self.separate_emits - self.emits,
+            "pending": len(self.events)
+        }
+
+    def _fire(self):
+        self.timer = None
+        self.wake()
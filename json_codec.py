@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Pluggable JSON Codec
+The one place both backends turn objects into JSON: jsonify() responses
+(through FastJSONProvider), Socket.IO packets (through SocketIOJSON, the
+server's json= module) and the pre-encoded bodies of response_cache.py.
+
+Uses orjson when it is installed and the standard library otherwise; both
+write compact UTF-8 JSON and accept datetime (ISO 8601), array.array, set
+and NumPy values, so callers can hand those over without converting them.
+Binary Socket.IO (msgpack) is opt-in, because every display then needs the
+socket.io-msgpack-parser on its side.
+
+Usage:
+    import json_codec
+    app.json = json_codec.FastJSONProvider(app)             # jsonify() uses it
+    socketio = SocketIO(app, **json_codec.socketio_options("json"))
+    body = json_codec.dumps_bytes(game_state)
+"""
+
+import array
+import json
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    from flask.json.provider import JSONProvider
+except ImportError:
+    JSONProvider = object
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# ============================================================================
+# ENCODE / DECODE
+# ============================================================================
+def _default(value):
+    """Types neither encoder handles on its own"""
+    if isinstance(value, (array.array, set, frozenset)):
+        return list(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "tolist"):        # NumPy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=_default, option=_OPTIONS).decode("utf-8")
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+
+    def dumps(obj):
+        return _encoder.encode(obj)
+
+    def dumps_bytes(obj):
+        return _encoder.encode(obj).encode("utf-8")
+
+    def loads(data):
+        return json.loads(data)
+
+
+# ============================================================================
+# FLASK AND SOCKET.IO ADAPTERS
+# ============================================================================
+class SocketIOJSON:
+    """json= module for python-socketio/engineio; they pass stdlib keyword arguments"""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return dumps(obj)
+
+    @staticmethod
+    def loads(data, **kwargs):
+        return loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider (app.json) on top of this codec"""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def socketio_options(serializer="json"):
+    """SocketIO(...) keyword arguments for serializer "json" or "msgpack" """
+    if serializer == "msgpack":
+        if msgpack is not None:
+            return {"serializer": "msgpack"}
+        print("⚠ msgpack not installed - Socket.IO stays on JSON")
+    return {"json": SocketIOJSON}
+
+
+def describe(serializer="json"):
+    """Codec summary for startup logs and /health"""
+    binary = serializer == "msgpack" and msgpack is not None
+    return {"json": BACKEND, "socketio": "msgpack" if binary else BACKEND}
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Columnar Match History
+The point-by-point history of a match stored as parallel arrays - action
+and team codes, scores, games and sets before and after, and a monotonic
+timestamp - instead of one nested dict per entry. An entry costs a fixed
+few dozen bytes, nothing is embedded in the game state, and the familiar
+JSON entries are only built for the slice a client asks for.
+
+Usage:
+    history = MatchHistory()                   # key_style="_" for score_1 style keys
+    history.append("point", "black", (15, 0), (30, 0), (0, 0), (0, 0), (0, 0), (0, 0))
+    history.page(since=0, limit=100)           # {"entries": [...], "next": 100, ...}
+
+Entries are numbered from 0; page(since=N, epoch=E) returns entries N,
+N+1, ... with the next cursor and epoch to pass on the following request.
+truncate() (undo) can take back entries a client has already read, and
+new entries then reuse their numbers, so every truncation starts a new
+epoch: a cursor from an older epoch is moved back to the shortest length
+the history had since, and the page says "truncated": true so the client
+drops what it kept from there on.
+"""
+
+import time
+from array import array
+from datetime import datetime
+
+ACTIONS = ("point", "game", "set", "match", "point_subtract")
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+TEAMS = ("black", "yellow")
+TEAM_CODES = {"black": 0, "yellow": 1}
+
+PAGE_LIMIT = 500            # Most entries one page returns
+
+
+class MatchHistory:
+    """Append-only (apart from undo) columnar history of one match"""
+
+    def __init__(self, key_style=""):
+        self.action = array("B")
+        self.team = array("B")
+        self.scores = array("H")    # 4 per entry: score1, score2 before; score1, score2 after
+        self.games = array("H")     # 4 per entry, same layout
+        self.sets = array("B")      # 4 per entry, same layout
+        self.times = array("d")     # time.monotonic()
+        self.truncations = []       # Length after each truncate(); the epoch is their count
+        # Monotonic timestamps are shown as wall-clock time relative to this pair
+        self.wall_start = time.time()
+        self.monotonic_start = time.monotonic()
+        self.keys = [f"{name}{key_style}{side}" for name in ("score", "game", "set") for side in (1, 2)]
+
+    def __len__(self):
+        return len(self.action)
+
+    def append(self, action, team, score_before, score_after, game_before, game_after, set_before, set_after):
+        self.action.append(ACTION_CODES[action])
+        self.team.append(TEAM_CODES.get(team, 1))
+        self.scores.extend((score_before[0], score_before[1], score_after[0], score_after[1]))
+        self.games.extend((game_before[0], game_before[1], game_after[0], game_after[1]))
+        self.sets.extend((set_before[0], set_before[1], set_after[0], set_after[1]))
+        self.times.append(time.monotonic())
+
+    @property
+    def epoch(self):
+        return len(self.truncations)
+
+    def truncate(self, length):
+        """Drop the entries from length on (undo)"""
+        self.truncations.append(length)
+        del self.action[length:]
+        del self.team[length:]
+        del self.scores[4 * length:]
+        del self.games[4 * length:]
+        del self.sets[4 * length:]
+        del self.times[length:]
+
+    def nbytes(self):
+        """Memory held by the columns"""
+        return sum(column.itemsize * len(column)
+                   for column in (self.action, self.team, self.scores, self.games, self.sets, self.times))
+
+    def timestamp(self, index):
+        return datetime.fromtimestamp(self.wall_start + self.times[index] - self.monotonic_start).isoformat()
+
+    def entry(self, index):
+        """One entry as JSON-ready dict, in the shape the backends always sent"""
+        s1, s2, g1, g2, t1, t2 = self.keys
+        i = 4 * index
+        scores = self.scores
+        games = self.games
+        sets = self.sets
+        return {
+            "timestamp": self.timestamp(index),
+            "action": ACTIONS[self.action[index]],
+            "team": TEAMS[self.team[index]],
+            "scores": {
+                "before": {s1: scores[i], s2: scores[i + 1]},
+                "after": {s1: scores[i + 2], s2: scores[i + 3]}
+            },
+            "games": {
+                "before": {g1: games[i], g2: games[i + 1]},
+                "after": {g1: games[i + 2], g2: games[i + 3]}
+            },
+            "sets": {
+                "before": {t1: sets[i], t2: sets[i + 1]},
+                "after": {t1: sets[i + 2], t2: sets[i + 3]}
+            }
+        }
+
+    def to_json(self, start=0, stop=None):
+        """Entries start..stop as dicts"""
+        return [self.entry(index) for index in range(*slice(start, stop).indices(len(self)))]
+
+    def page(self, since=0, epoch=None, limit=PAGE_LIMIT):
+        """Entries from the since cursor on, at most limit (capped at PAGE_LIMIT)"""
+        total = len(self)
+        limit = PAGE_LIMIT if limit is None else max(0, min(limit, PAGE_LIMIT))
+        start = max(since, 0)
+        if epoch is not None and epoch < self.epoch:
+            start = min([start] + self.truncations[max(epoch, 0):])
+        truncated = start < since or since > total
+        start = min(start, total)
+        stop = min(start + limit, total)
+        return {
+            "entries": self.to_json(start, stop),
+            "since": start,
+            "next": stop,
+            "total": total,
+            "epoch": self.epoch,
+            "truncated": truncated
+        }
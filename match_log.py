@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Match Command Log
+Every scoring command of the match (add or subtract a point, per team) in
+the order it was applied, with a copy of the score and statistics taken
+every SNAPSHOT_EVERY commands. Undoing any number of commands restores the
+nearest snapshot at or before the target and replays at most
+SNAPSHOT_EVERY - 1 commands, so it costs the same at the end of a long
+match as after the first point.
+
+The log has a position: the number of its commands that are applied.
+Undo moves the position back and leaves the undone commands in place for
+redo; recording a different command there drops them, as in any editor.
+
+Usage (on the thread that scores):
+    log = MatchLog(rules)
+    log.record(ADD_POINT, team, history_length, state, stats)     # after applying it
+    entry, state, stats = log.undo(gamemode)                       # restored copies
+    entry = log.next_entry()                                       # re-apply it to redo
+"""
+
+import collections
+import time
+
+from match_stats import MatchStats, replay
+from scoring_engine import DEFAULT_RULES, MatchState
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SNAPSHOT_EVERY = 16         # Commands between score snapshots
+
+LogEntry = collections.namedtuple("LogEntry", [
+    "command",              # match_stats.ADD_POINT / SUBTRACT_POINT
+    "team",                 # BLACK / YELLOW
+    "history_length",       # Length of matchhistory before the command
+    "timestamp"             # time.time() when first applied
+])
+STEPS_ERROR = "steps must be a positive integer"
+
+
+def parse_steps(payload):
+    """steps from an undo/redo payload ({"steps": N}, default 1), or None if it is not valid
+
+    Only a JSON object is a payload (None means no body: one step), and only a
+    real integer of at least 1 is a step count - no bools, floats or strings.
+    """
+    if payload is None:
+        return 1
+    if not isinstance(payload, dict):
+        return None
+    steps = payload.get("steps", 1)
+    if type(steps) is not int or steps < 1:
+        return None
+    return steps
+
+
+
+class MatchLog:
+    """Scoring commands of one match with periodic snapshots"""
+
+    def __init__(self, rules=DEFAULT_RULES, gamemode=None, snapshot_every=SNAPSHOT_EVERY):
+        self.rules = rules
+        self.snapshot_every = snapshot_every
+        self.entries = []
+        self.position = 0
+        self.snapshots = {0: (MatchState(gamemode=gamemode), MatchStats())}
+
+    def can_undo(self, steps=1):
+        return 0 < steps <= self.position
+
+    def can_redo(self):
+        return self.position < len(self.entries)
+
+    def record(self, command, team, history_length, state, stats):
+        """A command was applied to state and stats (which are copied when a snapshot is due)"""
+        if self.can_redo():
+            entry = self.entries[self.position]
+            if entry.command == command and entry.team == team:
+                # Redo: the same command again keeps the rest of the undone commands
+                self.position += 1
+                self._snapshot(state, stats)
+                return entry
+            self._truncate()
+        entry = LogEntry(command, team, history_length, time.time())
+        self.entries.append(entry)
+        self.position += 1
+        self._snapshot(state, stats)
+        return entry
+
+    def undo(self, gamemode=None, steps=1):
+        """Step back; returns (first entry undone, state, stats) for the new position"""
+        self.position -= steps
+        entry = self.entries[self.position]
+        state, stats = self.restore(self.position, gamemode)
+        return entry, state, stats
+
+    def next_entry(self):
+        """The command a redo applies, or None"""
+        return self.entries[self.position] if self.can_redo() else None
+
+    def restore(self, position, gamemode=None):
+        """Fresh (state, stats) as they were after the first position commands.
+
+        Commands are replayed under the current gamemode, which may have been
+        chosen after the snapshot was taken.
+        """
+        base = position - position % self.snapshot_every
+        state, stats = self.snapshots[base]
+        state = state.copy()
+        state.gamemode = gamemode
+        return replay(((entry.command, entry.team) for entry in self.entries[base:position]),
+                      self.rules, state=state, stats=stats.copy())
+
+    def stats(self):
+        return {
+            "commands": len(self.entries),
+            "position": self.position,
+            "undo": self.position,
+            "redo": len(self.entries) - self.position,
+            "snapshots": len(self.snapshots)
+        }
+
+    def _snapshot(self, state, stats):
+        if self.position % self.snapshot_every == 0 and self.position not in self.snapshots:
+            self.snapshots[self.position] = (state.copy(), stats.copy())
+
+    def _truncate(self):
+        """Drop the undone commands and the snapshots taken after them"""
+        del self.entries[self.position:]
+        for position in [p for p in self.snapshots if p > self.position]:
+            del self.snapshots[position]
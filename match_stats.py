@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Running Match Statistics
+Per-team counters kept up to date from the scoring engine's events, so
+statistics are read straight off the counters instead of rescanning the
+match history: the cost of a point and of a stats request stays the same
+however long the match gets.
+
+Usage (on the thread that scores):
+    mode = state.mode
+    stats.record_point(team, mode, apply_point(state, team, rules))
+    stats.record_subtract(team, apply_subtract(state, team))
+
+Counters only move forward. After a restore (anything that sets the score
+without playing the points) rebuild them with replay(), the one place
+history is walked.
+"""
+
+from scoring_engine import (DEFAULT_RULES, NORMAL, TIEBREAK, TEAMS, EVENT_GAME, EVENT_SET,
+                            MatchState, apply_point, apply_subtract)
+
+# Commands replay() understands
+ADD_POINT = "addpoint"
+SUBTRACT_POINT = "subtractpoint"
+
+
+class MatchStats:
+    """Per-team counters for one match; every list is indexed by BLACK / YELLOW"""
+
+    __slots__ = ("points", "games", "sets", "tiebreak_points", "subtractions",
+                 "streak_team", "streak", "longest_run", "set_games")
+
+    def __init__(self):
+        self.points = [0, 0]            # Every point won, game- and set-winning ones included
+        self.games = [0, 0]             # Games won outside tie-breaks
+        self.sets = [0, 0]
+        self.tiebreak_points = [0, 0]   # Points won in tie-breaks and super tie-breaks
+        self.subtractions = [0, 0]
+        self.streak_team = None         # Team on the current run of points
+        self.streak = 0
+        self.longest_run = [0, 0]
+        self.set_games = []             # (black, yellow) per finished set, as sethistory shows it
+
+    def copy(self):
+        stats = MatchStats.__new__(MatchStats)
+        stats.points = self.points[:]
+        stats.games = self.games[:]
+        stats.sets = self.sets[:]
+        stats.tiebreak_points = self.tiebreak_points[:]
+        stats.subtractions = self.subtractions[:]
+        stats.streak_team = self.streak_team
+        stats.streak = self.streak
+        stats.longest_run = self.longest_run[:]
+        stats.set_games = self.set_games[:]
+        return stats
+
+    def record_point(self, team, mode, events):
+        """Count a point; mode is the set phase before it was played"""
+        if not events:
+            return
+        self.points[team] += 1
+        if mode != NORMAL:
+            self.tiebreak_points[team] += 1
+
+        if team == self.streak_team:
+            self.streak += 1
+        else:
+            self.streak_team = team
+            self.streak = 1
+        if self.streak > self.longest_run[team]:
+            self.longest_run[team] = self.streak
+
+        for kind, winner, detail in events:
+            if kind == EVENT_GAME:
+                self.games[winner] += 1
+            elif kind == EVENT_SET:
+                self.sets[winner] += 1
+                self.set_games.append(_set_games(winner, mode, detail))
+
+    def record_subtract(self, team, events):
+        if events:
+            self.subtractions[team] += 1
+
+    def total_games(self, team, current_games=0):
+        """Games of the finished sets (tie-breaks count as 7-6) plus the set in progress"""
+        return sum(games[team] for games in self.set_games) + current_games
+
+    def sets_breakdown(self):
+        return [{"setnumber": number,
+                 "blackgames": black,
+                 "yellowgames": yellow,
+                 "setwinner": "black" if black > yellow else "yellow"}
+                for number, (black, yellow) in enumerate(self.set_games, 1)]
+
+    def as_dict(self):
+        """Counters by team name, for JSON"""
+        def by_team(values):
+            return {TEAMS[0]: values[0], TEAMS[1]: values[1]}
+
+        return {
+            "points": by_team(self.points),
+            "games": by_team(self.games),
+            "sets": by_team(self.sets),
+            "tiebreakpoints": by_team(self.tiebreak_points),
+            "subtractions": by_team(self.subtractions),
+            "longestrun": by_team(self.longest_run),
+            "currentstreak": {
+                "team": TEAMS[self.streak_team] if self.streak_team is not None else None,
+                "points": self.streak
+            }
+        }
+
+
+def _set_games(team, mode, result):
+    """Games of a finished set the way sethistory shows them"""
+    if mode == NORMAL:
+        return result.games
+    if mode == TIEBREAK:
+        black, yellow = result.games
+        return (black + 1, yellow) if team == 0 else (black, yellow + 1)
+    # Super tie-break: the deciding set is shown by its points
+    return result.scores
+
+
+def replay(commands, rules=DEFAULT_RULES, gamemode=None, state=None, stats=None):
+    """Rebuild (state, stats) from (command, team) pairs, commands ADD_POINT / SUBTRACT_POINT.
+
+    Starts from a new match, or from state and stats (changed in place) if given.
+    """
+    if state is None:
+        state = MatchState(gamemode=gamemode)
+        stats = MatchStats()
+    for command, team in commands:
+        if command == ADD_POINT:
+            mode = state.mode
+            stats.record_point(team, mode, apply_point(state, team, rules))
+        elif command == SUBTRACT_POINT:
+            stats.record_subtract(team, apply_subtract(state, team))
+    return state, stats
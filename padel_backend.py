@@ -3,40 +3,79 @@
 """
 Padel Scoreboard Backend with Socket.IO Integration
 Real-time scoring system with VL53L0X sensor support
+Scoring rules come from scoring_engine.py; this file maps them onto its keys
+Clients get the full state once, then versioned deltas (state_delta.py)
+Responses and Socket.IO payloads are encoded by json_codec.py (orjson when installed)
+Served by Werkzeug threads or one eventlet/gevent event loop (server_mode.py)
 """
 
+import os
+import server_mode
+
+# "threading" (Werkzeug, a thread per client) or "eventlet"/"gevent" (one event loop for every display)
+SERVER_MODE = os.environ.get("PADEL_SERVER_MODE", "threading")
+server = server_mode.select(SERVER_MODE)        # Before Flask: the event loop modes patch socket
+
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import json
 from datetime import datetime
-import os
-import threading
+import json_codec
+
+from match_history import MatchHistory
+from match_stats import MatchStats
+from state_delta import StateDeltas
+from scoring_engine import (MatchState, Rules, TEAMS, EVENT_GAME, EVENT_SET, EVENT_MATCH_WON,
+                            SUBTRACT_EVENTS, apply_point, apply_subtract, team_index)
+
+# "json" (orjson or stdlib) or "msgpack" - msgpack needs socket.io-msgpack-parser in padel_js.js
+SOCKETIO_SERIALIZER = "json"
 
 app = Flask(__name__)
+app.json = json_codec.FastJSONProvider(app)
 CORS(app, cors_allowed_origins="*")
 
 # Initialize Socket.IO with CORS support
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', logger=True, engineio_logger=False)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=server.name, logger=True, engineio_logger=False,
+                    **json_codec.socketio_options(SOCKETIO_SERIALIZER))
+
+# 40 wins the game outright (no deuce); sets are played until someone leads by two games
+SCORING_RULES = Rules(golden_point=True, tiebreaks=False)
+
+# scoring_engine field -> game_state key
+STATE_KEYS = {
+    'score1': 'score_1', 'score2': 'score_2',
+    'point1': 'point_1', 'point2': 'point_2',
+    'game1': 'game_1', 'game2': 'game_2',
+    'set1': 'set_1', 'set2': 'set_2',
+    'matchwon': 'match_won',
+    'sethistory': 'set_history'
+}
+
+# The score lives in match_state; game_state mirrors it for clients
+match_state = MatchState()
+
+# Running statistics, updated on every point instead of rescanning match_history
+match_stats = MatchStats()
+
+# Point-by-point history in compact columns; JSON only for /match_history
+match_history = MatchHistory(key_style='_')
+
+# Versioned deltas of game_state for Socket.IO clients; the lock keeps versions in emit order
+state_deltas = StateDeltas()
+broadcast_lock = server.lock()
 
 # Enhanced game state
 game_state = {
-    'score_1': 0,
-    'score_2': 0,
-    'point_1': 0,
-    'point_2': 0,
-    'game_1': 0,
-    'game_2': 0,
-    'set_1': 0,
-    'set_2': 0,
-    'match_won': False,
+    **match_state.as_dict(STATE_KEYS),
     'winner': None,
-    'set_history': [],
-    'match_history': [],
+    'history_length': 0,
     'match_start_time': datetime.now().isoformat(),
     'match_end_time': None,
     'last_updated': datetime.now().isoformat()
 }
+state_deltas.update(game_state)
 
 # Match storage for winner display
 match_storage = {
@@ -63,7 +102,7 @@ match_storage = {
 def handle_connect():
     """Handle client connection"""
     print(f'🔌 Client connected: {request.sid}')
-    emit('game_state_update', game_state)
+    emit('game_state_update', full_game_state())
     return True
 
 @socketio.on('disconnect')
@@ -75,7 +114,7 @@ def handle_disconnect():
 def handle_request_game_state():
     """Handle request for current game state"""
     print(f'📡 Game state requested by: {request.sid}')
-    emit('game_state_update', game_state)
+    emit('game_state_update', full_game_state())
 
 @socketio.on('sensor_point_scored')
 def handle_sensor_point(data):
@@ -83,6 +122,9 @@ def handle_sensor_point(data):
     print(f'🎯 Sensor point received: {data}')
     team = data.get('team', 'black')
     action = data.get('action', 'add_point')
+    if team not in TEAMS:
+        emit('error', {'message': f'Unknown team: {team}'})
+        return
     
     if action == 'add_point':
         result = process_add_point(team)
@@ -94,17 +136,24 @@ def handle_sensor_point(data):
     
     emit('sensor_action_confirmed', result)
 
+def full_game_state():
+    """Game state as last broadcast, with its version"""
+    with broadcast_lock:
+        return state_deltas.snapshot()
+
 def broadcast_game_state():
-    """Broadcast game state to all connected clients"""
-    socketio.emit('game_state_update', game_state)
-    print(f"📡 Game state broadcasted")
+    """Broadcast the fields that changed, with the next version (clients with a gap re-request)"""
+    with broadcast_lock:
+        delta = state_deltas.update(game_state)
+        if delta is not None:
+            socketio.emit('game_state_delta', delta)
+    print(f"📡 Game state delta broadcasted")
 
 def broadcast_point_scored(team, action_type):
     """Broadcast point scored event"""
     data = {
         'team': team,
         'action': action_type,
-        'game_state': game_state,
         'timestamp': datetime.now().isoformat()
     }
     socketio.emit('point_scored', data)
@@ -126,48 +175,23 @@ def broadcast_match_won():
 
 def add_to_history(action, team, score_before, score_after, game_before, game_after, set_before, set_after):
     """Add action to match history"""
-    global game_state
-    history_entry = {
-        'timestamp': datetime.now().isoformat(),
-        'action': action,
-        'team': team,
-        'scores': {
-            'before': {'score_1': score_before[0], 'score_2': score_before[1]},
-            'after': {'score_1': score_after[0], 'score_2': score_after[1]}
-        },
-        'games': {
-            'before': {'game_1': game_before[0], 'game_2': game_before[1]},
-            'after': {'game_1': game_after[0], 'game_2': game_after[1]}
-        },
-        'sets': {
-            'before': {'set_1': set_before[0], 'set_2': set_before[1]},
-            'after': {'set_1': set_after[0], 'set_2': set_after[1]}
-        }
-    }
-    game_state['match_history'].append(history_entry)
+    match_history.append(action, team, score_before, score_after, game_before, game_after, set_before, set_after)
+    game_state['history_length'] = len(match_history)
 
 def calculate_match_statistics():
     """Calculate match statistics"""
-    global game_state
-    
-    black_points = len([h for h in game_state['match_history'] if h['action'] == 'point' and h['team'] == 'black'])
-    yellow_points = len([h for h in game_state['match_history'] if h['action'] == 'point' and h['team'] == 'yellow'])
-    black_games = len([h for h in game_state['match_history'] if h['action'] == 'game' and h['team'] == 'black'])
-    yellow_games = len([h for h in game_state['match_history'] if h['action'] == 'game' and h['team'] == 'yellow'])
-    
     sets_breakdown = []
-    for i, set_score in enumerate(game_state['set_history'], 1):
-        games = set_score.split('-')
+    for i, (black_games, yellow_games) in enumerate(match_stats.set_games, 1):
         sets_breakdown.append({
             'set_number': i,
-            'black_games': int(games[0]),
-            'yellow_games': int(games[1]),
-            'set_winner': 'black' if int(games[0]) > int(games[1]) else 'yellow'
+            'black_games': black_games,
+            'yellow_games': yellow_games,
+            'set_winner': 'black' if black_games > yellow_games else 'yellow'
         })
     
     return {
-        'total_points': {'black': black_points, 'yellow': yellow_points},
-        'total_games': {'black': black_games, 'yellow': yellow_games},
+        'total_points': {'black': match_stats.points[0], 'yellow': match_stats.points[1]},
+        'total_games': {'black': match_stats.games[0], 'yellow': match_stats.games[1]},
         'sets_breakdown': sets_breakdown
     }
 
@@ -231,89 +255,43 @@ def wipe_match_storage():
     }
     print("🧹 Match storage wiped")
 
-def check_set_winner():
-    """Check if set is complete"""
-    global game_state
-    
-    if game_state['game_1'] >= 6 and game_state['game_1'] - game_state['game_2'] >= 2:
-        set_before = (game_state['set_1'], game_state['set_2'])
-        game_state['set_1'] += 1
-        game_state['set_history'].append(f"{game_state['game_1']}-{game_state['game_2']}")
-        add_to_history('set', 'black',
-                      (game_state['score_1'], game_state['score_2']),
-                      (0, 0),
-                      (game_state['game_1'], game_state['game_2']),
-                      (0, 0),
-                      set_before,
-                      (game_state['set_1'], game_state['set_2']))
-        game_state['game_1'] = 0
-        game_state['game_2'] = 0
-        return check_match_winner()
-    
-    elif game_state['game_2'] >= 6 and game_state['game_2'] - game_state['game_1'] >= 2:
-        set_before = (game_state['set_1'], game_state['set_2'])
-        game_state['set_2'] += 1
-        game_state['set_history'].append(f"{game_state['game_1']}-{game_state['game_2']}")
-        add_to_history('set', 'yellow',
-                      (game_state['score_1'], game_state['score_2']),
-                      (0, 0),
-                      (game_state['game_1'], game_state['game_2']),
-                      (0, 0),
-                      set_before,
-                      (game_state['set_1'], game_state['set_2']))
-        game_state['game_1'] = 0
-        game_state['game_2'] = 0
-        return check_match_winner()
-    
-    return False
+def sync_game_state():
+    """Copy the engine's score into game_state"""
+    game_state.update(match_state.as_dict(STATE_KEYS))
 
-def check_match_winner():
-    """Check if match is complete"""
-    global game_state
-    
-    if game_state['set_1'] >= 2:
-        game_state['match_won'] = True
-        game_state['match_end_time'] = datetime.now().isoformat()
-        game_state['winner'] = {
-            'team': 'black',
-            'team_name': 'BLACK TEAM',
-            'final_sets': f"{game_state['set_1']}-{game_state['set_2']}",
-            'match_summary': ', '.join(game_state['set_history']),
-            'total_games_won': sum(int(s.split('-')[0]) for s in game_state['set_history']) + game_state['game_1'],
-            'match_duration': calculate_match_duration()
-        }
-        add_to_history('match', 'black',
-                      (game_state['score_1'], game_state['score_2']),
-                      (game_state['score_1'], game_state['score_2']),
-                      (game_state['game_1'], game_state['game_2']),
-                      (game_state['game_1'], game_state['game_2']),
-                      (game_state['set_1'], game_state['set_2']),
-                      (game_state['set_1'], game_state['set_2']))
-        store_match_data()
-        return True
-    
-    elif game_state['set_2'] >= 2:
-        game_state['match_won'] = True
-        game_state['match_end_time'] = datetime.now().isoformat()
-        game_state['winner'] = {
-            'team': 'yellow',
-            'team_name': 'YELLOW TEAM',
-            'final_sets': f"{game_state['set_1']}-{game_state['set_2']}",
-            'match_summary': ', '.join(game_state['set_history']),
-            'total_games_won': sum(int(s.split('-')[1]) for s in game_state['set_history']) + game_state['game_2'],
-            'match_duration': calculate_match_duration()
-        }
-        add_to_history('match', 'yellow',
-                      (game_state['score_1'], game_state['score_2']),
-                      (game_state['score_1'], game_state['score_2']),
-                      (game_state['game_1'], game_state['game_2']),
-                      (game_state['game_1'], game_state['game_2']),
-                      (game_state['set_1'], game_state['set_2']),
-                      (game_state['set_1'], game_state['set_2']))
-        store_match_data()
-        return True
-    
-    return False
+def record_events(events):
+    """History entries and match data for scoring engine events; returns the point's action"""
+    action_type = 'point'
+    for kind, team, detail in events:
+        if kind == EVENT_GAME:
+            action_type = 'game'
+        elif kind == EVENT_SET:
+            add_to_history('set', TEAMS[team], detail.scores, (0, 0), detail.games, (0, 0),
+                           detail.sets_before, detail.sets)
+        elif kind == EVENT_MATCH_WON:
+            record_match_won(TEAMS[team])
+    return action_type
+
+def record_match_won(team):
+    """Winner details, history entry and stored match data"""
+    index = team_index(team)
+    game_state['match_end_time'] = datetime.now().isoformat()
+    game_state['winner'] = {
+        'team': team,
+        'team_name': f"{team.upper()} TEAM",
+        'final_sets': f"{game_state['set_1']}-{game_state['set_2']}",
+        'match_summary': ', '.join(game_state['set_history']),
+        'total_games_won': match_stats.total_games(index, game_state['game_1' if index == 0 else 'game_2']),
+        'match_duration': calculate_match_duration()
+    }
+    add_to_history('match', team,
+                  (game_state['score_1'], game_state['score_2']),
+                  (game_state['score_1'], game_state['score_2']),
+                  (game_state['game_1'], game_state['game_2']),
+                  (game_state['game_1'], game_state['game_2']),
+                  (game_state['set_1'], game_state['set_2']),
+                  (game_state['set_1'], game_state['set_2']))
+    store_match_data()
 
 def calculate_match_duration():
     """Calculate match duration"""
@@ -340,43 +318,13 @@ def process_add_point(team):
     score_before = (game_state['score_1'], game_state['score_2'])
     game_before = (game_state['game_1'], game_state['game_2'])
     set_before = (game_state['set_1'], game_state['set_2'])
-    action_type = 'point'
     
-    if team == 'black':
-        current_score = game_state['score_1']
-        if current_score == 0:
-            game_state['score_1'] = 15
-        elif current_score == 15:
-            game_state['score_1'] = 30
-        elif current_score == 30:
-            game_state['score_1'] = 40
-        elif current_score == 40:
-            game_state['game_1'] += 1
-            game_state['score_1'] = 0
-            game_state['score_2'] = 0
-            game_state['point_1'] = 0
-            game_state['point_2'] = 0
-            action_type = 'game'
-            check_set_winner()
-        game_state['point_1'] += 1
-    
-    elif team == 'yellow':
-        current_score = game_state['score_2']
-        if current_score == 0:
-            game_state['score_2'] = 15
-        elif current_score == 15:
-            game_state['score_2'] = 30
-        elif current_score == 30:
-            game_state['score_2'] = 40
-        elif current_score == 40:
-            game_state['game_2'] += 1
-            game_state['score_1'] = 0
-            game_state['score_2'] = 0
-            game_state['point_1'] = 0
-            game_state['point_2'] = 0
-            action_type = 'game'
-            check_set_winner()
-        game_state['point_2'] += 1
+    index = team_index(team)
+    mode = match_state.mode
+    events = apply_point(match_state, index, SCORING_RULES)
+    match_stats.record_point(index, mode, events)
+    sync_game_state()
+    action_type = record_events(events)
     
     if action_type in ['point', 'game'] and not game_state['match_won']:
         add_to_history(action_type, team,
@@ -420,33 +368,21 @@ def process_subtract_point(team):
     game_before = (game_state['game_1'], game_state['game_2'])
     set_before = (game_state['set_1'], game_state['set_2'])
     
-    if team == 'black':
-        current_score = game_state['score_1']
-        if current_score == 15:
-            game_state['score_1'] = 0
-        elif current_score == 30:
-            game_state['score_1'] = 15
-        elif current_score == 40:
-            game_state['score_1'] = 30
-        elif current_score == 0 and game_state['game_1'] > 0:
-            game_state['game_1'] -= 1
-            game_state['score_1'] = 40
-            game_state['score_2'] = 0
-            game_state['point_1'] = max(0, game_state['point_1'] - 1)
-    
-    elif team == 'yellow':
-        current_score = game_state['score_2']
-        if current_score == 15:
-            game_state['score_2'] = 0
-        elif current_score == 30:
-            game_state['score_2'] = 15
-        elif current_score == 40:
-            game_state['score_2'] = 30
-        elif current_score == 0 and game_state['game_2'] > 0:
-            game_state['game_2'] -= 1
-            game_state['score_2'] = 40
-            game_state['score_1'] = 0
-            game_state['point_2'] = max(0, game_state['point_2'] - 1)
+    index = team_index(team)
+    points = match_state.point2 if index else match_state.point1
+    games = match_state.game2 if index else match_state.game1
+    if points == 0 and games > 0:
+        # Nothing to take back in this game: reopen the last one at 40-0
+        if index:
+            match_state.game2 -= 1
+            match_state.point1, match_state.point2 = 0, 3
+        else:
+            match_state.game1 -= 1
+            match_state.point1, match_state.point2 = 3, 0
+        match_stats.record_subtract(index, SUBTRACT_EVENTS[index])
+    else:
+        match_stats.record_subtract(index, apply_subtract(match_state, index))
+    sync_game_state()
     
     add_to_history('point_subtract', team,
                   score_before,
@@ -489,6 +425,8 @@ def add_point():
     try:
         data = request.get_json()
         team = data.get('team', 'black')
+        if team not in TEAMS:
+            return jsonify({'success': False, 'error': f'Unknown team: {team}'}), 400
         result = process_add_point(team)
         if result['success']:
             return jsonify(result)
@@ -504,6 +442,8 @@ def subtract_point():
     try:
         data = request.get_json()
         team = data.get('team', 'black')
+        if team not in TEAMS:
+            return jsonify({'success': False, 'error': f'Unknown team: {team}'}), 400
         result = process_subtract_point(team)
         if result['success']:
             return jsonify(result)
@@ -515,8 +455,8 @@ def subtract_point():
 
 @app.route('/game_state', methods=['GET'])
 def get_game_state():
-    """Get current game state"""
-    response_data = game_state.copy()
+    """Get current game state (as last broadcast, with its version)"""
+    response_data = full_game_state()
     response_data['match_storage_available'] = match_storage['match_completed'] and not match_storage['display_shown']
     return jsonify(response_data)
 
@@ -555,15 +495,10 @@ def mark_match_displayed():
 
 @app.route('/match_history', methods=['GET'])
 def get_match_history():
-    """Get match history"""
-    global game_state
-    
-    black_points = len([h for h in game_state['match_history'] if h['action'] == 'point' and h['team'] == 'black'])
-    yellow_points = len([h for h in game_state['match_history'] if h['action'] == 'point' and h['team'] == 'yellow'])
-    black_games = len([h for h in game_state['match_history'] if h['action'] == 'game' and h['team'] == 'black'])
-    yellow_games = len([h for h in game_state['match_history'] if h['action'] == 'game' and h['team'] == 'yellow'])
-    black_sets = len([h for h in game_state['match_history'] if h['action'] == 'set' and h['team'] == 'black'])
-    yellow_sets = len([h for h in game_state['match_history'] if h['action'] == 'set' and h['team'] == 'yellow'])
+    """Get match history (?since=N&epoch=E&limit=N pages through detailed_history, 500 at most)"""
+    history = match_history.page(request.args.get('since', 0, type=int),
+                                 request.args.get('epoch', None, type=int),
+                                 request.args.get('limit', None, type=int))
     
     match_info = {
         'start_time': game_state['match_start_time'],
@@ -571,22 +506,26 @@ def get_match_history():
         'duration': calculate_match_duration(),
         'winner': game_state['winner'] if game_state['match_won'] else None,
         'match_completed': game_state['match_won'],
-        'total_actions': len(game_state['match_history'])
+        'total_actions': len(match_history)
     }
     
     statistics = {
         'black_team_stats': {
-            'points_won': black_points,
-            'games_won': black_games,
-            'sets_won': black_sets,
+            'points_won': match_stats.points[0],
+            'games_won': match_stats.games[0],
+            'sets_won': match_stats.sets[0],
+            'longest_run': match_stats.longest_run[0],
+            'subtractions': match_stats.subtractions[0],
             'current_score': game_state['score_1'],
             'current_games': game_state['game_1'],
             'current_sets': game_state['set_1']
         },
         'yellow_team_stats': {
-            'points_won': yellow_points,
-            'games_won': yellow_games,
-            'sets_won': yellow_sets,
+            'points_won': match_stats.points[1],
+            'games_won': match_stats.games[1],
+            'sets_won': match_stats.sets[1],
+            'longest_run': match_stats.longest_run[1],
+            'subtractions': match_stats.subtractions[1],
             'current_score': game_state['score_2'],
             'current_games': game_state['game_2'],
             'current_sets': game_state['set_2']
@@ -597,7 +536,8 @@ def get_match_history():
         'success': True,
         'match_info': match_info,
         'statistics': statistics,
-        'detailed_history': game_state['match_history'],
+        'detailed_history': history['entries'],
+        'history_page': {key: history[key] for key in ('since', 'next', 'total', 'epoch', 'truncated')},
         'set_history': game_state['set_history'],
         'current_state': {
             'score_1': game_state['score_1'],
@@ -613,22 +553,16 @@ def get_match_history():
 @app.route('/reset_match', methods=['POST'])
 def reset_match():
     """Reset match"""
-    global game_state, match_storage
+    global game_state, match_storage, match_state, match_stats, match_history
     
     wipe_match_storage()
+    match_state = MatchState()
+    match_stats = MatchStats()
+    match_history = MatchHistory(key_style='_')
     game_state = {
-        'score_1': 0,
-        'score_2': 0,
-        'point_1': 0,
-        'point_2': 0,
-        'game_1': 0,
-        'game_2': 0,
-        'set_1': 0,
-        'set_2': 0,
-        'match_won': False,
+        **match_state.as_dict(STATE_KEYS),
         'winner': None,
-        'set_history': [],
-        'match_history': [],
+        'history_length': 0,
         'match_start_time': datetime.now().isoformat(),
         'match_end_time': None,
         'last_updated': datetime.now().isoformat()
@@ -655,7 +589,9 @@ def health_check():
         'socketio': 'enabled',
         'game_state': game_state,
         'match_status': 'completed' if game_state['match_won'] else 'in_progress',
-        'history_entries': len(game_state['match_history']),
+        'history_entries': len(match_history),
+        'codec': json_codec.describe(SOCKETIO_SERIALIZER),
+        'server': server.stats(),
         'match_storage': {
             'completed': match_storage['match_completed'],
             'displayed': match_storage['display_shown']
@@ -674,8 +610,10 @@ if __name__ == '__main__':
     print("🏓 Starting Padel Scoreboard Server with Socket.IO...")
     print("=" * 70)
     print("🔌 Socket.IO enabled for real-time updates")
+    print("🧾 JSON codec: {json}, Socket.IO payloads: {socketio}".format(**json_codec.describe(SOCKETIO_SERIALIZER)))
+    print(f"🧵 Server mode: {server.name}")
     print("🌐 Access at: http://127.0.0.1:5000")
     print("=" * 70)
     
     # LOCALHOST ONLY - For offline Raspberry Pi operation
-    socketio.run(app, debug=False, host='127.0.0.1', port=5000, allow_unsafe_werkzeug=True)
+    server.run(socketio, app, '127.0.0.1', 5000)
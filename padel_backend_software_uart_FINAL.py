@@ -9,19 +9,66 @@ Key behavior:
 - ✅ NO SIDE SWITCH NOTIFICATION when match is won (2-0, 2-1, etc.)
 - ✅ Automatic ball detection via VL53L5CX sensors through Picos
 - ✅ Reads from named pipes as files (not serial ports)
+- ✅ Accepts binary CRC-checked frames as well as legacy DATA_START/DATA_END text
+- ✅ Optional edge detection: bridge.py sends DETECT events instead of every frame
+- ✅ Per-Pico NumPy frame history; detection runs vectorized over the newest frames
+- ✅ Per-zone baselines calibrated at startup, median filter, GOOD_ZONES and min-zones check
+- ✅ 4x4 and 8x8 sensor resolution per Pico, taken from the frames themselves
+- ✅ /picodata and /health read published snapshots, never the ingest lock
+- ✅ Opt-in live frame stream for diagnostics on the /sensors Socket.IO namespace
+- ✅ Supervised reader threads; pipes/rings reopened via inotify the moment bridge.py recreates them
+- ✅ One scoring thread applies every score change in order; readers get versioned snapshots
+- ✅ Scoring rules live in scoring_engine.py (no Flask); this file turns its events into history/broadcasts
+- ✅ Running match statistics (match_stats.py) updated per point, served without rescanning history
+- ✅ Undo/redo of any number of points, games and sets from a command log with snapshots (match_log.py)
+- ✅ Match history kept in compact columns (match_history.py), served in pages from /matchhistory only
+- ✅ Versioned delta broadcasts: gamestatedelta carries only changed fields (state_delta.py)
+- ✅ One combined scoringupdate per scoring batch (or window) instead of an emit per event (broadcast_scheduler.py)
+- ✅ Polled GETs served from pre-encoded, ETag'd bodies until scoring changes something (response_cache.py)
+- ✅ jsonify, Socket.IO packets and cached bodies share one codec: orjson when installed, else stdlib (json_codec.py)
+- ✅ eventlet/gevent serving mode for many displays; Pico ingest and scoring stay on OS threads (server_mode.py)
 """
 
+import os
+import server_mode
+
+# "threading" (Werkzeug, a thread per client) or "eventlet"/"gevent" (one event loop for every display)
+SERVER_MODE = os.environ.get("PADEL_SERVER_MODE", "threading")
+server = server_mode.select(SERVER_MODE)        # Before Flask: the event loop modes patch socket
+
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 from datetime import datetime
 import threading
 import logging
-import os
 import time
 import pygame
 
+from pico_detect import BallDetector
+from pico_frames import FrameParser, ZONE_COUNTS, resolution_label
+from pico_history import FrameHistory, ZoneBaseline
+from pico_ingest import IngestLoop, LinkMetrics, PathWatcher, ThreadSupervisor, RETRY_MIN_DELAY, RETRY_MAX_DELAY
+from pico_ring import RingReader, SHM_DIR
+from pico_snapshot import PicoSnapshot, SnapshotBoard, frame_dicts
+import json_codec
+from broadcast_scheduler import BroadcastScheduler
+from match_history import MatchHistory
+from match_log import STEPS_ERROR, MatchLog, parse_steps
+from match_stats import ADD_POINT, SUBTRACT_POINT, MatchStats
+from pico_stream import NAMESPACE as SENSOR_NAMESPACE, SensorStream
+from response_cache import ResponseCache
+from scoring_engine import (MatchState, Rules, TEAMS, SUPERTIEBREAK, EVENT_GAME, EVENT_SET,
+                            EVENT_TIEBREAK, EVENT_SIDE_SWITCH, EVENT_MATCH_WON,
+                            apply_point, apply_subtract, apply_basic_side_switch, team_index)
+from scoring_queue import ScoringQueue
+from state_delta import StateDeltas
+
+# "json" (orjson or stdlib) or "msgpack" - msgpack needs socket.io-msgpack-parser in every display
+SOCKETIO_SERIALIZER = "json"
+
 app = Flask(__name__)
+app.json = json_codec.FastJSONProvider(app)
 CORS(app, cors_allowed_origins="*")
 
 # Silence werkzeug logs
@@ -31,21 +78,32 @@ log.setLevel(logging.ERROR)
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
-    async_mode='threading',
+    async_mode=server.name,
     logger=False,
     engineio_logger=False,
     ping_timeout=60,
-    ping_interval=25
+    ping_interval=25,
+    **json_codec.socketio_options(SOCKETIO_SERIALIZER)
 )
 
+# Emits from the scoring, Pico and validation threads; queued onto the event loop in eventlet/gevent mode
+emit_to_clients = server.threadsafe(socketio.emit)
+
 # ✅ INITIALIZE PYGAME MIXER FOR AUDIO
 pygame.mixer.init()
 print("🔊 Audio system initialized")
 
 # ===== PICO UART CONFIGURATION (Named Pipes from Bridge) =====
+# "fifo": parse raw bytes from the bridge's named pipes
+# "shm":  read parsed frames from shared-memory rings (bridge.py --transport shm)
+PICO_TRANSPORT = "fifo"
+RING_POLL_INTERVAL = 0.005
+
 PICO_CONFIGS = {
     "PICO_1": {
         "port": "/tmp/pico1_serial",
+        "ring": "pico1_frames",
+        "zones": 16,
         "baudrate": 57600,
         "timeout": 1,
         "team": "black",
@@ -53,6 +111,8 @@ PICO_CONFIGS = {
     },
     "PICO_2": {
         "port": "/tmp/pico2_serial",
+        "ring": "pico2_frames",
+        "zones": 16,
         "baudrate": 57600,
         "timeout": 1,
         "team": "yellow",
@@ -60,9 +120,33 @@ PICO_CONFIGS = {
     }
 }
 
+# "zones" is the resolution each Pico starts with (16 = 4x4, 64 = 8x8). Frames
+# carry their own zone count, so a Pico switched to the other resolution is
+# followed automatically (its history and baselines start over).
+
 # Detection thresholds (mm)
 DETECTION_THRESHOLD = 1000
 MIN_TIME_BETWEEN_HITS = 1.0
+CONFIRM_FRAMES = 1          # Consecutive frames under the threshold needed for a hit
+
+# "threshold": a hit is any zone closer than DETECTION_THRESHOLD
+# "baseline":  like sensor/sensorfinal1.py - per-zone baselines calibrated from
+#              the first seconds of frames, median filter, GOOD_ZONES mask and
+#              MIN_ZONES_FOR_DETECTION (threshold rule until calibrated)
+DETECTION_MODE = "baseline"
+BASELINE_CALIBRATION_SECONDS = 3.0
+BASELINE_THRESHOLD = 150    # mm closer than the zone's baseline
+MEDIAN_WINDOW = 3
+GOOD_ZONES = [0, 5, 6, 9, 10, 11, 12, 13]     # 4x4 zones; at 8x8 the 2x2 blocks they cover
+MIN_ZONES_FOR_DETECTION = 3
+
+# Frames of history kept per Pico (GET /picodata?frames=N returns up to this many)
+HISTORY_FRAMES = 256
+
+# "backend": detect hits on every frame here
+# "bridge":  bridge.py --edge-detect detects hits itself and only sends DETECT
+#            events (plus optional decimated frames for /picodata)
+PICO_DETECTION = "backend"
 
 # ===== SENSOR/PICO STATE =====
 sensor_validation = {
@@ -79,26 +163,51 @@ sensor_validation = {
 pico_data = {
     "PICO_1": {
         "connected": False,
-        "last_frame": None,
         "frame_count": 0,
         "error_count": 0,
-        "last_detection": 0,
-        "pipe_fd": None,
+        "dropped_frames": 0,
+        "overruns": 0,
+        "link": LinkMetrics().to_json(),
         "thread": None
     },
     "PICO_2": {
         "connected": False,
-        "last_frame": None,
         "frame_count": 0,
         "error_count": 0,
-        "last_detection": 0,
-        "pipe_fd": None,
+        "dropped_frames": 0,
+        "overruns": 0,
+        "link": LinkMetrics().to_json(),
         "thread": None
     }
 }
 
+pico_detectors = {
+    pico_name: BallDetector(DETECTION_THRESHOLD, MIN_TIME_BETWEEN_HITS)
+    for pico_name in PICO_CONFIGS
+}
+
+def make_baseline(zones):
+    return ZoneBaseline(zones, good_zones=GOOD_ZONES, threshold=BASELINE_THRESHOLD,
+                        min_zones=MIN_ZONES_FOR_DETECTION, median_window=MEDIAN_WINDOW,
+                        calibration_seconds=BASELINE_CALIBRATION_SECONDS)
+
+pico_history = {
+    pico_name: FrameHistory(HISTORY_FRAMES, config["zones"])
+    for pico_name, config in PICO_CONFIGS.items()
+}
+
+pico_baselines = {pico_name: make_baseline(config["zones"]) for pico_name, config in PICO_CONFIGS.items()}
+
+# Reader threads publish each Pico's state here after every batch; HTTP
+# handlers read it without data_lock (see pico_snapshot.py)
+pico_snapshots = SnapshotBoard(PICO_CONFIGS)
+for pico_name, config in PICO_CONFIGS.items():
+    pico_snapshots.update(pico_name, zones=config["zones"])
+
 data_lock = threading.Lock()
 sensor_running = True
+pico_ingest = None
+pico_supervisor = None
 
 # ===== SENSOR MAPPING (for side switching) =====
 sensor_mapping = {
@@ -117,8 +226,10 @@ def get_team_from_pico(pico_name):
 
 # ===== PICO VALIDATION =====
 def test_pico_connection(pico_name, config):
-    """Test if Pico named pipe exists"""
+    """Test if Pico named pipe (or shared-memory ring) exists"""
     try:
+        if PICO_TRANSPORT == "shm":
+            return os.path.exists(os.path.join(SHM_DIR, config["ring"]))
         return os.path.exists(config["port"])
     except Exception as e:
         return False
@@ -179,206 +290,250 @@ def validate_picos():
 def run_initial_sensor_validation():
     time.sleep(2)
     validate_picos()
-    socketio.emit('sensor_validation_result', sensor_validation)
+    emit_to_clients('sensor_validation_result', sensor_validation)
     print(f"→ Pico validation result broadcasted: {sensor_validation['status']}")
 
 # ===== PICO DATA READING THREADS =====
-def read_pico_data(pico_name, config):
-    """Thread function to continuously read data from one Pico via named pipe AS A FILE"""
-    global sensor_running, pico_data
+def set_pico_resolution(pico_name, zones):
+    """The Pico now sends zones-zone frames: start a new history and baseline (lock held)"""
+    old_zones = pico_history[pico_name].zones
+    pico_history[pico_name] = FrameHistory(HISTORY_FRAMES, zones)
+    pico_baselines[pico_name] = make_baseline(zones)
+    print(f"[{pico_name}] 🔄 Resolution changed from {resolution_label(old_zones)} "
+          f"to {resolution_label(zones)} - recalibrating")
+    return pico_history[pico_name]
+
+def store_pico_frames(pico_name, frames, timestamp):
+    """Copy (distances, statuses) frames into the Pico's history; return how many fit (lock held)"""
+    history = pico_history[pico_name]
+    stored = 0
+    for distances, statuses in frames:
+        if len(distances) != history.zones and len(distances) in ZONE_COUNTS:
+            pico_data[pico_name]["frame_count"] += stored
+            history = set_pico_resolution(pico_name, len(distances))
+            stored = 0      # Only frames in the new history are up for detection
+        try:
+            history.append(distances, statuses, timestamp)
+            stored += 1
+        except ValueError:
+            pico_data[pico_name]["error_count"] += 1
+    pico_data[pico_name]["frame_count"] += stored
+    return stored
+
+def publish_pico_snapshot(pico_name):
+    """Publish the Pico's current state for lock-free readers (its reader thread only)"""
+    state = pico_data[pico_name]
+    history = pico_history[pico_name]
+    distances = statuses = timestamp = None
+    if history.total:
+        row = (history.total - 1) % history.capacity
+        distances = tuple(history.distances[row].tolist())
+        statuses = tuple(history.statuses[row].tolist())
+        timestamp = float(history.timestamps[row])
+    pico_snapshots.publish(pico_name, PicoSnapshot(
+        state["connected"], state["frame_count"], state["error_count"], state["dropped_frames"],
+        state["overruns"], history.zones, timestamp, distances, statuses,
+        pico_baselines[pico_name].to_json(), state["link"]
+    ))
+    sensor_stream.notify()
+
+def handle_pico_frames(pico_name, frames, errors, parser):
+    """Ingest loop callback: store the frames of one pipe read and run detection"""
+    stored = 0
+    with data_lock:
+        pico_data[pico_name]["error_count"] += errors
+        if frames:
+            stored = store_pico_frames(pico_name, frames, time.time())
+            pico_data[pico_name]["dropped_frames"] = parser.dropped_frames
+
+    try:
+        for event in parser.pop_events():
+            handle_detection_event(pico_name, event)
+        if PICO_DETECTION == "backend" and stored:
+            process_ball_detection(pico_name, stored)
+    except Exception as e:
+        with data_lock:
+            pico_data[pico_name]["error_count"] += 1
+        print(f"[{pico_name}] ✗ Detection error: {e}")
+
+    publish_pico_snapshot(pico_name)
+
+def handle_pico_state(pico_name, connected):
+    """Ingest loop callback: a pipe started or stopped delivering data"""
+    with data_lock:
+        pico_data[pico_name]["connected"] = connected
+        pico_data[pico_name]["link"] = pico_ingest.sources[pico_name].link.to_json()
+    publish_pico_snapshot(pico_name)
+
+    if connected:
+        print(f"[{pico_name}] ✓ Receiving data from {PICO_CONFIGS[pico_name]['port']}")
+    else:
+        print(f"[{pico_name}] ⚠ Connection lost. Waiting for bridge...")
+
+def run_pico_ingest():
+    """Thread function: one selectors/epoll loop reading every Pico pipe"""
+    global pico_ingest
 
-    pipe_fd = None
-    reconnect_attempts = 0
-    max_reconnect = 5
+    loop = IngestLoop(handle_pico_frames, handle_pico_state)
+    for pico_name, config in PICO_CONFIGS.items():
+        loop.add_source(pico_name, config["port"], FrameParser(compact=True))
+        print(f"📡 Watching {config['port']} for {pico_name}")
+    if loop.watcher is None:
+        print("⚠ inotify not available - recreated pipes are picked up by polling")
+
+    pico_ingest = loop
+    loop.run()
+    print("📡 Pico ingest loop stopped")
+
+def read_pico_ring(pico_name, config):
+    """Thread function to read parsed frames from the bridge's shared-memory ring"""
+    global sensor_running, pico_data
 
-    print(f"📡 Starting reader thread for {pico_name}")
+    reader = None
+    link = LinkMetrics()
+    ring_path = os.path.join(SHM_DIR, config["ring"])
+    retry_delay = RETRY_MIN_DELAY
+    watcher = PathWatcher.create()
+    if watcher is not None:
+        watcher.watch(ring_path)
+    print(f"📡 Starting ring reader thread for {pico_name}")
 
     while sensor_running:
         try:
-            if pipe_fd is None:
-                if not os.path.exists(config["port"]):
-                    if reconnect_attempts == 0:
-                        print(f"[{pico_name}] ⏳ Waiting for named pipe: {config['port']}")
-                        print(f"[{pico_name}] 💡 Make sure pigpio_uart_bridge.py is running!")
-                    time.sleep(2)
-                    reconnect_attempts += 1
-                    if reconnect_attempts > max_reconnect:
-                        print(f"[{pico_name}] ✗ Named pipe not available after {max_reconnect} attempts")
-                        break
-                    continue
-
-                # ✅ Open named pipe as a regular file (blocking mode)
-                pipe_fd = open(config["port"], 'rb', buffering=0)
-
+            if reader is None:
+                reader = RingReader(config["ring"])
+                retry_delay = RETRY_MIN_DELAY
+                link.restored(time.monotonic())
                 with data_lock:
                     pico_data[pico_name]["connected"] = True
-                    pico_data[pico_name]["pipe_fd"] = pipe_fd
-
-                print(f"[{pico_name}] ✓ Connected to {config['port']}")
-                reconnect_attempts = 0
-
-            # Read from pipe line by line
-            try:
-                # Read one line
-                line_bytes = b''
-                while True:
-                    byte = pipe_fd.read(1)
-                    if not byte:
-                        raise IOError("Pipe closed")
-                    if byte == b'\n':
-                        break
-                    line_bytes += byte
-
-                    # Prevent infinite loop on malformed data
-                    if len(line_bytes) > 1000:
-                        line_bytes = b''
-                        break
-
-                line = line_bytes.decode('utf-8', errors='ignore').strip()
-
-                if line == "DATA_START":
-                    zones = []
-                    for i in range(16):
-                        data_line_bytes = b''
-                        while True:
-                            byte = pipe_fd.read(1)
-                            if not byte:
-                                raise IOError("Pipe closed")
-                            if byte == b'\n':
-                                break
-                            data_line_bytes += byte
-                            if len(data_line_bytes) > 100:
-                                break
-
-                        data_line = data_line_bytes.decode('utf-8', errors='ignore').strip()
-                        try:
-                            distance, status = data_line.split(',')
-                            zones.append({
-                                "zone": i,
-                                "distance_mm": int(distance),
-                                "status": int(status)
-                            })
-                        except:
-                            with data_lock:
-                                pico_data[pico_name]["error_count"] += 1
-                            continue
-
-                    # Read DATA_END marker
-                    end_marker_bytes = b''
-                    while True:
-                        byte = pipe_fd.read(1)
-                        if not byte:
-                            raise IOError("Pipe closed")
-                        if byte == b'\n':
-                            break
-                        end_marker_bytes += byte
-                        if len(end_marker_bytes) > 100:
-                            break
-
-                    end_marker = end_marker_bytes.decode('utf-8', errors='ignore').strip()
-
-                    if end_marker == "DATA_END" and len(zones) == 16:
-                        with data_lock:
-                            pico_data[pico_name]["last_frame"] = zones
-                            pico_data[pico_name]["frame_count"] += 1
-                            pico_data[pico_name]["connected"] = True
-
-                        process_ball_detection(pico_name, zones)
-
-            except IOError:
-                raise
-
-        except (IOError, OSError) as e:
-            with data_lock:
-                pico_data[pico_name]["connected"] = False
+                    pico_data[pico_name]["link"] = link.to_json()
+                publish_pico_snapshot(pico_name)
+                print(f"[{pico_name}] ✓ Attached to shared-memory ring {config['ring']}")
+            elif reader.replaced():
+                raise FileNotFoundError("Ring recreated by bridge")
 
-            if pipe_fd:
-                try:
-                    pipe_fd.close()
-                except:
-                    pass
-                pipe_fd = None
+            frames = reader.read()
+            if not frames:
+                time.sleep(RING_POLL_INTERVAL)
+                continue
 
-            reconnect_attempts += 1
+            with data_lock:
+                stored = store_pico_frames(pico_name, [frame[2:] for frame in frames], time.time())
+                pico_data[pico_name]["overruns"] = reader.overruns
+                pico_data[pico_name]["connected"] = True
+
+            if stored:
+                process_ball_detection(pico_name, stored)
+            publish_pico_snapshot(pico_name)
+
+        except (FileNotFoundError, ValueError) as e:
+            if reader is not None:
+                reader.close()
+                reader = None
+                link.lost(time.monotonic())
+                link.reconnects += 1
+                print(f"[{pico_name}] ⚠ Ring lost ({e}). Reattaching...")
+            with data_lock:
+                pico_data[pico_name]["connected"] = False
+                pico_data[pico_name]["link"] = link.to_json()
+            publish_pico_snapshot(pico_name)
 
-            if reconnect_attempts <= max_reconnect:
-                print(f"[{pico_name}] ⚠ Connection lost. Reconnecting... ({reconnect_attempts}/{max_reconnect})")
-                time.sleep(2)
-            else:
-                print(f"[{pico_name}] ✗ Max reconnection attempts reached. Stopping thread.")
-                break
+            # Retry with capped backoff, or as soon as the ring (re)appears
+            if watcher is None:
+                time.sleep(retry_delay)
+            elif ring_path in (path for path, _ in watcher.wait(retry_delay)):
+                continue
+            retry_delay = min(retry_delay * 2, RETRY_MAX_DELAY)
 
         except Exception as e:
             with data_lock:
                 pico_data[pico_name]["error_count"] += 1
+            publish_pico_snapshot(pico_name)
             time.sleep(0.1)
 
-    if pipe_fd:
-        try:
-            pipe_fd.close()
-        except:
-            pass
-
-    print(f"[{pico_name}] Thread stopped")
-
-def process_ball_detection(pico_name, zones):
-    """Detect ball hit based on distance threshold"""
-    global pico_data, game_state
+    if reader is not None:
+        reader.close()
+    if watcher is not None:
+        watcher.close()
 
-    min_distance = min(zone["distance_mm"] for zone in zones)
+    print(f"[{pico_name}] Ring reader stopped")
 
-    if min_distance < DETECTION_THRESHOLD:
-        current_time = time.time()
+def process_ball_detection(pico_name, new_frames):
+    """Detect ball hits in the newest frames of the Pico's history (reader thread only)"""
+    detector = pico_detectors[pico_name]
+    history = pico_history[pico_name]
 
-        with data_lock:
-            last_detection = pico_data[pico_name]["last_detection"]
+    baseline = pico_baselines[pico_name] if DETECTION_MODE == "baseline" else None
+    if baseline is not None and baseline.reset_pending:
+        baseline.reset()                # Asked for by /calibratesensors
+    if baseline is not None and not baseline.calibrated:
+        if baseline.calibrate(history):
+            print(f"[{pico_name}] ✓ Zone baselines calibrated: {baseline.to_json()['baseline']}")
+        else:
+            baseline = None
 
-            if current_time - last_detection < MIN_TIME_BETWEEN_HITS:
-                return
+    hits = history.hits(new_frames, DETECTION_THRESHOLD, CONFIRM_FRAMES, baseline)
 
-            pico_data[pico_name]["last_detection"] = current_time
+    for min_distance, timestamp in hits:
+        if detector.trigger(min_distance, timestamp) is not None:
+            score_ball_detection(pico_name, min_distance)
 
-        team = get_team_from_pico(pico_name)
+def handle_detection_event(pico_name, event):
+    """DETECT event from bridge.py in edge mode (already debounced there)"""
+    latency_ms = (time.time() - event["timestamp"]) * 1000
+    print(f"📨 Edge detection from {pico_name} ({latency_ms:.0f}ms after bridge)")
+    score_ball_detection(pico_name, event["distance_mm"])
 
-        print(f"🎾 Ball detected on {pico_name} (Team: {team.upper()}) - Distance: {min_distance}mm")
+def score_ball_detection(pico_name, min_distance):
+    """Queue a point for the team on this Pico's side (reader threads never wait for scoring)"""
+    scoring.submit("detection", pico_name, min_distance)
 
-        if game_state["gamemode"] is not None:
-            process_add_point(team)
-        else:
-            print(f"⚠ Ball detected but game mode not selected - ignoring")
+def report_reader_restart(name, restarts, error):
+    """Supervisor callback: a reader thread died and was started again"""
+    print(f"🔁 Restarted reader thread {name} (restart #{restarts}, last error: {error})")
 
 def start_pico_readers():
-    """Start reader threads for both Picos"""
-    global pico_data
+    """Start the pipe ingest loop (fifo) or one ring reader per Pico (shm), supervised"""
+    global pico_data, pico_supervisor
+
+    pico_supervisor = ThreadSupervisor(report_reader_restart)
+    if PICO_TRANSPORT != "shm":
+        task = pico_supervisor.add("pico-ingest", run_pico_ingest)
+        for pico_name in PICO_CONFIGS:
+            pico_data[pico_name]["thread"] = task
+    else:
+        for pico_name, config in PICO_CONFIGS.items():
+            pico_data[pico_name]["thread"] = pico_supervisor.add(
+                f"ring-{pico_name}", read_pico_ring, (pico_name, config))
 
-    for pico_name, config in PICO_CONFIGS.items():
-        thread = threading.Thread(
-            target=read_pico_data,
-            args=(pico_name, config),
-            daemon=True
-        )
-        thread.start()
-        pico_data[pico_name]["thread"] = thread
-        print(f"✓ Reader thread started for {pico_name}")
+    pico_supervisor.start()
+    for name in pico_supervisor.tasks:
+        print(f"✓ Reader thread {name} started")
 
 # ===== GAME STATE =====
+# Advantage scoring, tie-break at 6-6, super tie-break when the sets are 1-1
+SCORING_RULES = Rules()
+
+# The score itself lives in match_state (scoring_engine.MatchState);
+# game_state mirrors it for clients and adds history and timestamps
+match_state = MatchState()
+
+# Points, games, runs... counted as they happen (match_stats.py)
+match_stats = MatchStats()
+
+# Point-by-point history; not part of game_state, clients page through /matchhistory
+match_history = MatchHistory()
+
+# Every applied add/subtract command, for undo and redo (match_log.py)
+match_log = MatchLog(SCORING_RULES)
+
 game_state = {
-    "game1": 0, "game2": 0,
-    "set1": 0, "set2": 0,
-    "point1": 0, "point2": 0,
-    "score1": 0, "score2": 0,
-    "matchwon": False,
+    **match_state.as_dict(),
     "winner": None,
-    "sethistory": [],
-    "matchhistory": [],
+    "historylength": 0,
     "matchstarttime": datetime.now().isoformat(),
     "matchendtime": None,
-    "lastupdated": datetime.now().isoformat(),
-    "shouldswitchsides": False,
-    "totalgamesinset": 0,
-    "initial_switch_done": False,
-    "mode": "normal",
-    "gamemode": None
+    "lastupdated": datetime.now().isoformat()
 }
 
 match_storage = {
@@ -397,6 +552,72 @@ match_storage = {
     "displayshown": False
 }
 
+# ===== BROADCASTS =====
+# Scoring events and state changes go out as one scoringupdate message per
+# flush (see broadcast_scheduler.py). BROADCAST_WINDOW = 0 flushes after every
+# scoring batch; > 0 gathers for that many seconds after the first change
+# (HTTP readers then see the new state up to that late as well).
+# COALESCE_BROADCASTS = False sends pointscored, sideswitchrequired, ... and
+# gamestatedelta as separate events, for clients that listen to those.
+BROADCAST_WINDOW = 0.0
+COALESCE_BROADCASTS = True
+
+# /gamestate, /getmatchdata and /getsensormapping are re-encoded only after a
+# new state version (or a match storage / Pico mapping change); /health also shows live Pico counters, so at most this old
+HEALTH_CACHE_SECONDS = 1.0
+
+# ===== SCORING ACTOR =====
+# game_state, match_storage and sensor_mapping are only changed by commands
+# running on the scoring thread (see scoring_queue.py). Other threads read
+# published_gamestate, which is replaced after every batch of commands.
+#
+# Clients get the full state (with its version) on connect and on
+# request_gamestate, then one scoringupdate per flush that changed it:
+# {"version": N, "changes": {field: value}, "events": [...]}. A client whose
+# version is not N - 1 (when changes is not empty) missed one and sends
+# request_gamestate.
+def snapshot_gamestate():
+    """Copy of game_state that other threads can serialize (scoring thread only)"""
+    return dict(game_state, sethistory=list(game_state["sethistory"]))
+
+def publish_gamestate(version, changed, commands):
+    """Scoring batch callback: publish the new state and broadcast what changed, once"""
+    global published_gamestate, published_stats
+    if changed:
+        broadcasts.hold()
+    if not broadcasts.due():
+        return
+    delta = state_deltas.update(game_state)
+    if delta is not None:
+        published_gamestate = state_deltas.snapshot()
+        published_stats = calculate_match_statistics()
+        responses.invalidate()          # New state version; read-only batches keep the cache
+    broadcasts.flush(delta, state_deltas.version)
+
+def emit_broadcast(event, data):
+    emit_to_clients(event, data, namespace='/')
+
+def cached_json(name, build, max_age=None):
+    """Response for a cached GET endpoint; build() -> (data, status) when the body is stale"""
+    status, body, headers = responses.lookup(name, build, request.headers.get("If-None-Match", ""),
+                                             request.headers.get("Accept-Encoding", ""), max_age)
+    return app.response_class(body, status=status, headers=headers)
+
+responses = ResponseCache(json_codec.dumps_bytes)
+
+scoring = ScoringQueue(on_batch=publish_gamestate, wait=server.wait)
+broadcasts = BroadcastScheduler(emit_broadcast, BROADCAST_WINDOW, COALESCE_BROADCASTS,
+                                wake=lambda: scoring.submit("flushbroadcasts"))
+
+@scoring.command("flushbroadcasts")
+def flush_broadcasts():
+    """No-op: the batch it runs in ends the broadcast window"""
+
+state_deltas = StateDeltas()
+state_deltas.update(game_state)
+published_gamestate = state_deltas.snapshot()
+published_stats = None
+
 # ===== AUDIO PLAYBACK =====
 def play_change_audio():
     """Play change.mp3 when side switch is required"""
@@ -411,63 +632,28 @@ def play_change_audio():
         print(f"❌ Error playing audio: {e}")
 
 # ===== SIDE SWITCHING =====
+@scoring.command("basicsideswitch")
 def trigger_basic_mode_side_switch_if_needed():
     """BASIC MODE: Trigger side switch immediately when a new set starts."""
-    global game_state
-
     if game_state["matchwon"]:
         print("⛔ BASIC MODE: Side switch skipped - match already won")
         return
 
-    if game_state["gamemode"] != "basic":
-        return
-
-    total_games = game_state["game1"] + game_state["game2"]
-    set1 = game_state["set1"]
-    set2 = game_state["set2"]
-    total_sets = set1 + set2
-
-    if total_sets == 0 and total_games == 0:
-        print(f"→ BASIC MODE: Skipping side switch at match start (0-0, 0-0)")
-        return
-
-    if (total_games == 0 and total_sets in [1, 2] and not game_state.get("initial_switch_done", False)):
-        game_state["initial_switch_done"] = True
-        game_state["shouldswitchsides"] = True
-        game_state["totalgamesinset"] = 0
-        broadcast_sideswitch()
-        print(f"→ BASIC MODE: Side switch triggered at START of set (Sets {set1}-{set2}, Games 0-0)")
-
-def check_side_switch():
-    """Switch after odd games in competition/lock; basic only switches at start-of-set."""
-    global game_state
-
-    if game_state["matchwon"]:
-        print("⛔ Side switch check skipped - match already won")
-        return False
-
-    total_games = game_state["game1"] + game_state["game2"]
-    mode = game_state["gamemode"]
-
-    if mode == "basic":
-        return False
-
-    if (total_games % 2) == 1:
-        game_state["shouldswitchsides"] = True
-        game_state["totalgamesinset"] = total_games
-        return True
-
-    game_state["shouldswitchsides"] = False
-    return False
+    events = apply_basic_side_switch(match_state, SCORING_RULES)
+    if events:
+        sync_gamestate()
+        record_events(events)
+        print(f"→ BASIC MODE: Side switch triggered at START of set "
+              f"(Sets {game_state['set1']}-{game_state['set2']}, Games 0-0)")
 
 # ===== SOCKET.IO HANDLERS =====
 @socketio.on('connect')
 def handle_connect():
     print(f"✓ Client connected: {request.sid}")
-    emit('gamestateupdate', game_state)
+    emit('gamestateupdate', published_gamestate)
     emit('sensor_validation_result', sensor_validation)
-    if game_state["gamemode"] == "basic":
-        trigger_basic_mode_side_switch_if_needed()
+    if published_gamestate["gamemode"] == "basic":
+        scoring.submit("basicsideswitch")
     return True
 
 @socketio.on('disconnect')
@@ -476,24 +662,64 @@ def handle_disconnect():
 
 @socketio.on('request_gamestate')
 def handle_request_gamestate():
-    emit('gamestateupdate', game_state)
+    emit('gamestateupdate', published_gamestate)
+
+@socketio.on('undo')
+def handle_undo(data=None):
+    """Socket.IO undo; the result goes back as the acknowledgement"""
+    steps = parse_steps(data)
+    if steps is None:
+        return {"success": False, "error": STEPS_ERROR}
+    return scoring.call("undo", steps)
+
+@socketio.on('redo')
+def handle_redo(data=None):
+    steps = parse_steps(data)
+    if steps is None:
+        return {"success": False, "error": STEPS_ERROR}
+    return scoring.call("redo", steps)
 
 @socketio.on('request_sensor_validation')
 def handle_request_sensor_validation():
     emit('sensor_validation_result', sensor_validation)
 
+# ===== SENSOR STREAM (/sensors namespace, see pico_stream.py) =====
+def emit_sensor_frame(event, data, sid, callback):
+    emit_to_clients(event, data, to=sid, namespace=SENSOR_NAMESPACE, callback=callback)
+
+sensor_stream = SensorStream(emit_sensor_frame, pico_snapshots.all)
+
+@socketio.on('subscribe', namespace=SENSOR_NAMESPACE)
+def handle_sensor_subscribe(options=None):
+    try:
+        subscriber = sensor_stream.subscribe(request.sid, options, PICO_CONFIGS)
+    except (TypeError, ValueError, AttributeError) as e:
+        return {"success": False, "error": str(e)}
+    print(f"📈 Sensor stream subscriber {request.sid}: {subscriber.options()}")
+    return {"success": True, "options": subscriber.options()}
+
+@socketio.on('unsubscribe', namespace=SENSOR_NAMESPACE)
+def handle_sensor_unsubscribe():
+    sensor_stream.unsubscribe(request.sid)
+    return {"success": True}
+
+@socketio.on('disconnect', namespace=SENSOR_NAMESPACE)
+def handle_sensor_disconnect():
+    sensor_stream.unsubscribe(request.sid)
+
 # ===== BROADCAST HELPERS =====
 def broadcast_gamestate():
-    socketio.emit('gamestateupdate', game_state, namespace='/')
+    """Broadcast the game state once the current batch of scoring commands is applied"""
+    scoring.mark_changed()
 
 def broadcast_pointscored(team, actiontype):
+    """The point itself; the new score goes out in the same flush"""
     data = {
         "team": team,
         "action": actiontype,
-        "gamestate": game_state,
         "timestamp": datetime.now().isoformat()
     }
-    socketio.emit('pointscored', data, namespace='/')
+    broadcasts.queue('pointscored', data)
 
 def broadcast_sideswitch():
     """Only broadcast side switch if match is NOT won"""
@@ -508,66 +734,44 @@ def broadcast_sideswitch():
         "message": "CHANGE SIDES",
         "timestamp": datetime.now().isoformat()
     }
-    socketio.emit('sideswitchrequired', data, namespace='/')
+    broadcasts.queue('sideswitchrequired', data)
     play_change_audio()
     print(f"→ Side switch broadcasted | Total games: {data['totalgames']}, Score: {data['gamescore']}")
 
+def broadcast_scorecorrection(action, steps):
+    """Tell displays the score moved backwards/forwards so they drop stale overlays (score follows as a delta)"""
+    data = {
+        "action": action,
+        "steps": steps,
+        "canundo": match_log.position,
+        "canredo": len(match_log.entries) - match_log.position,
+        "timestamp": datetime.now().isoformat()
+    }
+    broadcasts.queue('scorecorrection', data)
+
 def broadcast_matchwon():
     data = {
         "winner": game_state["winner"],
         "matchdata": match_storage["matchdata"],
         "timestamp": datetime.now().isoformat()
     }
-    socketio.emit('matchwon', data, namespace='/')
-    print(f"🏆 Match won broadcast sent - winner: {game_state['winner']['team']}")
+    broadcasts.queue('matchwon', data)
+    print(f"🏆 Match won broadcast queued - winner: {game_state['winner']['team']}")
 
 # ===== HISTORY =====
 def add_to_history(action, team, scorebefore, scoreafter, gamebefore, gameafter, setbefore, setafter):
-    global game_state
-    history_entry = {
-        "timestamp": datetime.now().isoformat(),
-        "action": action,
-        "team": team,
-        "scores": {
-            "before": {"score1": scorebefore[0], "score2": scorebefore[1]},
-            "after": {"score1": scoreafter[0], "score2": scoreafter[1]}
-        },
-        "games": {
-            "before": {"game1": gamebefore[0], "game2": gamebefore[1]},
-            "after": {"game1": gameafter[0], "game2": gameafter[1]}
-        },
-        "sets": {
-            "before": {"set1": setbefore[0], "set2": setbefore[1]},
-            "after": {"set1": setafter[0], "set2": setafter[1]}
-        }
-    }
-    game_state["matchhistory"].append(history_entry)
+    match_history.append(action, team, scorebefore, scoreafter, gamebefore, gameafter, setbefore, setafter)
+    game_state["historylength"] = len(match_history)
 
 def calculate_match_statistics():
-    global game_state
-    black_points = len([h for h in game_state["matchhistory"] if h["action"] == "point" and h["team"] == "black"])
-    yellow_points = len([h for h in game_state["matchhistory"] if h["action"] == "point" and h["team"] == "yellow"])
-    black_games = len([h for h in game_state["matchhistory"] if h["action"] == "game" and h["team"] == "black"])
-    yellow_games = len([h for h in game_state["matchhistory"] if h["action"] == "game" and h["team"] == "yellow"])
-
-    sets_breakdown = []
-    for i, set_score in enumerate(game_state["sethistory"], 1):
-        if "-" in set_score:
-            games = set_score.split("-")
-            black_g = int(games[0].split("(")[0])
-            yellow_g = int(games[1].split("(")[0])
-            sets_breakdown.append({
-                "setnumber": i,
-                "blackgames": black_g,
-                "yellowgames": yellow_g,
-                "setwinner": "black" if black_g > yellow_g else "yellow"
-            })
-
-    return {
-        "totalpoints": {"black": black_points, "yellow": yellow_points},
-        "totalgames": {"black": black_games, "yellow": yellow_games},
-        "setsbreakdown": sets_breakdown
-    }
+    """Statistics from the running counters (scoring thread only)"""
+    stats = match_stats.as_dict()
+    stats.update({
+        "totalpoints": stats["points"],
+        "totalgames": stats["games"],
+        "setsbreakdown": match_stats.sets_breakdown()
+    })
+    return stats
 
 def store_match_data():
     global game_state, match_storage
@@ -623,146 +827,60 @@ def wipe_match_storage():
         "displayshown": False
     }
 
-# ===== SET & MATCH LOGIC =====
-def check_set_winner():
-    global game_state
-    g1 = game_state["game1"]
-    g2 = game_state["game2"]
-    s1 = game_state["set1"]
-    s2 = game_state["set2"]
-
-    if g1 >= 6 and g1 - g2 >= 2:
-        set_before = (s1, s2)
-        game_state["set1"] += 1
-        game_state["sethistory"].append(f"{g1}-{g2}")
-        add_to_history("set", "black",
-                      (game_state["score1"], game_state["score2"]), (0, 0),
-                      (g1, g2), (0, 0), set_before, (game_state["set1"], game_state["set2"]))
-        game_state["game1"] = 0
-        game_state["game2"] = 0
-        game_state["totalgamesinset"] = 0
-        game_state["shouldswitchsides"] = False
-        game_state["initial_switch_done"] = False
-        print(f"→ Set won by BLACK. Score: {game_state['set1']}-{game_state['set2']}. Flag reset for new set.")
-
-        match_won = check_match_winner()
-
-        if not match_won:
-            trigger_basic_mode_side_switch_if_needed()
-
-        return match_won
-
-    if g2 >= 6 and g2 - g1 >= 2:
-        set_before = (s1, s2)
-        game_state["set2"] += 1
-        game_state["sethistory"].append(f"{g1}-{g2}")
-        add_to_history("set", "yellow",
-                      (game_state["score1"], game_state["score2"]), (0, 0),
-                      (g1, g2), (0, 0), set_before, (game_state["set1"], game_state["set2"]))
-        game_state["game1"] = 0
-        game_state["game2"] = 0
-        game_state["totalgamesinset"] = 0
-        game_state["shouldswitchsides"] = False
-        game_state["initial_switch_done"] = False
-        print(f"→ Set won by YELLOW. Score: {game_state['set1']}-{game_state['set2']}. Flag reset for new set.")
-
-        match_won = check_match_winner()
-
-        if not match_won:
-            trigger_basic_mode_side_switch_if_needed()
-
-        return match_won
-
-    if g1 == 6 and g2 == 6 and game_state["mode"] == "normal":
-        if (s1 == 0 and s2 == 0) or (s1 == 1 and s2 == 0) or (s1 == 0 and s2 == 1):
-            print("→ Entering NORMAL TIE BREAK mode")
-            game_state["mode"] = "tiebreak"
-            game_state["point1"] = 0
-            game_state["point2"] = 0
-            game_state["score1"] = 0
-            game_state["score2"] = 0
-        elif s1 == 1 and s2 == 1:
-            print("→ Entering SUPER TIE BREAK mode (decider)")
-            game_state["mode"] = "supertiebreak"
-            game_state["point1"] = 0
-            game_state["point2"] = 0
-            game_state["score1"] = 0
-            game_state["score2"] = 0
-
-    return False
-
-def check_match_winner():
-    global game_state
+# ===== SET & MATCH LOGIC (rules in scoring_engine.py) =====
+def sync_gamestate():
+    """Copy the engine's score into game_state (scoring thread only)"""
+    game_state.update(match_state.as_dict())
 
-    if game_state["set1"] == 2:
-        game_state["matchwon"] = True
-        game_state["matchendtime"] = datetime.now().isoformat()
-
-        total_black_games = 0
-        total_yellow_games = 0
-        for set_score in game_state["sethistory"]:
-            if "-" in set_score:
-                parts = set_score.split("-")
-                total_black_games += int(parts[0].split("(")[0])
-                total_yellow_games += int(parts[1].split("(")[0])
-
-        total_black_games += game_state["game1"]
-        total_yellow_games += game_state["game2"]
-
-        game_state["winner"] = {
-            "team": "black",
-            "teamname": "BLACK TEAM",
-            "finalsets": f"{game_state['set1']}-{game_state['set2']}",
-            "matchsummary": ", ".join(game_state["sethistory"]),
-            "totalgameswon": total_black_games,
-            "matchduration": calculate_match_duration()
-        }
-        add_to_history("match", "black",
-                      (game_state["score1"], game_state["score2"]),
-                      (game_state["score1"], game_state["score2"]),
-                      (game_state["game1"], game_state["game2"]),
-                      (game_state["game1"], game_state["game2"]),
-                      (game_state["set1"], game_state["set2"]),
-                      (game_state["set1"], game_state["set2"]))
-        store_match_data()
-        print(f"🏆 MATCH WON by BLACK - Side switches now DISABLED")
-        return True
-
-    if game_state["set2"] == 2:
-        game_state["matchwon"] = True
-        game_state["matchendtime"] = datetime.now().isoformat()
-
-        total_black_games = 0
-        total_yellow_games = 0
-        for set_score in game_state["sethistory"]:
-            if "-" in set_score:
-                parts = set_score.split("-")
-                total_black_games += int(parts[0].split("(")[0])
-                total_yellow_games += int(parts[1].split("(")[0])
-
-        total_black_games += game_state["game1"]
-        total_yellow_games += game_state["game2"]
-
-        game_state["winner"] = {
-            "team": "yellow",
-            "teamname": "YELLOW TEAM",
-            "finalsets": f"{game_state['set1']}-{game_state['set2']}",
-            "matchsummary": ", ".join(game_state["sethistory"]),
-            "totalgameswon": total_yellow_games,
-            "matchduration": calculate_match_duration()
-        }
-        add_to_history("match", "yellow",
-                      (game_state["score1"], game_state["score2"]),
-                      (game_state["score1"], game_state["score2"]),
-                      (game_state["game1"], game_state["game2"]),
-                      (game_state["game1"], game_state["game2"]),
-                      (game_state["set1"], game_state["set2"]),
-                      (game_state["set1"], game_state["set2"]))
-        store_match_data()
-        print(f"🏆 MATCH WON by YELLOW - Side switches now DISABLED")
-        return True
-
-    return False
+def record_events(events):
+    """History entries, match data and side-switch broadcasts for scoring engine events.
+
+    Returns the history action of the point: "point", "game" or "set" (tie-breaks).
+    """
+    action_type = "point"
+    for kind, team, detail in events:
+        if kind == EVENT_GAME:
+            action_type = "game"
+        elif kind == EVENT_SET:
+            if action_type == "point":
+                action_type = "set"
+            add_to_history("set", TEAMS[team], detail.scores, (0, 0), detail.games, (0, 0),
+                           detail.sets_before, detail.sets)
+            print(f"→ Set won by {TEAMS[team].upper()} ({detail.label}). "
+                  f"Score: {detail.sets[0]}-{detail.sets[1]}. Flag reset for new set.")
+        elif kind == EVENT_TIEBREAK:
+            if detail == SUPERTIEBREAK:
+                print("→ Entering SUPER TIE BREAK mode (decider)")
+            else:
+                print("→ Entering NORMAL TIE BREAK mode")
+        elif kind == EVENT_SIDE_SWITCH:
+            broadcast_sideswitch()
+        elif kind == EVENT_MATCH_WON:
+            record_match_won(TEAMS[team])
+    return action_type
+
+def record_match_won(team):
+    """Winner details, history entry and stored match data for a finished match"""
+    game_state["matchendtime"] = datetime.now().isoformat()
+
+    game_state["winner"] = {
+        "team": team,
+        "teamname": f"{team.upper()} TEAM",
+        "finalsets": f"{game_state['set1']}-{game_state['set2']}",
+        "matchsummary": ", ".join(game_state["sethistory"]),
+        "totalgameswon": match_stats.total_games(team_index(team),
+                                                 game_state["game1" if team == "black" else "game2"]),
+        "matchduration": calculate_match_duration()
+    }
+    add_to_history("match", team,
+                  (game_state["score1"], game_state["score2"]),
+                  (game_state["score1"], game_state["score2"]),
+                  (game_state["game1"], game_state["game2"]),
+                  (game_state["game1"], game_state["game2"]),
+                  (game_state["set1"], game_state["set2"]),
+                  (game_state["set1"], game_state["set2"]))
+    store_match_data()
+    print(f"🏆 MATCH WON by {team.upper()} - Side switches now DISABLED")
 
 def calculate_match_duration():
     if game_state["matchendtime"]:
@@ -774,98 +892,29 @@ def calculate_match_duration():
     return "In progress"
 
 # ===== SCORING =====
-def set_normal_score_from_points():
-    p1 = game_state["point1"]
-    p2 = game_state["point2"]
-    def mappoint(p):
-        if p == 0: return 0
-        if p == 1: return 15
-        if p == 2: return 30
-        return 40
-    game_state["score1"] = mappoint(p1)
-    game_state["score2"] = mappoint(p2)
-
-def reset_points():
-    game_state["point1"] = 0
-    game_state["point2"] = 0
-    game_state["score1"] = 0
-    game_state["score2"] = 0
-
-def handle_normal_game_win(team):
-    if team == "black":
-        game_state["game1"] += 1
-    else:
-        game_state["game2"] += 1
-    reset_points()
-    check_set_winner()
-
-def handle_tiebreak_win(team):
-    g1 = game_state["game1"]
-    g2 = game_state["game2"]
-    tb_score = f"({game_state['point2']})" if team == "black" else f"({game_state['point1']})"
-    set_before = (game_state["set1"], game_state["set2"])
-
-    if team == "black":
-        game_state["set1"] += 1
-        game_state["sethistory"].append(f"7-6{tb_score}")
-        add_to_history("set", "black",
-                      (game_state["score1"], game_state["score2"]), (0, 0),
-                      (g1, g2), (0, 0), set_before, (game_state["set1"], game_state["set2"]))
-    else:
-        game_state["set2"] += 1
-        game_state["sethistory"].append(f"6-7{tb_score}")
-        add_to_history("set", "yellow",
-                      (game_state["score1"], game_state["score2"]), (0, 0),
-                      (g1, g2), (0, 0), set_before, (game_state["set1"], game_state["set2"]))
-
-    game_state["game1"] = 0
-    game_state["game2"] = 0
-    game_state["totalgamesinset"] = 0
-    game_state["shouldswitchsides"] = False
-    game_state["initial_switch_done"] = False
-    reset_points()
-    game_state["mode"] = "normal"
-    print("→ Tie-break won. New set starting. Flag reset for new set.")
-
-    match_won = check_match_winner()
-
-    if not match_won:
-        trigger_basic_mode_side_switch_if_needed()
-
-def handle_supertiebreak_win(team):
-    set_before = (game_state["set1"], game_state["set2"])
-
-    if team == "black":
-        game_state["set1"] += 1
-        game_state["sethistory"].append(f"10-{game_state['point2']}(STB)")
-        add_to_history("set", "black",
-                      (game_state["score1"], game_state["score2"]), (0, 0),
-                      (game_state["game1"], game_state["game2"]), (0, 0),
-                      set_before, (game_state["set1"], game_state["set2"]))
-    else:
-        game_state["set2"] += 1
-        game_state["sethistory"].append(f"{game_state['point1']}-10(STB)")
-        add_to_history("set", "yellow",
-                      (game_state["score1"], game_state["score2"]), (0, 0),
-                      (game_state["game1"], game_state["game2"]), (0, 0),
-                      set_before, (game_state["set1"], game_state["set2"]))
-
-    game_state["initial_switch_done"] = False
-    reset_points()
-    game_state["mode"] = "normal"
-    print("→ Super tie-break won. Match ending.")
-    check_match_winner()
-
 def scoring_gamemode_selected():
     """Returns True only if gamemode is one of the allowed modes."""
     return game_state["gamemode"] in ("basic", "competition", "lock")
 
+@scoring.command("detection")
+def apply_ball_detection(pico_name, min_distance):
+    """Add a point for the team on this Pico's side when the detection is applied"""
+    team = get_team_from_pico(pico_name)
+
+    print(f"🎾 Ball detected on {pico_name} (Team: {team.upper()}) - Distance: {min_distance}mm")
+
+    if game_state["gamemode"] is not None:
+        return process_add_point(team)
+    print(f"⚠ Ball detected but game mode not selected - ignoring")
+    return None
+
+@scoring.command("addpoint")
 def process_add_point(team):
     global game_state
 
     if not scoring_gamemode_selected():
         broadcast_pointscored(team, "addpoint")
-        return {"success": True, "ignored": True, "message": "Point ignored until mode is selected", "gamestate": game_state}
+        return {"success": True, "ignored": True, "message": "Point ignored until mode is selected", "gamestate": snapshot_gamestate()}
 
     if game_state["matchwon"]:
         return {"success": False, "error": "Match is already completed",
@@ -874,69 +923,24 @@ def process_add_point(team):
     score_before = (game_state["score1"], game_state["score2"])
     game_before = (game_state["game1"], game_state["game2"])
     set_before = (game_state["set1"], game_state["set2"])
-    action_type = "point"
-    game_just_won = False
-    phase_mode = game_state["mode"]
-
-    if team == "black":
-        game_state["point1"] += 1
-    else:
-        game_state["point2"] += 1
-
-    p1 = game_state["point1"]
-    p2 = game_state["point2"]
-
-    if phase_mode == "normal":
-        set_normal_score_from_points()
-        if team == "black":
-            if p1 >= 4 and p1 - p2 >= 2:
-                handle_normal_game_win("black")
-                action_type = "game"
-                game_just_won = True
-        else:
-            if p2 >= 4 and p2 - p1 >= 2:
-                handle_normal_game_win("yellow")
-                action_type = "game"
-                game_just_won = True
-
-    elif phase_mode == "tiebreak":
-        game_state["score1"] = game_state["point1"]
-        game_state["score2"] = game_state["point2"]
-        if team == "black":
-            if p1 >= 7 and p1 - p2 >= 2:
-                handle_tiebreak_win("black")
-                action_type = "set"
-        else:
-            if p2 >= 7 and p2 - p1 >= 2:
-                handle_tiebreak_win("yellow")
-                action_type = "set"
+    history_length = len(match_history)
 
-    elif phase_mode == "supertiebreak":
-        game_state["score1"] = game_state["point1"]
-        game_state["score2"] = game_state["point2"]
-        if team == "black":
-            if p1 >= 10 and p1 - p2 >= 2:
-                handle_supertiebreak_win("black")
-                action_type = "set"
-        else:
-            if p2 >= 10 and p2 - p1 >= 2:
-                handle_supertiebreak_win("yellow")
-                action_type = "set"
+    index = team_index(team)
+    mode = match_state.mode
+    events = apply_point(match_state, index, SCORING_RULES)
+    match_stats.record_point(index, mode, events)
+    sync_gamestate()
+    action_type = record_events(events)
 
     if not game_state["matchwon"]:
         add_to_history(action_type, team,
                       score_before, (game_state["score1"], game_state["score2"]),
                       game_before, (game_state["game1"], game_state["game2"]),
                       set_before, (game_state["set1"], game_state["set2"]))
+    match_log.record(ADD_POINT, index, history_length, match_state, match_stats)
 
     game_state["lastupdated"] = datetime.now().isoformat()
 
-    sideswitchneeded = False
-    if game_just_won and not game_state["matchwon"] and game_state["mode"] == "normal":
-        sideswitchneeded = check_side_switch()
-        if sideswitchneeded:
-            broadcast_sideswitch()
-
     broadcast_gamestate()
 
     if game_state["matchwon"]:
@@ -947,7 +951,6 @@ def process_add_point(team):
     response = {
         "success": True,
         "message": f"Point added to team {team}",
-        "gamestate": game_state,
         "matchwon": game_state["matchwon"],
         "winner": game_state["winner"] if game_state["matchwon"] else None
     }
@@ -959,18 +962,21 @@ def process_add_point(team):
             "gamescore": f"{game_state['game1']}-{game_state['game2']}",
             "setscore": f"{game_state['set1']}-{game_state['set2']}",
         }
+        match_state.shouldswitchsides = False
         game_state["shouldswitchsides"] = False
         print(f"✅ Side switch signal sent in HTTP response, flag cleared")
 
+    response["gamestate"] = snapshot_gamestate()
     return response
 
+@scoring.command("subtractpoint")
 def process_subtract_point(team):
-    """Simple subtraction of internal raw point; no undo of games/sets."""
+    """Simple subtraction of internal raw point; /undo takes back games and sets."""
     global game_state
 
     if not scoring_gamemode_selected():
         broadcast_pointscored(team, "subtractpoint")
-        return {"success": True, "ignored": True, "message": "Subtraction ignored until mode is selected", "gamestate": game_state}
+        return {"success": True, "ignored": True, "message": "Subtraction ignored until mode is selected", "gamestate": snapshot_gamestate()}
 
     if game_state["matchwon"]:
         return {"success": False, "error": "Cannot subtract points from completed match"}
@@ -978,27 +984,75 @@ def process_subtract_point(team):
     score_before = (game_state["score1"], game_state["score2"])
     game_before = (game_state["game1"], game_state["game2"])
     set_before = (game_state["set1"], game_state["set2"])
+    history_length = len(match_history)
 
-    if team == "black":
-        game_state["point1"] = max(0, game_state["point1"] - 1)
-    else:
-        game_state["point2"] = max(0, game_state["point2"] - 1)
-
-    if game_state["mode"] == "normal":
-        set_normal_score_from_points()
-    else:
-        game_state["score1"] = game_state["point1"]
-        game_state["score2"] = game_state["point2"]
+    index = team_index(team)
+    match_stats.record_subtract(index, apply_subtract(match_state, index))
+    sync_gamestate()
 
     add_to_history("point_subtract", team,
                   score_before, (game_state["score1"], game_state["score2"]),
                   game_before, (game_state["game1"], game_state["game2"]),
                   set_before, (game_state["set1"], game_state["set2"]))
+    match_log.record(SUBTRACT_POINT, index, history_length, match_state, match_stats)
+
+    game_state["lastupdated"] = datetime.now().isoformat()
+    broadcast_gamestate()
+
+    return {"success": True, "message": f"Point subtracted from team {team}", "gamestate": snapshot_gamestate()}
+
+@scoring.command("undo")
+def undo_commands(steps=1):
+    """Take back the last steps add/subtract commands, games and sets included"""
+    global match_state, match_stats
+
+    if not match_log.can_undo(steps):
+        return {"success": False, "error": "Nothing to undo" if match_log.position == 0
+                else f"Only {match_log.position} commands can be undone", "log": match_log.stats()}
+
+    was_won = game_state["matchwon"]
+    entry, match_state, match_stats = match_log.undo(match_state.gamemode, steps)
+    # Any side switch of the restored position was announced when it was first reached
+    match_state.shouldswitchsides = False
+    sync_gamestate()
+    match_history.truncate(entry.history_length)
+    game_state["historylength"] = len(match_history)
+
+    if was_won and not game_state["matchwon"]:
+        game_state["winner"] = None
+        game_state["matchendtime"] = None
+        wipe_match_storage()
+        print("↩ Match reopened")
 
     game_state["lastupdated"] = datetime.now().isoformat()
     broadcast_gamestate()
+    broadcast_scorecorrection("undo", steps)
+    print(f"↩ Undid {steps} scoring command(s) → Sets {game_state['set1']}-{game_state['set2']}, "
+          f"Games {game_state['game1']}-{game_state['game2']}")
+
+    return {"success": True, "message": f"Undid {steps} scoring command(s)",
+            "log": match_log.stats(), "gamestate": snapshot_gamestate()}
+
+@scoring.command("redo")
+def redo_commands(steps=1):
+    """Apply undone commands again, with the broadcasts they made the first time"""
+    if not match_log.can_redo():
+        return {"success": False, "error": "Nothing to redo", "log": match_log.stats()}
+
+    redone = 0
+    while redone < steps and match_log.can_redo():
+        entry = match_log.next_entry()
+        if entry.command == ADD_POINT:
+            result = process_add_point(TEAMS[entry.team])
+        else:
+            result = process_subtract_point(TEAMS[entry.team])
+        if not result.get("success") or result.get("ignored"):
+            return dict(result, redone=redone, log=match_log.stats())
+        redone += 1
 
-    return {"success": True, "message": f"Point subtracted from team {team}", "gamestate": game_state}
+    broadcast_scorecorrection("redo", redone)
+    return {"success": True, "message": f"Redid {redone} scoring command(s)", "redone": redone,
+            "log": match_log.stats(), "gamestate": snapshot_gamestate()}
 
 # ===== FLASK ROUTES =====
 @app.route("/")
@@ -1016,7 +1070,9 @@ def addpoint():
     try:
         data = request.get_json() or {}
         team = data.get("team", "black")
-        result = process_add_point(team)
+        if team not in TEAMS:
+            return jsonify({"success": False, "error": f"Unknown team: {team}"}), 400
+        result = scoring.call("addpoint", team)
         status = 200 if result.get("success") else 400
         return jsonify(result), status
     except Exception as e:
@@ -1027,17 +1083,45 @@ def subtractpoint():
     try:
         data = request.get_json() or {}
         team = data.get("team", "black")
-        result = process_subtract_point(team)
+        if team not in TEAMS:
+            return jsonify({"success": False, "error": f"Unknown team: {team}"}), 400
+        result = scoring.call("subtractpoint", team)
         status = 200 if result.get("success") else 400
         return jsonify(result), status
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/undo", methods=["POST"])
+def undo():
+    """Undo the last scoring command(s): {"steps": N}, default 1"""
+    steps = parse_steps(request.get_json(silent=True))
+    if steps is None:
+        return jsonify({"success": False, "error": STEPS_ERROR}), 400
+    try:
+        result = scoring.call("undo", steps)
+        return jsonify(result), 200 if result["success"] else 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/redo", methods=["POST"])
+def redo():
+    """Redo undone scoring command(s): {"steps": N}, default 1"""
+    steps = parse_steps(request.get_json(silent=True))
+    if steps is None:
+        return jsonify({"success": False, "error": STEPS_ERROR}), 400
+    try:
+        result = scoring.call("redo", steps)
+        return jsonify(result), 200 if result["success"] else 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route("/gamestate", methods=["GET"])
 def getgamestate():
-    response_data = game_state.copy()
-    response_data["matchstorageavailable"] = match_storage["matchcompleted"] and not match_storage["displayshown"]
-    return jsonify(response_data)
+    def build():
+        response_data = dict(published_gamestate)
+        response_data["matchstorageavailable"] = match_storage["matchcompleted"] and not match_storage["displayshown"]
+        return response_data, 200
+    return cached_json("gamestate", build)
 
 @app.route("/sensorvalidation", methods=["GET"])
 def getsensorvalidation():
@@ -1045,41 +1129,85 @@ def getsensorvalidation():
 
 @app.route("/picodata", methods=["GET"])
 def getpicodata():
-    """Get current Pico connection status and last frame data"""
-    with data_lock:
-        data = {
-            "PICO_1": {
-                "connected": pico_data["PICO_1"]["connected"],
-                "frame_count": pico_data["PICO_1"]["frame_count"],
-                "error_count": pico_data["PICO_1"]["error_count"],
-                "team": sensor_mapping["pico_1_team"],
-                "last_frame": pico_data["PICO_1"]["last_frame"]
-            },
-            "PICO_2": {
-                "connected": pico_data["PICO_2"]["connected"],
-                "frame_count": pico_data["PICO_2"]["frame_count"],
-                "error_count": pico_data["PICO_2"]["error_count"],
-                "team": sensor_mapping["pico_2_team"],
-                "last_frame": pico_data["PICO_2"]["last_frame"]
-            }
+    """Get current Pico connection status and last frame data (?frames=N adds recent history)"""
+    history_frames = min(request.args.get("frames", 0, type=int), HISTORY_FRAMES)
+    snapshots = pico_snapshots.all()
+    data = {
+        "PICO_1": {
+            "connected": snapshots["PICO_1"].connected,
+            "frame_count": snapshots["PICO_1"].frame_count,
+            "error_count": snapshots["PICO_1"].error_count,
+            "dropped_frames": snapshots["PICO_1"].dropped_frames,
+            "overruns": snapshots["PICO_1"].overruns,
+            "team": sensor_mapping["pico_1_team"],
+            "zones": snapshots["PICO_1"].zones,
+            "resolution": resolution_label(snapshots["PICO_1"].zones),
+            "last_frame": frame_dicts(snapshots["PICO_1"]),
+            "baseline": snapshots["PICO_1"].baseline,
+            "link": snapshots["PICO_1"].link
+        },
+        "PICO_2": {
+            "connected": snapshots["PICO_2"].connected,
+            "frame_count": snapshots["PICO_2"].frame_count,
+            "error_count": snapshots["PICO_2"].error_count,
+            "dropped_frames": snapshots["PICO_2"].dropped_frames,
+            "overruns": snapshots["PICO_2"].overruns,
+            "team": sensor_mapping["pico_2_team"],
+            "zones": snapshots["PICO_2"].zones,
+            "resolution": resolution_label(snapshots["PICO_2"].zones),
+            "last_frame": frame_dicts(snapshots["PICO_2"]),
+            "baseline": snapshots["PICO_2"].baseline,
+            "link": snapshots["PICO_2"].link
         }
+    }
+    if history_frames > 0:
+        for pico_name in data:
+            data[pico_name]["history"] = pico_history[pico_name].to_json(history_frames)
     return jsonify({"success": True, "pico_data": data})
 
+@app.route("/sensorstream", methods=["GET"])
+def getsensorstream():
+    """Subscribers of the /sensors frame stream with their options and sent/dropped counts"""
+    return jsonify({"success": True, "namespace": SENSOR_NAMESPACE, "subscribers": sensor_stream.stats()})
+
+@app.route("/matchhistory", methods=["GET"])
+def getmatchhistory():
+    """History entries from ?since=N (cursor from the last page), ?epoch=E, ?limit=N (max 500)"""
+    since = request.args.get("since", 0, type=int)
+    epoch = request.args.get("epoch", None, type=int)
+    limit = request.args.get("limit", None, type=int)
+    return jsonify(dict(scoring.call("matchhistory", since, epoch, limit), success=True))
+
+@scoring.command("matchhistory")
+def match_history_page(since, epoch, limit):
+    """JSON for one page of history, built on the scoring thread so no append is half-seen"""
+    return match_history.page(since, epoch, limit)
+
+@app.route("/matchstats", methods=["GET"])
+def getmatchstats():
+    """Running statistics of the current match, as of the last published state"""
+    stats = published_stats if published_stats is not None else scoring.call("matchstats")
+    return jsonify({"success": True, "stats": stats, "version": published_gamestate["version"]})
+
+@scoring.command("matchstats")
+def match_statistics():
+    return calculate_match_statistics()
+
 @app.route("/getmatchdata", methods=["GET"])
 def getmatchdata():
+    def build():
+        if not match_storage["matchcompleted"]:
+            return {"success": False, "error": "No completed match data"}, 404
+        return {"success": True, "matchdata": match_storage["matchdata"], "displayshown": match_storage["displayshown"]}, 200
+    return cached_json("getmatchdata", build)
+
+@scoring.command("markmatchdisplayed")
+def mark_match_displayed(wipe_immediately):
     global match_storage
     if not match_storage["matchcompleted"]:
-        return jsonify({"success": False, "error": "No completed match data"}), 404
-    return jsonify({"success": True, "matchdata": match_storage["matchdata"], "displayshown": match_storage["displayshown"]})
-
-@app.route("/markmatchdisplayed", methods=["POST"])
-def markmatchdisplayed():
-    global match_storage
-    if not match_storage["matchcompleted"]:
-        return jsonify({"success": False, "error": "No match data"}), 400
+        return {"success": False, "error": "No match data"}
 
     match_storage["displayshown"] = True
-    wipe_immediately = request.get_json().get("wipeimmediately", True) if request.get_json() else True
 
     if wipe_immediately:
         wipe_match_storage()
@@ -1087,69 +1215,80 @@ def markmatchdisplayed():
     else:
         message = "Match data marked as displayed"
 
-    return jsonify({"success": True, "message": message})
+    responses.invalidate()
+    return {"success": True, "message": message}
+
+@app.route("/markmatchdisplayed", methods=["POST"])
+def markmatchdisplayed():
+    wipe_immediately = request.get_json().get("wipeimmediately", True) if request.get_json() else True
+    result = scoring.call("markmatchdisplayed", wipe_immediately)
+    return jsonify(result), 200 if result["success"] else 400
+
+@scoring.command("setgamemode")
+def set_game_mode(mode):
+    global game_state
+
+    match_state.gamemode = mode
+    match_state.initial_switch_done = False
+    sync_gamestate()
+
+    if mode is None:
+        print("Game mode cleared (None)")
+        broadcast_gamestate()
+        return {"success": True, "message": "Game mode cleared", "gamemode": None}
+
+    print(f"Game mode set to {mode.upper()}")
+    broadcast_gamestate()
+
+    if mode == "basic":
+        trigger_basic_mode_side_switch_if_needed()
+
+    return {"success": True, "message": f"Game mode set to {mode}", "gamemode": mode}
 
 @app.route("/setgamemode", methods=["POST"])
 def setgamemode():
     """Set game mode to 'basic' | 'competition' | 'lock' | null (to clear)."""
-    global game_state
     try:
         data = request.get_json() or {}
         mode = data.get("mode", None)
 
-        if mode is None:
-            game_state["gamemode"] = None
-            game_state["initial_switch_done"] = False
-            print("Game mode cleared (None)")
-            broadcast_gamestate()
-            return jsonify({"success": True, "message": "Game mode cleared", "gamemode": None})
-
-        if mode not in ("basic", "competition", "lock"):
+        if mode not in (None, "basic", "competition", "lock"):
             return jsonify({"success": False, "error": "Invalid mode. Must be basic, competition, lock, or null"}), 400
 
-        game_state["gamemode"] = mode
-        game_state["initial_switch_done"] = False
-        print(f"Game mode set to {mode.upper()}")
-        broadcast_gamestate()
-
-        if mode == "basic":
-            trigger_basic_mode_side_switch_if_needed()
-
-        return jsonify({"success": True, "message": f"Game mode set to {mode}", "gamemode": mode})
+        return jsonify(scoring.call("setgamemode", mode))
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route("/resetmatch", methods=["POST"])
-def resetmatch():
-    global game_state, match_storage
+@scoring.command("resetmatch")
+def reset_match():
+    global game_state, match_storage, match_state, match_stats, match_log, match_history
 
     wipe_match_storage()
 
+    match_state = MatchState(gamemode=match_state.gamemode)
+    match_stats = MatchStats()
+    match_log = MatchLog(SCORING_RULES, match_state.gamemode)
+    match_history = MatchHistory()
+    sync_gamestate()
     game_state.update({
-        "game1": 0, "game2": 0,
-        "set1": 0, "set2": 0,
-        "point1": 0, "point2": 0,
-        "score1": 0, "score2": 0,
-        "matchwon": False,
         "winner": None,
-        "sethistory": [],
-        "matchhistory": [],
+        "historylength": 0,
         "matchstarttime": datetime.now().isoformat(),
         "matchendtime": None,
-        "lastupdated": datetime.now().isoformat(),
-        "shouldswitchsides": False,
-        "totalgamesinset": 0,
-        "mode": "normal",
-        "initial_switch_done": False
+        "lastupdated": datetime.now().isoformat()
     })
 
     broadcast_gamestate()
     print("✅ Match reset - all scores cleared, side switches re-enabled")
 
-    return jsonify({"success": True, "message": "Match reset successfully", "gamestate": game_state})
+    return {"success": True, "message": "Match reset successfully", "gamestate": snapshot_gamestate()}
 
-@app.route("/swappicos", methods=["POST"])
-def swap_picos():
+@app.route("/resetmatch", methods=["POST"])
+def resetmatch():
+    return jsonify(scoring.call("resetmatch"))
+
+@scoring.command("swappicos")
+def swap_pico_teams():
     """Swap Pico team assignments: PICO_1 ↔ PICO_2"""
     global sensor_mapping
 
@@ -1161,10 +1300,11 @@ def swap_picos():
     sensor_mapping["last_swap"] = datetime.now().isoformat()
 
     print(f"🔄 Picos swapped: PICO_1={sensor_mapping['pico_1_team']}, PICO_2={sensor_mapping['pico_2_team']}")
+    responses.invalidate()
 
-    socketio.emit('sensor_mapping_updated', sensor_mapping, namespace='/')
+    emit_to_clients('sensor_mapping_updated', dict(sensor_mapping), namespace='/')
 
-    return jsonify({
+    return {
         "success": True,
         "message": "Picos swapped successfully",
         "mapping": {
@@ -1172,49 +1312,82 @@ def swap_picos():
             "pico_2_team": sensor_mapping["pico_2_team"]
         },
         "timestamp": sensor_mapping["last_swap"]
+    }
+
+@app.route("/swappicos", methods=["POST"])
+def swap_picos():
+    return jsonify(scoring.call("swappicos"))
+
+@app.route("/calibratesensors", methods=["POST"])
+def calibrate_sensors():
+    """Recalibrate the per-zone baselines from the next frames (court must be empty)"""
+    # The reader threads reset their own baselines: one reset between the calibrated
+    # check and detect() would leave detect() without a baseline
+    for baseline in pico_baselines.values():
+        baseline.request_reset()
+    print(f"🎯 Recalibrating zone baselines ({BASELINE_CALIBRATION_SECONDS:.0f}s)")
+    return jsonify({
+        "success": True,
+        "message": f"Calibrating from the next {BASELINE_CALIBRATION_SECONDS:.0f}s of frames",
+        "detection_mode": DETECTION_MODE
     })
 
 @app.route("/getsensormapping", methods=["GET"])
 def get_sensor_mapping():
     """Get current Pico to team mapping"""
-    return jsonify({"success": True, "mapping": sensor_mapping})
+    return cached_json("getsensormapping", lambda: ({"success": True, "mapping": dict(sensor_mapping)}, 200))
 
 @app.route("/health", methods=["GET"])
 def healthcheck():
-    logoexists = os.path.exists("logo.png")
-    backexists = os.path.exists("back.png")
-    changeaudioexists = os.path.exists("change.mp3")
+    def build():
+        logoexists = os.path.exists("logo.png")
+        backexists = os.path.exists("back.png")
+        changeaudioexists = os.path.exists("change.mp3")
 
-    with data_lock:
+        gamestate = published_gamestate
+        snapshots = pico_snapshots.all()
         pico_status = {
             "PICO_1": {
-                "connected": pico_data["PICO_1"]["connected"],
-                "frames": pico_data["PICO_1"]["frame_count"],
-                "errors": pico_data["PICO_1"]["error_count"]
+                "connected": snapshots["PICO_1"].connected,
+                "frames": snapshots["PICO_1"].frame_count,
+                "errors": snapshots["PICO_1"].error_count,
+                "dropped": snapshots["PICO_1"].dropped_frames,
+                "reconnects": snapshots["PICO_1"].link["reconnects"]
             },
             "PICO_2": {
-                "connected": pico_data["PICO_2"]["connected"],
-                "frames": pico_data["PICO_2"]["frame_count"],
-                "errors": pico_data["PICO_2"]["error_count"]
+                "connected": snapshots["PICO_2"].connected,
+                "frames": snapshots["PICO_2"].frame_count,
+                "errors": snapshots["PICO_2"].error_count,
+                "dropped": snapshots["PICO_2"].dropped_frames,
+                "reconnects": snapshots["PICO_2"].link["reconnects"]
             }
         }
 
-    return jsonify({
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "socketio": "enabled",
-        "gamestate": game_state,
-        "matchstatus": "completed" if game_state["matchwon"] else "in-progress",
-        "historyentries": len(game_state["matchhistory"]),
-        "matchstorage": {"completed": match_storage["matchcompleted"], "displayed": match_storage["displayshown"]},
-        "sensorvalidation": sensor_validation,
-        "pico_status": pico_status,
-        "files": {
-            "logo.png": "found" if logoexists else "missing",
-            "back.png": "found" if backexists else "missing",
-            "change.mp3": "found" if changeaudioexists else "missing"
-        }
-    })
+        return {
+            "status": "healthy",
+            "timestamp": datetime.now().isoformat(),
+            "socketio": "enabled",
+            "gamestate": gamestate,
+            "matchstatus": "completed" if gamestate["matchwon"] else "in-progress",
+            "historyentries": gamestate["historylength"],
+            "scoring": scoring.stats(),
+            "deltas": state_deltas.stats(),
+            "broadcasts": broadcasts.stats(),
+            "responsecache": responses.stats(),
+            "codec": json_codec.describe(SOCKETIO_SERIALIZER),
+            "server": server.stats(),
+            "matchlog": match_log.stats(),
+            "matchstorage": {"completed": match_storage["matchcompleted"], "displayed": match_storage["displayshown"]},
+            "sensorvalidation": sensor_validation,
+            "pico_status": pico_status,
+            "pico_readers": pico_supervisor.metrics() if pico_supervisor is not None else {},
+            "files": {
+                "logo.png": "found" if logoexists else "missing",
+                "back.png": "found" if backexists else "missing",
+                "change.mp3": "found" if changeaudioexists else "missing"
+            }
+        }, 200
+    return cached_json("health", build, max_age=HEALTH_CACHE_SECONDS)
 
 if __name__ == "__main__":
     print("=" * 70)
@@ -1236,21 +1409,38 @@ if __name__ == "__main__":
     print("=" * 70)
     print("✅ Automatic ball detection via distance sensors")
     print("✅ Detection threshold: {}mm".format(DETECTION_THRESHOLD))
+    if DETECTION_MODE == "baseline":
+        print("✅ Baseline detection: {}mm closer in {}+ of 4x4 zones {} (calibrating {:.0f}s)".format(
+            BASELINE_THRESHOLD, MIN_ZONES_FOR_DETECTION, GOOD_ZONES, BASELINE_CALIBRATION_SECONDS))
+    print("✅ Sensor resolution: {}".format(", ".join(
+        f"{name} {resolution_label(config['zones'])}" for name, config in PICO_CONFIGS.items())))
     print("=" * 70)
     print("Socket.IO enabled for real-time updates")
+    print("JSON codec: {json}, Socket.IO payloads: {socketio}".format(**json_codec.describe(SOCKETIO_SERIALIZER)))
+    print(f"Server mode: {server.name}")
     print("Access at http://127.0.0.1:5000")
     print("=" * 70)
 
     validation_thread = threading.Thread(target=run_initial_sensor_validation, daemon=True)
     validation_thread.start()
 
+    # OS threads in every server mode: nothing but client I/O runs on the event loop
+    server.start_thread(scoring.run, name="scoring")
+    server.start_thread(sensor_stream.run, name="sensor-stream")
+
     # Start Pico reader threads
     time.sleep(3)
     if sensor_validation["validated"] or sensor_validation["status"] == "warning":
         start_pico_readers()
 
     try:
-        socketio.run(app, debug=False, host="127.0.0.1", port=5000, allow_unsafe_werkzeug=True)
+        server.run(socketio, app, "127.0.0.1", 5000)
     finally:
         sensor_running = False
+        scoring.stop()
+        sensor_stream.stop()
+        if pico_supervisor is not None:
+            pico_supervisor.stop()
+        if pico_ingest is not None:
+            pico_ingest.stop()
         print("\n🛑 Shutting down sensor threads...")
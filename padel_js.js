@@ -18,9 +18,33 @@ socket.on('disconnect', () => {
     console.log('❌ Disconnected from server');
 });
 
+// Full state (on connect and on request), then versioned deltas of the fields that changed
+let gameStateCache = null;
+let stateVersion = 0;
+let fullStateRequested = false;
+
 socket.on('game_state_update', (data) => {
     console.log('📡 Game state update received:', data);
-    updateFromGameState(data);
+    fullStateRequested = false;
+    gameStateCache = data;
+    stateVersion = data.version || 0;
+    updateFromGameState(gameStateCache);
+});
+
+socket.on('game_state_delta', (delta) => {
+    if (gameStateCache === null || delta.version !== stateVersion + 1) {
+        // Missed a delta (or no full state yet): ask for the whole state once
+        if (!fullStateRequested && (gameStateCache === null || delta.version > stateVersion)) {
+            console.log(`⚠️ State gap: have v${stateVersion}, got v${delta.version} - requesting full state`);
+            fullStateRequested = true;
+            socket.emit('request_game_state');
+        }
+        return;
+    }
+    Object.assign(gameStateCache, delta.changes);
+    (delta.removed || []).forEach(key => delete gameStateCache[key]);
+    stateVersion = delta.version;
+    updateFromGameState(gameStateCache);
 });
 
 socket.on('point_scored', (data) => {
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Pico Traffic Capture
+Records the raw bytes bridge.py sends to the backend, with monotonic arrival
+times, and replays them into the backend's pipes at 1x, Nx or maximum speed,
+so a match's sensor input can be reproduced without the court.
+
+Record (backend stopped, reading the FIFOs directly):
+    python3 pico_capture.py record match.pcap
+Record while the backend runs (bridge.py --diag-socket):
+    python3 pico_capture.py record match.pcap \\
+        --source PICO_1=/tmp/pico1_diag.sock --source PICO_2=/tmp/pico2_diag.sock
+Replay (bridge stopped; the replayer creates the FIFOs itself):
+    python3 pico_capture.py replay match.pcap --speed 4
+    python3 pico_capture.py replay match.pcap --speed 0      # as fast as possible
+
+File layout (little-endian):
+    header    magic "PCAP" version, source count, wall-clock start, then
+              one length-prefixed name and path per source
+    records   source uint8, delta_us uint32 (since previous record),
+              length uint16, payload
+    index     (time_us uint64, offset uint64) every INDEX_INTERVAL_US
+    footer    index offset uint64, entry count uint32, magic "PIDX"
+
+A capture cut short (no footer) is still readable; only seeking needs the
+index.
+"""
+
+import argparse
+import errno
+import os
+import selectors
+import socket
+import stat
+import struct
+import sys
+import time
+
+from pico_frames import FrameCounter
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_SOURCES = {
+    "PICO_1": "/tmp/pico1_serial",
+    "PICO_2": "/tmp/pico2_serial",
+}
+READ_CHUNK_SIZE = 4096
+INDEX_INTERVAL_US = 1_000_000
+MAX_RECORD_BYTES = 0xFFFF
+REOPEN_DELAY = 0.5
+
+# ============================================================================
+# FILE FORMAT
+# ============================================================================
+CAPTURE_MAGIC = b"PCAP"
+CAPTURE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHBd")
+NAME_LENGTH = struct.Struct("<H")
+RECORD_HEADER = struct.Struct("<BIH")
+INDEX_ENTRY = struct.Struct("<QQ")
+FOOTER = struct.Struct("<QI4s")
+FOOTER_MAGIC = b"PIDX"
+
+
+class CaptureWriter:
+    """Appends timestamped chunks to a capture file"""
+
+    def __init__(self, path, sources):
+        self.sources = list(sources.items())
+        self.ids = {name: i for i, (name, _) in enumerate(self.sources)}
+        self.file = open(path, "wb")
+        self.file.write(FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, len(self.sources), time.time()))
+        for name, source_path in self.sources:
+            for text in (name, source_path):
+                encoded = text.encode()
+                self.file.write(NAME_LENGTH.pack(len(encoded)) + encoded)
+
+        self.start_ns = time.monotonic_ns()
+        self.last_us = 0
+        self.index = []
+        self.next_index_us = 0
+        self.record_count = 0
+        self.byte_count = 0
+
+    def write(self, name, data, now_ns=None):
+        """Record one chunk as it arrived from source name"""
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        now_us = max((now_ns - self.start_ns) // 1000, self.last_us)
+        view = memoryview(data)
+
+        for start in range(0, len(view), MAX_RECORD_BYTES):
+            chunk = view[start:start + MAX_RECORD_BYTES]
+            if now_us >= self.next_index_us:
+                self.index.append((now_us, self.file.tell()))
+                self.next_index_us = now_us + INDEX_INTERVAL_US
+            delta = min(now_us - self.last_us, 0xFFFFFFFF)
+            self.file.write(RECORD_HEADER.pack(self.ids[name], delta, len(chunk)))
+            self.file.write(chunk)
+            self.last_us += delta
+            self.record_count += 1
+            self.byte_count += len(chunk)
+
+    def close(self):
+        index_offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.write(FOOTER.pack(index_offset, len(self.index), FOOTER_MAGIC))
+        self.file.close()
+
+
+class CaptureReader:
+    """Reads a capture file: records() yields (time_us, source name, bytes)"""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        magic, version, count, self.started_at = FILE_HEADER.unpack(self.file.read(FILE_HEADER.size))
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"{path} is not a Pico capture (version {CAPTURE_VERSION})")
+
+        self.sources = []
+        for _ in range(count):
+            name, source_path = (self._read_text() for _ in range(2))
+            self.sources.append((name, source_path))
+        self.data_offset = self.file.tell()
+        self.data_end, self.index = self._read_index()
+
+    def _read_text(self):
+        (length,) = NAME_LENGTH.unpack(self.file.read(NAME_LENGTH.size))
+        return self.file.read(length).decode()
+
+    def _read_index(self):
+        size = os.fstat(self.file.fileno()).st_size
+        if size - self.data_offset >= FOOTER.size:
+            self.file.seek(size - FOOTER.size)
+            index_offset, count, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+            if magic == FOOTER_MAGIC and index_offset + count * INDEX_ENTRY.size + FOOTER.size == size:
+                self.file.seek(index_offset)
+                raw = self.file.read(count * INDEX_ENTRY.size)
+                return index_offset, [INDEX_ENTRY.unpack_from(raw, i * INDEX_ENTRY.size) for i in range(count)]
+        return size, []
+
+    def records(self, start_us=0):
+        """Yield records from start_us on, seeking with the index where possible"""
+        offset, time_us = self.data_offset, 0
+        seeked = False
+        for entry_us, entry_offset in self.index:
+            if entry_us > start_us:
+                break
+            offset, time_us, seeked = entry_offset, entry_us, True
+
+        # An index entry carries the absolute time of the record it points at
+        self.file.seek(offset)
+        while offset + RECORD_HEADER.size <= self.data_end:
+            header = self.file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            source, delta, length = RECORD_HEADER.unpack(header)
+            data = self.file.read(length)
+            if len(data) < length or source >= len(self.sources):
+                return          # Truncated last record or damaged tail
+            offset += RECORD_HEADER.size + length
+            if seeked:
+                seeked = False
+            else:
+                time_us += delta
+            if time_us >= start_us:
+                yield time_us, self.sources[source][0], data
+
+    def close(self):
+        self.file.close()
+
+
+# ============================================================================
+# RECORDER
+# ============================================================================
+def _open_source(path):
+    """Open a FIFO (non-blocking) or connect to a Unix socket; return a file-like fd owner"""
+    if stat.S_ISSOCK(os.stat(path).st_mode):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        sock.setblocking(False)
+        return sock
+    return os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+
+def _close_source(handle):
+    if isinstance(handle, socket.socket):
+        handle.close()
+    else:
+        os.close(handle)
+
+
+def record(path, sources, duration=None):
+    writer = CaptureWriter(path, sources)
+    selector = selectors.DefaultSelector()
+    handles = {}
+    retry_at = dict.fromkeys(sources, 0.0)
+    buffer = bytearray(READ_CHUNK_SIZE)
+    end = time.monotonic() + duration if duration else None
+
+    print(f"Recording {', '.join(f'{name} ({p})' for name, p in sources.items())} -> {path}")
+    try:
+        while end is None or time.monotonic() < end:
+            now = time.monotonic()
+            for name, source_path in sources.items():
+                if name not in handles and now >= retry_at[name]:
+                    try:
+                        handles[name] = _open_source(source_path)
+                        selector.register(handles[name], selectors.EVENT_READ, name)
+                    except OSError:
+                        retry_at[name] = now + REOPEN_DELAY
+
+            for key, _ in selector.select(REOPEN_DELAY):
+                name = key.data
+                handle = handles[name]
+                try:
+                    if isinstance(handle, socket.socket):
+                        count = handle.recv_into(buffer)
+                    else:
+                        count = os.readv(handle, [buffer])
+                except BlockingIOError:
+                    continue
+                except OSError as e:
+                    if e.errno == errno.EINTR:
+                        continue
+                    count = 0
+
+                if count:
+                    writer.write(name, memoryview(buffer)[:count])
+                else:
+                    # Writer went away; reopen (the FIFO stays quiet until a new one connects)
+                    selector.unregister(handle)
+                    _close_source(handle)
+                    del handles[name]
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for handle in handles.values():
+            _close_source(handle)
+        selector.close()
+        writer.close()
+
+    print(f"Recorded {writer.record_count} chunks, {writer.byte_count} bytes, "
+          f"{writer.last_us / 1e6:.1f}s")
+
+
+# ============================================================================
+# REPLAYER
+# ============================================================================
+def _make_fifo(path):
+    if os.path.exists(path):
+        os.remove(path)
+    os.mkfifo(path)
+
+
+def replay(path, targets=None, speed=1.0, start=0.0, loop=False):
+    """Write a capture back into FIFOs with the original timing scaled by speed (0 = max)"""
+    reader = CaptureReader(path)
+    targets = dict(targets or {})
+    for name, _ in reader.sources:
+        targets.setdefault(name, DEFAULT_SOURCES.get(name))
+    missing = [name for name, target in targets.items() if target is None]
+    if missing:
+        raise ValueError(f"No target path for {', '.join(missing)} (use --target NAME=PATH)")
+
+    fds = {}
+    counters = {name: FrameCounter() for name in targets}
+    bytes_sent = 0
+    max_lag = 0.0
+    wall_start = time.monotonic()
+    try:
+        for name, target in targets.items():
+            _make_fifo(target)
+            print(f"⏳ {name} - Waiting for reader on {target}...")
+            fds[name] = os.open(target, os.O_WRONLY)     # Blocks until the backend opens it
+            print(f"✓ {name} - Connected")
+
+        start_us = int(start * 1_000_000)
+        wall_start = time.monotonic()
+        while True:
+            pass_start = time.monotonic()
+            for time_us, name, data in reader.records(start_us):
+                if speed > 0:
+                    due = pass_start + (time_us - start_us) / 1e6 / speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        max_lag = max(max_lag, -delay)
+                os.write(fds[name], data)
+                counters[name].feed(data)
+                bytes_sent += len(data)
+            if not loop:
+                break
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+        reader.close()
+
+    elapsed = max(time.monotonic() - wall_start, 1e-9)
+    frames = sum(counter.frame_count for counter in counters.values())
+    print(f"Replayed {bytes_sent} bytes, {frames} frames in {elapsed:.2f}s "
+          f"({frames / elapsed:.0f} frames/s, max lag {max_lag * 1000:.1f}ms)")
+    for name, counter in counters.items():
+        print(f"  {name}: {counter.frame_count} frames")
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+def _parse_pairs(pairs):
+    result = {}
+    for pair in pairs or []:
+        name, sep, path = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected NAME=PATH, got {pair}")
+        result[name] = path
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay Pico pipe traffic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="record pipe or diagnostics socket traffic")
+    rec.add_argument("capture")
+    rec.add_argument("--source", action="append", metavar="NAME=PATH",
+                     help="FIFO or Unix socket to record (default: both Pico FIFOs)")
+    rec.add_argument("--duration", type=float, help="stop after this many seconds")
+
+    rep = commands.add_parser("replay", help="replay a capture into the backend's pipes")
+    rep.add_argument("capture")
+    rep.add_argument("--target", action="append", metavar="NAME=PATH",
+                     help="FIFO to write a source to (default: the Pico FIFOs)")
+    rep.add_argument("--speed", type=float, default=1.0, help="1 = real time, 0 = as fast as possible")
+    rep.add_argument("--start", type=float, default=0.0, help="start this many seconds in")
+    rep.add_argument("--loop", action="store_true", help="replay until interrupted")
+
+    info = commands.add_parser("info", help="summarise a capture")
+    info.add_argument("capture")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.capture, _parse_pairs(args.source) or DEFAULT_SOURCES, args.duration)
+    elif args.command == "replay":
+        replay(args.capture, _parse_pairs(args.target), args.speed, args.start, args.loop)
+    else:
+        reader = CaptureReader(args.capture)
+        counters = {name: FrameCounter() for name, _ in reader.sources}
+        sizes = dict.fromkeys(counters, 0)
+        last = 0
+        for last, name, data in reader.records():
+            counters[name].feed(data)
+            sizes[name] += len(data)
+        print(f"{args.capture}: recorded {time.ctime(reader.started_at)}, {last / 1e6:.1f}s, "
+              f"{len(reader.index)} index entries")
+        for name, source_path in reader.sources:
+            print(f"  {name} ({source_path}): {sizes[name]} bytes, {counters[name].frame_count} frames, "
+                  f"{counters[name].dropped_frames} dropped")
+        reader.close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pico Ball Detection
+Threshold + debounce detection on Pico frames, shared by the backend and
+bridge.py (edge mode), so both sides trigger on exactly the same rule.
+
+In edge mode the bridge sends one compact event line per detection
+instead of the frames themselves:
+    DETECT,<min_distance_mm>,<unix time in ms>
+"""
+
+import time
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DETECTION_THRESHOLD = 1000      # mm
+MIN_TIME_BETWEEN_HITS = 1.0     # seconds
+
+EVENT_PREFIX = b"DETECT,"
+
+
+# ============================================================================
+# DETECTOR
+# ============================================================================
+class BallDetector:
+    """Triggers when any zone is closer than the threshold, at most once per debounce window"""
+
+    def __init__(self, threshold=DETECTION_THRESHOLD, min_time_between_hits=MIN_TIME_BETWEEN_HITS):
+        self.threshold = threshold
+        self.min_time_between_hits = min_time_between_hits
+        self.last_detection = 0.0
+        self.detection_count = 0
+
+    def update(self, distances, now=None):
+        """Check one frame; return the closest distance on a hit, else None"""
+        min_distance = min(distances)
+        if min_distance >= self.threshold:
+            return None
+        return self.trigger(min_distance, now)
+
+    def trigger(self, min_distance, now=None):
+        """Count a frame already known to be under the threshold, unless debounced"""
+        if now is None:
+            now = time.time()
+        if now - self.last_detection < self.min_time_between_hits:
+            return None
+
+        self.last_detection = now
+        self.detection_count += 1
+        return min_distance
+
+
+# ============================================================================
+# EVENT LINES
+# ============================================================================
+def encode_detection_event(min_distance, timestamp=None):
+    """Event line sent by the bridge in edge mode"""
+    if timestamp is None:
+        timestamp = time.time()
+    return b"%s%d,%d\n" % (EVENT_PREFIX, min_distance, int(timestamp * 1000))
+
+
+def decode_detection_event(line):
+    """Parse a stripped DETECT line into {"distance_mm", "timestamp"}; ValueError if malformed"""
+    _, distance, timestamp_ms = line.split(b",")
+    return {"distance_mm": int(distance), "timestamp": int(timestamp_ms) / 1000.0}
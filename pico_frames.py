@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Pico Frame Parser
+Incremental parser for the Pico stream that bridge.py forwards through the
+named pipes. Two frame formats are accepted on the same stream:
+
+- Legacy text:  DATA_START / one "distance,status" line per zone / DATA_END
+- Binary:       sync word, zone count, sequence number, source timestamp,
+                packed uint16 distances, uint8 statuses and a CRC16
+
+Both formats carry 4x4 (16 zones) or 8x8 (64 zones) frames: binary frames
+say so in the header, text frames by their number of zone lines. The
+resolution is therefore a property of each frame, and parser.resolution
+follows whatever the source currently sends.
+
+Between frames the stream may also carry DETECT event lines from bridge.py
+in edge mode (see pico_detect.py); they are collected in parser.events.
+
+The pipe is read in large chunks into a preallocated buffer and boundaries
+are found with bytes.find, so partial frames simply stay in the parser's
+buffer until the next read completes them.
+"""
+
+import binascii
+import math
+import struct
+import sys
+
+from pico_detect import EVENT_PREFIX, decode_detection_event
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+FRAME_START = b"DATA_START"
+FRAME_END = b"DATA_END"
+ZONES_PER_FRAME = 16        # Default resolution (4x4)
+ZONE_COUNTS = (16, 64)      # Supported resolutions: 4x4, 8x8
+MAX_LINE_LENGTH = 1000      # Same guard as the old byte-by-byte loop
+READ_CHUNK_SIZE = 4096
+
+# ============================================================================
+# BINARY FRAME FORMAT
+# ============================================================================
+# Little-endian layout:
+#   sync          2 bytes   0xA5 0x5A (never valid UTF-8 text)
+#   zone_count    uint8     16 (4x4) or 64 (8x8)
+#   sequence      uint16    wraps at 65536, small gaps = dropped frames
+#   timestamp_ms  uint32    Pico ticks_ms() when the frame was ranged
+#   distances     uint16 * zone_count
+#   statuses      uint8  * zone_count
+#   crc           uint16    CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)
+#                           over everything after the sync word
+BINARY_SYNC = b"\xa5\x5a"
+BINARY_HEADER = struct.Struct("<2sBHI")
+BINARY_CRC = struct.Struct("<H")
+BINARY_ZONE_COUNTS = ZONE_COUNTS
+SEQUENCE_MODULO = 1 << 16
+# Largest sequence gap still counted as dropped frames (~4s at the Picos' 15 fps).
+# Anything further ahead, or behind (Pico reboot, re-sent frames), is a resync.
+MAX_SEQUENCE_GAP = 64
+
+_DISTANCE_STRUCTS = {n: struct.Struct(f"<{n}H") for n in BINARY_ZONE_COUNTS}
+# Distances are little-endian uint16: on little-endian hosts (the Pi, x86) a
+# memoryview cast reads them in place instead of unpacking one int per zone
+_NATIVE_DISTANCES = sys.byteorder == "little"
+
+
+def resolution_label(zone_count):
+    """'4x4' for 16 zones, '8x8' for 64"""
+    side = math.isqrt(zone_count)
+    return f"{side}x{side}" if side * side == zone_count else str(zone_count)
+
+
+def binary_frame_size(zone_count):
+    """Total size in bytes of a binary frame with zone_count zones"""
+    return BINARY_HEADER.size + zone_count * 3 + BINARY_CRC.size
+
+
+def track_sequence(counts, sequence):
+    """Account one binary frame's sequence number on a FrameParser / FrameCounter
+
+    Repeats are counted as duplicates; a gap of up to MAX_SEQUENCE_GAP frames
+    as dropped frames; anything else (restart at 0, backwards jump, huge gap)
+    as a resync that starts counting afresh from this frame.
+    """
+    last = counts.last_sequence
+    if last is not None:
+        step = (sequence - last) % SEQUENCE_MODULO
+        if step == 0:
+            counts.duplicate_frames += 1
+            return
+        if step <= MAX_SEQUENCE_GAP + 1:
+            counts.dropped_frames += step - 1
+        else:
+            counts.sequence_resyncs += 1
+    counts.last_sequence = sequence
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE, the checksum used by binary frames"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_binary_frame(sequence, timestamp_ms, distances, statuses):
+    """Build one binary frame (reference for the Pico firmware and tools)"""
+    zone_count = len(distances)
+    if zone_count not in BINARY_ZONE_COUNTS or len(statuses) != zone_count:
+        raise ValueError(f"Binary frames carry 16 or 64 zones, got {zone_count}")
+
+    body = bytearray(BINARY_HEADER.pack(BINARY_SYNC, zone_count,
+                                        sequence % SEQUENCE_MODULO,
+                                        timestamp_ms & 0xFFFFFFFF))
+    body += _DISTANCE_STRUCTS[zone_count].pack(*distances)
+    body += bytes(statuses)
+    body += BINARY_CRC.pack(crc16(body[len(BINARY_SYNC):]))
+    return bytes(body)
+
+
+# ============================================================================
+# FRAME PARSER
+# ============================================================================
+class FrameParser:
+    """Turns raw pipe bytes into frames, keeping partial data across reads.
+
+    A frame is a list of dicts, one per zone:
+        {"zone": i, "distance_mm": int, "status": int}
+    or, with compact=True, a (distances, statuses) pair of int sequences,
+    which is what the NumPy frame history and the shm ring store anyway.
+
+    zones_per_frame=None accepts every resolution in ZONE_COUNTS and
+    resolution is the zone count of the last frame; a number only accepts
+    frames of that size.
+
+    Binary frames also update last_sequence / last_timestamp_ms; sequence
+    gaps are added to dropped_frames, repeats to duplicate_frames and jumps
+    (Pico reboot) to sequence_resyncs (see track_sequence). Detection events are
+    queued until pop_events() is called.
+    """
+
+    def __init__(self, zones_per_frame=None, max_line_length=MAX_LINE_LENGTH, compact=False):
+        self.zones_per_frame = zones_per_frame
+        self.zone_counts = ZONE_COUNTS if zones_per_frame is None else (zones_per_frame,)
+        self.max_zone_lines = max(self.zone_counts)
+        self.resolution = None      # Zone count of the last frame
+        self.max_line_length = max_line_length
+        self.compact = compact
+        self.buffer = bytearray()
+        self.zones = None           # None = between frames
+        self.statuses = None        # Compact mode: statuses of the current text frame
+        self.lines_in_frame = 0
+        self.frame_count = 0
+        self.binary_frame_count = 0
+        self.error_count = 0
+        self.crc_errors = 0
+        self.dropped_frames = 0
+        self.duplicate_frames = 0
+        self.sequence_resyncs = 0
+        self.last_sequence = None
+        self.last_timestamp_ms = None
+        self.events = []
+        self._pending_errors = 0
+
+    def reset(self):
+        """Drop any partial frame (e.g. after the pipe was reopened)"""
+        self.buffer.clear()
+        self.zones = None
+        self.lines_in_frame = 0
+        self.last_sequence = None
+
+    def pop_errors(self):
+        """Return the number of malformed lines/frames seen since the last call"""
+        errors = self._pending_errors
+        self._pending_errors = 0
+        return errors
+
+    def pop_events(self):
+        """Return the detection events seen since the last call"""
+        events = self.events
+        self.events = []
+        return events
+
+    def feed(self, data):
+        """Add a chunk of bytes and return the list of completed frames"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        start = 0
+        size = len(buffer)
+
+        while start < size:
+            end = buffer.find(b"\n", start)
+
+            # Between frames a binary sync word may come before the next line
+            if self.zones is None:
+                sync = buffer.find(BINARY_SYNC, start, size if end == -1 else end)
+                if sync != -1:
+                    consumed = self._handle_binary(buffer, sync, frames)
+                    if consumed == 0:
+                        start = sync
+                        break
+                    start = sync + consumed
+                    continue
+
+            if end == -1:
+                break
+
+            # A whole text frame in the buffer is parsed in one go
+            if (self.zones is None and end - start <= len(FRAME_START) + 1
+                    and buffer.startswith(FRAME_START, start)):
+                consumed = self._handle_text_block(buffer, end + 1, frames)
+                if consumed > 0:
+                    start = consumed
+                    continue
+                if consumed < 0 and size - start <= self.max_line_length:
+                    break           # Rest of the frame comes with the next read
+
+            frame = self._handle_line(bytes(buffer[start:end]).strip())
+            if frame is not None:
+                frames.append(frame)
+            start = end + 1
+
+        if start:
+            del buffer[:start]
+
+        # Prevent unbounded growth on malformed data (no newline, no frame)
+        if len(buffer) > self.max_line_length and not buffer.startswith(BINARY_SYNC):
+            buffer.clear()
+
+        return frames
+
+    def _error(self):
+        self.error_count += 1
+        self._pending_errors += 1
+
+    def _handle_binary(self, buffer, pos, frames):
+        """Decode a binary frame at pos; return bytes consumed, 0 if incomplete"""
+        if len(buffer) - pos < BINARY_HEADER.size:
+            return 0
+
+        _, zone_count, sequence, timestamp_ms = BINARY_HEADER.unpack_from(buffer, pos)
+        if zone_count not in BINARY_ZONE_COUNTS:
+            # Not a real sync word, resync on the next byte
+            self._error()
+            return 1
+
+        frame_size = binary_frame_size(zone_count)
+        if len(buffer) - pos < frame_size:
+            return 0
+
+        crc_pos = pos + frame_size - BINARY_CRC.size
+        (crc,) = BINARY_CRC.unpack_from(buffer, crc_pos)
+        if crc != crc16(buffer[pos + len(BINARY_SYNC):crc_pos]):
+            self.crc_errors += 1
+            self._error()
+            return 1
+
+        distances_pos = pos + BINARY_HEADER.size
+        statuses_pos = distances_pos + zone_count * 2
+        if self.compact and _NATIVE_DISTANCES:
+            distances = memoryview(bytes(buffer[distances_pos:statuses_pos])).cast("H")
+        else:
+            distances = _DISTANCE_STRUCTS[zone_count].unpack_from(buffer, distances_pos)
+        statuses = buffer[statuses_pos:statuses_pos + zone_count]
+
+        track_sequence(self, sequence)
+        self.last_timestamp_ms = timestamp_ms
+
+        if self.compact:
+            frames.append((distances, bytes(statuses)))
+        else:
+            frames.append([
+                {"zone": i, "distance_mm": distances[i], "status": statuses[i]}
+                for i in range(zone_count)
+            ])
+        self.frame_count += 1
+        self.binary_frame_count += 1
+        self.resolution = zone_count
+        return frame_size
+
+    def _handle_text_block(self, buffer, pos, frames):
+        """Parse a complete text frame whose zone lines start at pos.
+
+        Returns the offset after its DATA_END line, -1 if the frame is not
+        all in the buffer yet, or 0 if it is not clean; the line-by-line path
+        then takes over and does the error accounting.
+        """
+        frame_end = buffer.find(b"\n" + FRAME_END, pos - 1)
+        if frame_end == -1:
+            return -1
+        after = buffer.find(b"\n", frame_end + 1)
+        if after == -1:
+            return -1
+        if buffer[frame_end + 1:after].strip() != FRAME_END:
+            return 0
+
+        block = bytes(buffer[pos:frame_end + 1])
+        lines = block.count(b"\n")
+        if lines not in self.zone_counts or block.count(b",") != lines:
+            return 0
+        try:
+            values = list(map(int, block.replace(b",", b" ").split()))
+        except ValueError:
+            return 0
+        if len(values) != lines * 2:
+            return 0
+
+        distances = values[0::2]
+        statuses = values[1::2]
+        if self.compact:
+            frames.append((distances, statuses))
+        else:
+            frames.append([
+                {"zone": i, "distance_mm": distance, "status": status}
+                for i, (distance, status) in enumerate(zip(distances, statuses))
+            ])
+        self.frame_count += 1
+        self.resolution = lines
+        return after + 1
+
+    def _handle_line(self, line):
+        if self.zones is None:
+            if line == FRAME_START:
+                self._start_text_frame()
+            elif line.startswith(EVENT_PREFIX):
+                try:
+                    self.events.append(decode_detection_event(line))
+                except ValueError:
+                    self._error()
+            return None
+
+        if line == FRAME_END:
+            zones = self.zones
+            self.zones = None
+            if len(zones) == self.lines_in_frame and len(zones) in self.zone_counts:
+                self.frame_count += 1
+                self.resolution = len(zones)
+                return (zones, self.statuses) if self.compact else zones
+            return None
+
+        if line == FRAME_START:
+            # DATA_END of the previous frame was lost
+            self._error()
+            self._start_text_frame()
+            return None
+
+        if self.lines_in_frame < self.max_zone_lines:
+            zone = self.lines_in_frame
+            self.lines_in_frame += 1
+            try:
+                distance, status = line.split(b",")
+                if self.compact:
+                    distance, status = int(distance), int(status)
+                    self.zones.append(distance)
+                    self.statuses.append(status)
+                else:
+                    self.zones.append({
+                        "zone": zone,
+                        "distance_mm": int(distance),
+                        "status": int(status)
+                    })
+            except ValueError:
+                self._error()
+            return None
+
+        # More zone lines than any resolution has: the end marker was lost
+        self.zones = None
+        return None
+
+    def _start_text_frame(self):
+        self.zones = []
+        self.statuses = []
+        self.lines_in_frame = 0
+
+
+# ============================================================================
+# FRAME COUNTER
+# ============================================================================
+class FrameCounter:
+    """Counts frames in a byte stream without parsing them.
+
+    Text frames are counted by scanning for DATA_START; binary frames by
+    finding the sync word, peeking at the header for the sequence number
+    and skipping the rest of the frame. Meant for bridge.py, which only
+    forwards the bytes but still wants frame and drop statistics.
+    """
+
+    def __init__(self):
+        self.frame_count = 0
+        self.dropped_frames = 0
+        self.duplicate_frames = 0
+        self.sequence_resyncs = 0
+        self.last_sequence = None
+        self._text_tail = b""
+        self._pending = b""         # Start of a binary header split across reads
+        self._skip = 0              # Bytes of the current binary frame still to come
+
+    def feed(self, data):
+        """Scan a chunk of bytes and return the number of frames seen in it"""
+        data = bytes(data)
+
+        text = self._text_tail + data
+        frames = text.count(FRAME_START)
+        self._text_tail = text[-(len(FRAME_START) - 1):]
+
+        buf = self._pending + data
+        self._pending = b""
+        pos = self._skip
+        size = len(buf)
+
+        while pos < size:
+            sync = buf.find(BINARY_SYNC, pos)
+            if sync == -1:
+                # Keep a trailing first sync byte, the second may be in the next read
+                if buf[-1] == BINARY_SYNC[0]:
+                    self._pending = buf[-1:]
+                pos = size
+                break
+            if size - sync < BINARY_HEADER.size:
+                self._pending = buf[sync:]
+                pos = size
+                break
+
+            _, zone_count, sequence, _ = BINARY_HEADER.unpack_from(buf, sync)
+            if zone_count not in BINARY_ZONE_COUNTS:
+                pos = sync + 1
+                continue
+
+            frames += 1
+            track_sequence(self, sequence)
+            pos = sync + binary_frame_size(zone_count)
+
+        self._skip = pos - size if pos > size else 0
+        self.frame_count += frames
+        return frames
+
+
+# ============================================================================
+# PIPE READING
+# ============================================================================
+def iter_frames(pipe_file, parser=None, chunk_size=READ_CHUNK_SIZE):
+    """Yield frames from an unbuffered pipe/file until EOF.
+
+    Uses readinto() on one preallocated bytearray, so each syscall can
+    deliver many lines at once instead of a single byte.
+    """
+    if parser is None:
+        parser = FrameParser()
+
+    read_buffer = bytearray(chunk_size)
+    read_view = memoryview(read_buffer)
+
+    while True:
+        count = pipe_file.readinto(read_buffer)
+        if not count:
+            return
+        for frame in parser.feed(read_view[:count]):
+            yield frame
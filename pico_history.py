@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Pico Frame History
+Preallocated NumPy ring of the last N frames of one Pico: distances
+(uint16), statuses (uint8) and arrival times (float64). Appending a frame
+copies it into the next row, so nothing is allocated per frame, and
+detection runs as array operations over the newest rows.
+
+Because the history keeps several frames, a hit can be required to show up
+in consecutive frames (confirm_frames) before it counts.
+
+Other threads can copy recent frames without a lock (copy_last): the frame
+counter works like a seqlock, and a copy is retried when the writer has
+meanwhile overwritten the rows it was copying.
+
+ZoneBaseline adds the rule from sensor/sensorfinal1.py on top: per-zone
+empty-court baselines calibrated from the first seconds of frames, a median
+filter over the last few frames, a GOOD_ZONES mask and a minimum number of
+zones that must see something at the same time.
+
+GOOD_ZONES and MIN_ZONES_FOR_DETECTION are tuned on the 4x4 grid. At 8x8
+every 4x4 zone is the 2x2 block of zones it covers: the baselines and the
+filter work per 8x8 zone, and a 4x4 zone counts as seeing the ball when any
+zone of its block does, so the same settings work for both resolutions.
+"""
+
+import math
+import warnings
+
+import numpy as np
+
+from pico_frames import ZONES_PER_FRAME, ZONE_COUNTS, resolution_label
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+HISTORY_FRAMES = 256
+
+# Baseline detection defaults (see sensor/sensorfinal1.py)
+CALIBRATION_SECONDS = 3.0
+MIN_CALIBRATION_FRAMES = 10
+MEDIAN_WINDOW = 3
+BASELINE_THRESHOLD = 150        # mm closer than the baseline
+MIN_ZONES_FOR_DETECTION = 3
+GOOD_ZONES = [0, 5, 6, 9, 10, 11, 12, 13]
+VALID_STATUSES = (5, 9)         # VL53L5CX target status: valid / valid, large pulse
+
+
+GRID_SIDE = 4                   # GOOD_ZONES and min_zones are given on the 4x4 grid
+
+
+def scale_zones(zones, zone_count):
+    """4x4 zone indices -> the indices of the zones they cover at zone_count zones"""
+    side = math.isqrt(zone_count)
+    if zone_count not in ZONE_COUNTS or side % GRID_SIDE:
+        raise ValueError(f"Unsupported resolution: {zone_count} zones")
+    block = side // GRID_SIDE
+    return sorted(
+        (row * block + dy) * side + col * block + dx
+        for row, col in (divmod(zone, GRID_SIDE) for zone in zones if zone < GRID_SIDE * GRID_SIDE)
+        for dy in range(block) for dx in range(block)
+    )
+
+
+# ============================================================================
+# FRAME HISTORY
+# ============================================================================
+class FrameHistory:
+    """Ring of the last capacity frames; one writer, readers hold the caller's lock or use copy_last"""
+
+    def __init__(self, capacity=HISTORY_FRAMES, zones=ZONES_PER_FRAME):
+        self.capacity = capacity
+        self.zones = zones
+        self.distances = np.zeros((capacity, zones), dtype=np.uint16)
+        self.statuses = np.zeros((capacity, zones), dtype=np.uint8)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.total = 0              # Frames ever appended
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, distances, statuses, timestamp):
+        """Copy one frame into the next row; ValueError if the zone count is wrong"""
+        if len(distances) != self.zones or len(statuses) != self.zones:
+            raise ValueError(f"Frame has {len(distances)} zones, history holds {self.zones}")
+        row = self.total % self.capacity
+        self.distances[row] = distances
+        if isinstance(statuses, (bytes, bytearray, memoryview)):
+            self.statuses[row] = np.frombuffer(statuses, dtype=np.uint8)
+        else:
+            self.statuses[row] = statuses
+        self.timestamps[row] = timestamp
+        self.total += 1
+
+    def _rows(self, n, total=None):
+        """Row indices of the newest n frames, oldest first (a slice when contiguous)"""
+        if total is None:
+            total = self.total
+        n = min(n, total, self.capacity)
+        end = total % self.capacity or (self.capacity if total else 0)
+        if n <= end:
+            return slice(end - n, end)
+        return np.arange(total - n, total) % self.capacity
+
+    def last(self, n):
+        """(distances, statuses, timestamps) of the newest n frames, oldest first"""
+        rows = self._rows(n)
+        return self.distances[rows], self.statuses[rows], self.timestamps[rows]
+
+    def copy_last(self, n):
+        """Like last(n) but safe without the writer's lock: private copies, retried if overwritten"""
+        n = min(n, self.capacity - 1)       # The row being written is never part of a copy
+        while True:
+            total = self.total
+            rows = self._rows(n, total)
+            copied = (self.distances[rows].copy(), self.statuses[rows].copy(),
+                      self.timestamps[rows].copy())
+            # The writer fills row total % capacity before counting it, so
+            # frames total - n .. total - 1 are intact unless it came round again
+            if not n or self.total - total + min(n, total) < self.capacity:
+                return copied
+            n //= 2
+
+    def since(self, timestamp):
+        """(distances, statuses, timestamps) of the stored frames that arrived at or after timestamp"""
+        distances, statuses, timestamps = self.last(len(self))
+        keep = timestamps >= timestamp
+        return distances[keep], statuses[keep], timestamps[keep]
+
+    def hits(self, new_frames, threshold, confirm_frames=1, baseline=None):
+        """Hits among the newest new_frames frames as (min_distance, timestamp) pairs.
+
+        A frame is a hit when its closest zone is under threshold (or, with a
+        calibrated ZoneBaseline, when the baseline rule fires) and the
+        confirm_frames - 1 frames before it were hits too.
+        """
+        new_frames = min(new_frames, len(self))
+        if not new_frames:
+            return []
+
+        if baseline is not None:
+            window = new_frames + confirm_frames - 1 + baseline.median_window - 1
+            distances, statuses, timestamps = self.last(window)
+            below, closest = baseline.detect(distances, statuses)
+            timestamps = timestamps[len(timestamps) - len(below):]
+        elif new_frames == 1 and confirm_frames == 1:
+            # One frame per pipe read is the common case; skip the window setup
+            row = (self.total - 1) % self.capacity
+            closest = int(self.distances[row].min())
+            return [(closest, float(self.timestamps[row]))] if closest < threshold else []
+        else:
+            distances, _, timestamps = self.last(new_frames + confirm_frames - 1)
+            closest = distances.min(axis=1)
+            below = closest < threshold
+
+        if confirm_frames > 1:
+            run = np.concatenate(([0], np.cumsum(below)))
+            confirmed = np.zeros_like(below)
+            confirmed[confirm_frames - 1:] = (run[confirm_frames:] - run[:-confirm_frames]) == confirm_frames
+            below = confirmed
+
+        new_frames = min(new_frames, len(below))
+        indices = np.flatnonzero(below[len(below) - new_frames:]) + (len(below) - new_frames)
+        return [(int(closest[i]), float(timestamps[i])) for i in indices]
+
+    def to_json(self, n):
+        """Newest n frames as plain lists, oldest first (no lock needed)"""
+        distances, statuses, timestamps = self.copy_last(n)
+        return {
+            "distances": distances.tolist(),
+            "statuses": statuses.tolist(),
+            "timestamps": timestamps.tolist()
+        }
+
+
+# ============================================================================
+# BASELINE DETECTION
+# ============================================================================
+class ZoneBaseline:
+    """Per-zone empty-court distances and the filtered, masked detection rule"""
+
+    def __init__(self, zones=ZONES_PER_FRAME, good_zones=GOOD_ZONES, threshold=BASELINE_THRESHOLD,
+                 min_zones=MIN_ZONES_FOR_DETECTION, median_window=MEDIAN_WINDOW,
+                 calibration_seconds=CALIBRATION_SECONDS, valid_statuses=VALID_STATUSES):
+        self.zones = zones
+        self.threshold = threshold
+        self.min_zones = min_zones
+        self.median_window = median_window
+        self.calibration_seconds = calibration_seconds
+        self.valid_statuses = np.zeros(256, dtype=bool)       # Lookup table by status byte
+        self.valid_statuses[list(valid_statuses)] = True
+        self.block = math.isqrt(zones) // GRID_SIDE         # 8x8 zones per 4x4 zone side
+        self.good_mask = np.zeros(zones, dtype=bool)         # GOOD_ZONES as configured
+        self.good_mask[scale_zones(good_zones, zones)] = True
+        self.mask = self.good_mask.copy()                   # Minus zones the last calibration could not see
+        self.baseline = None
+        self.calibration_start = None
+        self.reset_pending = False
+        self._json = None
+
+    @property
+    def calibrated(self):
+        return self.baseline is not None
+
+    def reset(self):
+        """Forget the baseline; the next frames calibrate a new one (reader thread only)"""
+        self.baseline = None
+        self.calibration_start = None
+        self.reset_pending = False
+        self.mask = self.good_mask.copy()
+        self._json = None
+
+    def request_reset(self):
+        """Any thread: the reader resets before its next detection pass, never half-way through one"""
+        self.reset_pending = True
+
+    def calibrate(self, history):
+        """Build the baseline once calibration_seconds of frames are stored; return True when done"""
+        if self.calibrated:
+            return True
+        if not len(history):
+            return False
+
+        newest = history.timestamps[(history.total - 1) % history.capacity]
+        if self.calibration_start is None:
+            self.calibration_start = newest
+        if newest - self.calibration_start < self.calibration_seconds:
+            return False
+
+        distances, statuses, _ = history.since(self.calibration_start)
+        if len(distances) < MIN_CALIBRATION_FRAMES:
+            return False
+
+        samples = np.where(self.valid_statuses[statuses], distances, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)     # All-NaN zones
+            baseline = np.nanmedian(samples, axis=0)
+
+        # Zones that never gave a valid reading cannot be judged
+        missing = np.isnan(baseline)
+        self.mask = self.good_mask & ~missing
+        self.baseline = np.where(missing, 0.0, baseline)
+        self._json = None
+        return True
+
+    def detect(self, distances, statuses):
+        """Per-frame (hit, closest filtered distance) for all but the first median_window - 1 frames"""
+        closer = np.where(self.valid_statuses[statuses], self.baseline - distances, 0.0)
+
+        window = self.median_window
+        if window > 1:
+            frames = len(closer) - window + 1
+            if frames <= 0:
+                return np.zeros(0, dtype=bool), np.zeros(0, dtype=distances.dtype)
+            # Shifted views stacked on a new first axis: windows[:, i] are frames i .. i + window - 1
+            windows = np.stack([closer[i:i + frames] for i in range(window)])
+            if window % 2:
+                closer = np.partition(windows, window // 2, axis=0)[window // 2]
+            else:
+                closer = np.median(windows, axis=0)
+
+        hit = (closer > self.threshold) & self.mask
+        if self.block > 1:
+            # Pool each 2x2 block into its 4x4 zone
+            block = self.block
+            hit = hit.reshape(len(hit), GRID_SIDE, block, GRID_SIDE, block).any(axis=(2, 4))
+        zones_hit = hit.reshape(len(hit), -1).sum(axis=1)
+        closest = np.where(self.mask, self.baseline - closer, np.inf).min(axis=1)
+        return zones_hit >= self.min_zones, closest
+
+    def to_json(self):
+        """Calibration state as plain data; cached until the baseline changes"""
+        if self._json is None:
+            self._json = self._build_json()
+        return self._json
+
+    def _build_json(self):
+        return {
+            "calibrated": self.calibrated,
+            "resolution": resolution_label(self.zones),
+            "baseline": self.baseline.round().astype(int).tolist() if self.calibrated else None,
+            "zones": np.flatnonzero(self.mask).tolist()
+        }
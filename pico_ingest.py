@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Pico Ingest Loop
+One thread that watches every configured Pico pipe (or Unix socket) with
+selectors (epoll on Linux), reads whatever is available without blocking
+and feeds each source's own FrameParser.
+
+Sources come and go with bridge.py:
+- EOF (bridge closed its end) -> the fd is closed and the path is reopened
+  straight away; a FIFO opened with O_NONBLOCK does not report readable
+  again until a new writer connects, so this costs nothing while idle.
+- Path missing -> reopen is retried with a capped backoff.
+- Path recreated while we hold the old FIFO -> detected by comparing inodes
+  on sources that have been idle for a while.
+
+On Linux the directories of the source paths (/tmp) are also watched with
+inotify, so a FIFO that bridge.py recreates is opened the moment it appears
+instead of at the next backoff retry. Every source keeps reconnect metrics
+(LinkMetrics).
+
+ThreadSupervisor restarts reader threads that die, with capped exponential
+backoff, so one unexpected exception cannot silence a side of the court.
+"""
+
+import ctypes
+import errno
+import os
+import select
+import selectors
+import socket
+import stat
+import struct
+import threading
+import time
+import traceback
+
+from pico_frames import FrameParser, READ_CHUNK_SIZE
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+RETRY_MIN_DELAY = 0.05
+RETRY_MAX_DELAY = 2.0
+IDLE_CHECK_INTERVAL = 2.0
+MAX_SELECT_TIMEOUT = 0.5
+
+RESTART_MIN_DELAY = 0.1
+RESTART_MAX_DELAY = 10.0
+RESTART_STABLE_SECONDS = 30.0   # A thread alive this long starts over at RESTART_MIN_DELAY
+
+# inotify(7)
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+INOTIFY_EVENT = struct.Struct("iIII")       # wd, mask, cookie, name length
+WATCH_MASK = IN_CREATE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM
+
+
+def _load_inotify():
+    """(inotify_init1, inotify_add_watch) through libc, or None where unavailable"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        init = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    init.argtypes = [ctypes.c_int]
+    add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return init, add_watch
+
+
+_inotify = _load_inotify()
+
+
+# ============================================================================
+# RECONNECT METRICS
+# ============================================================================
+class LinkMetrics:
+    """Reconnect metrics of one bridge link (FIFO, socket or ring)"""
+
+    def __init__(self):
+        self.reconnects = 0
+        self.lost_at = None
+        self.last_downtime = None   # Seconds from losing the bridge to data flowing again
+        self.max_downtime = None
+        self.reopen_delay = None    # Seconds from the path being recreated to it being opened
+
+    def lost(self, now):
+        if self.lost_at is None:
+            self.lost_at = now
+
+    def restored(self, now):
+        if self.lost_at is not None:
+            self.last_downtime = now - self.lost_at
+            self.max_downtime = max(self.max_downtime or 0.0, self.last_downtime)
+            self.lost_at = None
+
+    def opened(self, created):
+        """A recreated path was opened; created is its st_ctime (wall clock)"""
+        self.reopen_delay = max(0.0, time.time() - created)
+
+    def to_json(self):
+        """Metrics in milliseconds (None until they happened)"""
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 1)
+        return {
+            "reconnects": self.reconnects,
+            "last_downtime_ms": ms(self.last_downtime),
+            "max_downtime_ms": ms(self.max_downtime),
+            "reopen_delay_ms": ms(self.reopen_delay)
+        }
+
+
+# ============================================================================
+# PATH WATCHER
+# ============================================================================
+class PathWatcher:
+    """inotify watch on the directories of some paths; reports creates and deletes"""
+
+    def __init__(self):
+        if _inotify is None:
+            raise OSError(errno.ENOSYS, "inotify not available")
+        self.fd = _inotify[0](IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.directories = {}       # Watch descriptor -> directory
+
+    @classmethod
+    def create(cls):
+        """A watcher, or None where inotify cannot be used (the loop then polls)"""
+        try:
+            return cls()
+        except OSError:
+            return None
+
+    def fileno(self):
+        return self.fd
+
+    def watch(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory in self.directories.values():
+            return
+        wd = _inotify[1](self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), directory)
+        self.directories[wd] = directory
+
+    def wait(self, timeout):
+        """Sleep until something happens in a watched directory or timeout passes"""
+        select.select([self.fd], [], [], timeout)
+        return self.read()
+
+    def read(self):
+        """(path, mask) for every event queued since the last call"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, pos)
+                pos += INOTIFY_EVENT.size
+                name = data[pos:pos + length].split(b"\0", 1)[0]
+                pos += length
+                directory = self.directories.get(wd)
+                if directory is not None and name:
+                    events.append((os.path.join(directory, os.fsdecode(name)), mask))
+
+    def close(self):
+        os.close(self.fd)
+
+
+# ============================================================================
+# SOURCE STATE
+# ============================================================================
+class PicoSource:
+    """Per-source state: fd, parser and reconnect bookkeeping"""
+
+    def __init__(self, name, path, parser=None):
+        self.name = name
+        self.path = path
+        self.parser = parser if parser is not None else FrameParser()
+        self.fd = None
+        self.sock = None
+        self.connected = False
+        self.retry_at = 0.0
+        self.retry_delay = RETRY_MIN_DELAY
+        self.last_data = 0.0
+        self.bytes_read = 0
+        self.inode = None
+        self.link = LinkMetrics()
+
+    def fileno(self):
+        return self.fd
+
+
+# ============================================================================
+# INGEST LOOP
+# ============================================================================
+class IngestLoop:
+    """Single-threaded reader for any number of Pico sources.
+
+    on_frames(name, frames, errors, parser) is called once per read with the
+    frames completed by that read (possibly empty if only errors or
+    detection events were seen; events are in parser.events).
+    on_state(name, connected) is called when a source starts or stops
+    delivering data.
+    """
+
+    def __init__(self, on_frames, on_state=None, chunk_size=READ_CHUNK_SIZE, watch_paths=True):
+        self.on_frames = on_frames
+        self.on_state = on_state
+        self.sources = {}
+        self.selector = selectors.DefaultSelector()
+        self.running = False
+        self.read_buffer = bytearray(chunk_size)
+        self.read_view = memoryview(self.read_buffer)
+        self._next_idle_check = 0.0
+        self.watcher = PathWatcher.create() if watch_paths else None
+
+    def add_source(self, name, path, parser=None):
+        source = PicoSource(name, path, parser)
+        self.sources[name] = source
+        if self.watcher is not None:
+            try:
+                self.watcher.watch(path)
+            except OSError:
+                pass                # Directory missing: backoff retries still cover it
+        return source
+
+    def stop(self):
+        self.running = False
+
+    # ----- open / close -----
+    def _open(self, source, now):
+        try:
+            mode = os.stat(source.path).st_mode
+            if stat.S_ISSOCK(mode):
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(source.path)
+                sock.setblocking(False)
+                source.sock = sock
+                source.fd = sock.fileno()
+            else:
+                source.fd = os.open(source.path, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            source.retry_at = now + source.retry_delay
+            source.retry_delay = min(source.retry_delay * 2, RETRY_MAX_DELAY)
+            return False
+
+        source.parser.reset()
+        source.retry_delay = RETRY_MIN_DELAY
+        source.last_data = now
+        self.selector.register(source.fd, selectors.EVENT_READ, source)
+
+        if source.sock is None:
+            info = os.fstat(source.fd)
+            if source.inode is not None and info.st_ino != source.inode:
+                source.link.opened(info.st_ctime)
+            source.inode = info.st_ino
+        return True
+
+    def _close(self, source):
+        if source.fd is None:
+            return
+        if source.connected:
+            source.link.lost(time.monotonic())
+        try:
+            self.selector.unregister(source.fd)
+        except (KeyError, ValueError):
+            pass
+        if source.sock is not None:
+            source.sock.close()
+            source.sock = None
+        else:
+            try:
+                os.close(source.fd)
+            except OSError:
+                pass
+        source.fd = None
+        self._set_connected(source, False)
+
+    def _reopen(self, source, now):
+        self._close(source)
+        source.link.reconnects += 1
+        self._open(source, now)
+
+    def _set_connected(self, source, connected):
+        if source.connected != connected:
+            source.connected = connected
+            if self.on_state is not None:
+                self.on_state(source.name, connected)
+
+    # ----- reading -----
+    def _read(self, source, now):
+        try:
+            if source.sock is not None:
+                count = source.sock.recv_into(self.read_buffer)
+            else:
+                count = os.readv(source.fd, [self.read_buffer])
+        except BlockingIOError:
+            return
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            self._reopen(source, now)
+            return
+
+        if not count:
+            # Writer went away; reopening immediately is safe (see module doc)
+            self._reopen(source, now)
+            return
+
+        source.bytes_read += count
+        source.last_data = now
+        if not source.connected:
+            source.link.restored(now)
+        self._set_connected(source, True)
+
+        frames = source.parser.feed(self.read_view[:count])
+        errors = source.parser.pop_errors()
+        if frames or errors or source.parser.events:
+            self.on_frames(source.name, frames, errors, source.parser)
+
+    def _check_idle(self, now):
+        """Reopen idle FIFOs whose path now points at a different inode"""
+        for source in self.sources.values():
+            if source.fd is None or source.sock is not None:
+                continue
+            if now - source.last_data < IDLE_CHECK_INTERVAL:
+                continue
+            try:
+                replaced = os.stat(source.path).st_ino != os.fstat(source.fd).st_ino
+            except OSError:
+                replaced = True
+            if replaced:
+                self._reopen(source, now)
+            else:
+                source.last_data = now
+
+    def _path_events(self, now):
+        """Open (or reopen) sources whose path was just created"""
+        for path, mask in self.watcher.read():
+            if not mask & (IN_CREATE | IN_MOVED_TO):
+                continue
+            for source in self.sources.values():
+                if os.path.abspath(source.path) != path:
+                    continue
+                if source.fd is None:
+                    self._open(source, now)
+                    continue
+                try:
+                    replaced = source.sock is not None or source.inode != os.stat(path).st_ino
+                except OSError:
+                    continue        # Gone again already
+                if replaced:
+                    self._reopen(source, now)
+
+    def poll(self, timeout):
+        """One iteration: wait up to timeout seconds and service ready sources"""
+        for key, _ in self.selector.select(timeout):
+            if key.data is self.watcher:
+                self._path_events(time.monotonic())
+            else:
+                self._read(key.data, time.monotonic())
+
+        now = time.monotonic()
+        for source in self.sources.values():
+            if source.fd is None and now >= source.retry_at:
+                self._open(source, now)
+
+        if now >= self._next_idle_check:
+            self._check_idle(now)
+            self._next_idle_check = now + IDLE_CHECK_INTERVAL
+
+    def _next_timeout(self):
+        now = time.monotonic()
+        deadline = self._next_idle_check
+        for source in self.sources.values():
+            if source.fd is None:
+                deadline = min(deadline, source.retry_at)
+        return max(0.0, min(deadline - now, MAX_SELECT_TIMEOUT))
+
+    def run(self):
+        """Run until stop() is called"""
+        self.running = True
+        now = time.monotonic()
+        if self.watcher is not None:
+            self.selector.register(self.watcher.fileno(), selectors.EVENT_READ, self.watcher)
+        for source in self.sources.values():
+            self._open(source, now)
+        self._next_idle_check = now + IDLE_CHECK_INTERVAL
+
+        try:
+            while self.running:
+                self.poll(self._next_timeout())
+        finally:
+            for source in self.sources.values():
+                self._close(source)
+            self.selector.close()
+            if self.watcher is not None:
+                self.watcher.close()
+                self.watcher = None
+
+
+# ============================================================================
+# THREAD SUPERVISOR
+# ============================================================================
+class SupervisedThread:
+    """One restartable reader thread and its restart bookkeeping"""
+
+    def __init__(self, name, target, args=()):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.thread = None
+        self.started_at = None
+        self.restart_at = 0.0
+        self.restart_delay = RESTART_MIN_DELAY
+        self.restarts = 0
+        self.last_error = None
+
+    def alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        try:
+            self.target(*self.args)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+
+    def start(self, now):
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.started_at = now
+        self.thread.start()
+
+    def metrics(self):
+        return {"alive": self.alive(), "restarts": self.restarts, "last_error": self.last_error}
+
+
+class ThreadSupervisor:
+    """Starts reader threads and restarts any that exit, with capped exponential backoff.
+
+    A thread that exits soon after a restart waits twice as long before the
+    next one (RESTART_MIN_DELAY .. RESTART_MAX_DELAY); one that stayed up
+    for RESTART_STABLE_SECONDS starts over at the minimum delay.
+    """
+
+    def __init__(self, on_restart=None):
+        self.on_restart = on_restart
+        self.tasks = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add(self, name, target, args=()):
+        task = SupervisedThread(name, target, args)
+        self.tasks[name] = task
+        return task
+
+    def start(self):
+        now = time.monotonic()
+        for task in self.tasks.values():
+            task.start(now)
+        self.thread = threading.Thread(target=self._run, name="supervisor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def check(self, now):
+        """Restart dead threads that are due; return seconds until the next one is"""
+        wait = RESTART_MIN_DELAY
+        for task in self.tasks.values():
+            if task.alive():
+                continue
+            if task.started_at is not None:
+                # Just noticed the exit: schedule the restart
+                if now - task.started_at >= RESTART_STABLE_SECONDS:
+                    task.restart_delay = RESTART_MIN_DELAY
+                task.restart_at = now + task.restart_delay
+                task.restart_delay = min(task.restart_delay * 2, RESTART_MAX_DELAY)
+                task.started_at = None
+            if now >= task.restart_at:
+                task.restarts += 1
+                task.start(now)
+                if self.on_restart is not None:
+                    self.on_restart(task.name, task.restarts, task.last_error)
+            else:
+                wait = min(wait, task.restart_at - now)
+        return wait
+
+    def _run(self):
+        while not self.stopped.wait(self.check(time.monotonic())):
+            pass
+
+    def metrics(self):
+        return {name: task.metrics() for name, task in self.tasks.items()}
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Shared-Memory Frame Ring
+Fixed-size ring buffer of parsed Pico frames in multiprocessing.shared_memory.
+
+bridge.py (the single producer) writes every parsed frame into one ring per
+Pico and never waits for anyone. Any number of consumers (the backend, a
+logger, a diagnostics tool) attach by name and read at their own pace. A
+consumer that falls more than one ring behind loses the oldest frames and
+sees that as an overrun count instead of stalling the bridge.
+
+Usage (diagnostics):
+    python3 pico_ring.py pico1_frames
+"""
+
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory, resource_tracker
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+RING_SLOTS = 256
+MAX_ZONES = 64
+SHM_DIR = "/dev/shm"
+
+# Ring header: magic, version, slot count, slot size, write sequence
+RING_MAGIC = b"PRNG"
+RING_VERSION = 1
+RING_HEADER = struct.Struct("<4sHHIQ")
+WRITE_SEQ_OFFSET = 12
+
+# Slot: sequence, source timestamp, zone count, distances, statuses, sequence
+# The writer clears the trailing sequence, writes the slot, then stamps the
+# trailer last; a reader only trusts a slot when both copies match the
+# sequence it expects (a seqlock without a lock).
+SLOT_HEADER = struct.Struct("<QdH")
+SLOT_SEQ = struct.Struct("<Q")
+SLOT_DISTANCES_OFFSET = 24
+SLOT_STATUSES_OFFSET = SLOT_DISTANCES_OFFSET + MAX_ZONES * 2
+SLOT_TRAILER_OFFSET = SLOT_STATUSES_OFFSET + MAX_ZONES
+SLOT_SIZE = SLOT_TRAILER_OFFSET + SLOT_SEQ.size
+
+
+def ring_size(slots):
+    return RING_HEADER.size + slots * SLOT_SIZE
+
+
+# ============================================================================
+# PRODUCER
+# ============================================================================
+class RingWriter:
+    """Single producer side, owned by bridge.py"""
+
+    def __init__(self, name, slots=RING_SLOTS):
+        self.name = name
+        self.slots = slots
+        try:
+            # Stale ring from a previous bridge run
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+        except FileNotFoundError:
+            pass
+
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=ring_size(slots))
+        self.buf = self.shm.buf
+        self.write_seq = 0
+        RING_HEADER.pack_into(self.buf, 0, RING_MAGIC, RING_VERSION, slots, SLOT_SIZE, 0)
+
+    def write(self, distances, statuses, timestamp=None):
+        """Publish one frame; never blocks"""
+        zone_count = len(distances)
+        if zone_count > MAX_ZONES:
+            raise ValueError(f"Frame has {zone_count} zones, ring holds at most {MAX_ZONES}")
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        seq = self.write_seq + 1
+        offset = RING_HEADER.size + (seq % self.slots) * SLOT_SIZE
+        buf = self.buf
+
+        SLOT_SEQ.pack_into(buf, offset + SLOT_TRAILER_OFFSET, 0)
+        SLOT_HEADER.pack_into(buf, offset, seq, timestamp, zone_count)
+        struct.pack_into(f"<{zone_count}H", buf, offset + SLOT_DISTANCES_OFFSET, *distances)
+        start = offset + SLOT_STATUSES_OFFSET
+        buf[start:start + zone_count] = bytes(statuses)
+        SLOT_SEQ.pack_into(buf, offset + SLOT_TRAILER_OFFSET, seq)
+
+        # Publish last, so readers never see a sequence before its slot
+        SLOT_SEQ.pack_into(buf, WRITE_SEQ_OFFSET, seq)
+        self.write_seq = seq
+        return seq
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ============================================================================
+# CONSUMERS
+# ============================================================================
+class RingReader:
+    """Consumer side; each reader keeps its own cursor and overrun count"""
+
+    def __init__(self, name):
+        self.name = name
+        self.shm = shared_memory.SharedMemory(name=name)
+        # Attaching registers the segment with this process' resource
+        # tracker, which would unlink it on exit; only the bridge owns it.
+        try:
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        except Exception:
+            pass
+
+        self.buf = self.shm.buf
+        magic, version, slots, slot_size, write_seq = RING_HEADER.unpack_from(self.buf, 0)
+        if magic != RING_MAGIC or version != RING_VERSION or slot_size != SLOT_SIZE:
+            self.shm.close()
+            raise ValueError(f"{name} is not a Pico frame ring")
+
+        self.slots = slots
+        self.cursor = write_seq     # Start with the next frame
+        self.overruns = 0
+
+    def write_seq(self):
+        return SLOT_SEQ.unpack_from(self.buf, WRITE_SEQ_OFFSET)[0]
+
+    def replaced(self):
+        """True if the bridge was restarted and created a new ring under this name"""
+        try:
+            current = os.stat(os.path.join(SHM_DIR, self.shm.name.lstrip("/")))
+            return current.st_ino != os.fstat(self.shm._fd).st_ino
+        except (OSError, AttributeError):
+            return False
+
+    def _slot(self, seq):
+        """Zero-copy view of a slot: (timestamp, distances, statuses) or None"""
+        offset = RING_HEADER.size + (seq % self.slots) * SLOT_SIZE
+        buf = self.buf
+        slot_seq, timestamp, zone_count = SLOT_HEADER.unpack_from(buf, offset)
+        if slot_seq != seq:
+            return None
+        start = offset + SLOT_DISTANCES_OFFSET
+        distances = buf[start:start + zone_count * 2].cast("H")
+        start = offset + SLOT_STATUSES_OFFSET
+        statuses = buf[start:start + zone_count]
+        return timestamp, distances, statuses
+
+    def _still_valid(self, seq):
+        offset = RING_HEADER.size + (seq % self.slots) * SLOT_SIZE
+        return SLOT_SEQ.unpack_from(self.buf, offset + SLOT_TRAILER_OFFSET)[0] == seq
+
+    def latest(self):
+        """Newest frame as zero-copy memoryviews: (seq, timestamp, distances, statuses).
+
+        The views point into the ring, so use them straight away; call
+        still_valid(seq) afterwards if the data must not have been overwritten.
+        Returns None if nothing has been written yet.
+        """
+        seq = self.write_seq()
+        if seq == 0:
+            return None
+        slot = self._slot(seq)
+        if slot is None:
+            return None
+        return (seq,) + slot
+
+    def still_valid(self, seq):
+        return self._still_valid(seq)
+
+    def read(self, max_frames=None):
+        """Return frames written since the last call as (seq, timestamp, distances, statuses)
+
+        Distances/statuses are copied out as lists so they stay valid.
+        Frames the producer already overwrote are counted in self.overruns.
+        """
+        write_seq = self.write_seq()
+        if write_seq < self.cursor:
+            # Producer restarted; follow the new ring from its current position
+            self.cursor = write_seq
+            return []
+
+        behind = write_seq - self.cursor
+        if behind > self.slots:
+            self.overruns += behind - self.slots
+            self.cursor = write_seq - self.slots
+
+        frames = []
+        while self.cursor < write_seq:
+            if max_frames is not None and len(frames) >= max_frames:
+                break
+            seq = self.cursor + 1
+            self.cursor = seq
+            slot = self._slot(seq)
+            if slot is None:
+                self.overruns += 1
+                continue
+            timestamp, distances, statuses = slot
+            frame = (seq, timestamp, distances.tolist(), list(statuses))
+            distances.release()
+            statuses.release()
+            if not self._still_valid(seq):
+                # Overwritten while we were copying it
+                self.overruns += 1
+                continue
+            frames.append(frame)
+        return frames
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+# ============================================================================
+# DIAGNOSTICS
+# ============================================================================
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 pico_ring.py <ring name>   (e.g. pico1_frames)")
+        sys.exit(1)
+
+    reader = RingReader(sys.argv[1])
+    print(f"Attached to {reader.name} ({reader.slots} slots)")
+    frames = 0
+    last_report = time.monotonic()
+    try:
+        while True:
+            frames += len(reader.read())
+            now = time.monotonic()
+            if now - last_report >= 1.0:
+                latest = reader.latest()
+                closest = min(latest[2]) if latest else None
+                del latest      # Drop the views before the ring can be closed
+                print(f"{frames / (now - last_report):6.1f} frames/s | seq {reader.cursor} | "
+                      f"overruns {reader.overruns} | closest {closest} mm")
+                frames = 0
+                last_report = now
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Pico Simulator
+Stands in for bridge.py and the Picos: creates the backend's Pico FIFOs and
+streams synthetic 4x4 (or 8x8) frames into them, so the backend can be
+load-tested without a Raspberry Pi, pigpio or VL53L5CX sensors.
+
+Frames are sent as DATA_START / zone lines / DATA_END text (default) or in
+the binary format, with configurable rate, distance noise, dropped frames,
+malformed lines and scripted ball events (a few frames where some zones see
+something close).
+
+Usage:
+    python3 pico_simulator.py --rate 15                     # like the real Picos
+    python3 pico_simulator.py --rate 0 --duration 30        # max sustained rate
+    python3 pico_simulator.py --ball-every 5 --backend-url http://localhost:5000
+    python3 pico_simulator.py --ball 2.5:PICO_1 --ball 4:PICO_2:300 --malformed 0.01
+
+With --backend-url the simulator also listens for the backend's 'pointscored'
+Socket.IO event (inside 'scoringupdate' when the backend coalesces
+broadcasts) to measure detection latency from the injected ball frame, and
+compares its own counters with /picodata when it stops.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+import urllib.request
+
+from pico_frames import FRAME_START, FRAME_END, encode_binary_frame
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Same ports as PICO_CONFIGS in the backend
+PICO_PORTS = {
+    "PICO_1": "/tmp/pico1_serial",
+    "PICO_2": "/tmp/pico2_serial",
+}
+BASELINE_MIN = 1500         # mm, empty court distances per zone
+BASELINE_MAX = 2500
+STATUS_VALID = 5
+BALL_DISTANCE = 400         # mm
+BALL_FRAMES = 3             # Frames a passing ball stays visible
+
+
+def centre_zones(zones):
+    """The 2x2 block in the middle of a 4x4 or 8x8 frame, where a ball is seen"""
+    side = int(zones ** 0.5)
+    middle = side // 2
+    return [row * side + col for row in (middle - 1, middle) for col in (middle - 1, middle)]
+
+
+# ============================================================================
+# SIMULATED PICO
+# ============================================================================
+class SimulatedPico:
+    """Frame source for one Pico"""
+
+    def __init__(self, name, path, zones=16, binary=False, noise=20.0, dropout=0.0,
+                 malformed=0.0, rng=None):
+        self.name = name
+        self.path = path
+        self.zones = zones
+        self.binary = binary
+        self.noise = noise
+        self.dropout = dropout
+        self.malformed = malformed
+        self.rng = rng or random.Random()
+        self.baseline = [self.rng.randint(BASELINE_MIN, BASELINE_MAX) for _ in range(zones)]
+        self.fd = None
+        self.sequence = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.malformed_lines = 0
+        self.ball_frames_left = 0
+        self.ball_distance = BALL_DISTANCE
+        self.ball_zones = ()
+
+    def open(self):
+        """Create the FIFO and wait for the backend to open it"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.mkfifo(self.path)
+        print(f"⏳ {self.name} - Waiting for backend on {self.path}...")
+        self.fd = os.open(self.path, os.O_WRONLY)
+        print(f"✓ {self.name} - Backend connected")
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def start_ball(self, distance=BALL_DISTANCE):
+        self.ball_frames_left = BALL_FRAMES
+        self.ball_distance = distance
+        self.ball_zones = centre_zones(self.zones)
+
+    def distances(self):
+        rng = self.rng
+        distances = [max(0, int(base + rng.gauss(0, self.noise))) for base in self.baseline]
+        if self.ball_frames_left:
+            self.ball_frames_left -= 1
+            for zone in self.ball_zones:
+                distances[zone] = self.ball_distance
+        return distances
+
+    def frame(self):
+        """Bytes for the next frame, or b"" if this frame is dropped"""
+        distances = self.distances()
+        self.sequence += 1
+        if self.dropout and self.rng.random() < self.dropout:
+            self.frames_dropped += 1
+            return b""
+
+        if self.binary:
+            data = encode_binary_frame(self.sequence, int(time.monotonic() * 1000),
+                                       distances, [STATUS_VALID] * self.zones)
+            if self.malformed and self.rng.random() < self.malformed:
+                self.malformed_lines += 1
+                data = data[:-1] + bytes([data[-1] ^ 0xFF])     # Bad CRC
+            self.frames_sent += 1
+            return data
+
+        lines = [FRAME_START]
+        for distance in distances:
+            if self.malformed and self.rng.random() < self.malformed:
+                self.malformed_lines += 1
+                lines.append(b"%d;??" % distance)
+            else:
+                lines.append(b"%d,%d" % (distance, STATUS_VALID))
+        lines.append(FRAME_END)
+        self.frames_sent += 1
+        return b"\n".join(lines) + b"\n"
+
+
+# ============================================================================
+# BACKEND OBSERVATION (optional)
+# ============================================================================
+class BackendWatcher:
+    """Measures ball-to-'pointscored' latency over Socket.IO (separate or inside 'scoringupdate')"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.injected = []          # Wall-clock times of injected balls
+        self.latencies = []
+        self.client = None
+        try:
+            import socketio
+        except ImportError:
+            print("⚠ python-socketio not installed - detection latency not measured")
+            return
+
+        self.client = socketio.Client(reconnection=False)
+        self.client.on("pointscored", self._on_point)
+        self.client.on("scoringupdate", self._on_update)
+        try:
+            self.client.connect(self.url, wait_timeout=5)
+        except Exception as e:
+            print(f"⚠ Socket.IO connection failed ({e}) - detection latency not measured")
+            self.client = None
+
+    def ball(self):
+        self.injected.append(time.time())
+
+    def _on_update(self, data):
+        """Combined broadcast (COALESCE_BROADCASTS): the events it carries, in order"""
+        for event in data.get("events", []):
+            if event.get("event") == "pointscored":
+                self._on_point(event.get("data", {}))
+
+    def _on_point(self, data):
+        if data.get("action") == "subtractpoint" or not self.injected:
+            return
+        self.latencies.append((time.time() - self.injected[-1]) * 1000)
+        self.injected.clear()
+
+    def picodata(self):
+        try:
+            with urllib.request.urlopen(f"{self.url}/picodata", timeout=2) as response:
+                return json.load(response).get("pico_data")
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not read /picodata: {e}")
+            return None
+
+    def close(self):
+        if self.client is not None:
+            self.client.disconnect()
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+def parse_ball(text):
+    """T:PICO[:mm] -> (seconds, pico name, distance)"""
+    parts = text.split(":")
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError(f"Expected T:PICO[:mm], got {text}")
+    return float(parts[0]), parts[1], int(parts[2]) if len(parts) == 3 else BALL_DISTANCE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream synthetic Pico frames into the backend's FIFOs")
+    parser.add_argument("--rate", type=float, default=15.0, help="frames/s per Pico, 0 = as fast as possible")
+    parser.add_argument("--zones", type=int, choices=(16, 64), default=16, help="16 = 4x4, 64 = 8x8")
+    parser.add_argument("--binary", action="store_true", help="send binary frames instead of text")
+    parser.add_argument("--noise", type=float, default=20.0, help="distance noise (std dev, mm)")
+    parser.add_argument("--dropout", type=float, default=0.0, help="probability of dropping a frame")
+    parser.add_argument("--malformed", type=float, default=0.0, help="probability of a malformed zone line")
+    parser.add_argument("--ball", type=parse_ball, action="append", default=[], metavar="T:PICO[:mm]",
+                        help="scripted ball at T seconds on PICO")
+    parser.add_argument("--ball-every", type=float, metavar="S", help="ball on a random Pico every S seconds")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--seed", type=int, help="random seed for repeatable runs")
+    parser.add_argument("--backend-url", help="e.g. http://localhost:5000, to measure detection latency")
+    parser.add_argument("--pico", action="append", metavar="NAME=PATH",
+                        help="FIFO per simulated Pico (default: the backend's PICO_CONFIGS ports)")
+    args = parser.parse_args()
+
+    ports = dict(PICO_PORTS)
+    if args.pico:
+        ports = dict(pair.split("=", 1) for pair in args.pico)
+    rng = random.Random(args.seed)
+    picos = {
+        name: SimulatedPico(name, path, args.zones, args.binary, args.noise, args.dropout,
+                            args.malformed, random.Random(rng.random()))
+        for name, path in ports.items()
+    }
+    script = sorted(args.ball)
+    unknown = {name for _, name, _ in script} - set(picos)
+    if unknown:
+        parser.error(f"Unknown Pico in --ball: {', '.join(sorted(unknown))}")
+
+    watcher = None
+    start = time.monotonic()
+    try:
+        for pico in picos.values():
+            pico.open()
+        if args.backend_url:
+            watcher = BackendWatcher(args.backend_url)
+
+        print(f"Streaming {args.zones}-zone {'binary' if args.binary else 'text'} frames "
+              f"at {args.rate or 'max'} frames/s per Pico. Ctrl+C to stop.")
+        interval = 1.0 / args.rate if args.rate else 0.0
+        start = time.monotonic()
+        next_frame = start
+        next_random_ball = start + args.ball_every if args.ball_every else None
+        next_report = start + 5
+
+        while args.duration is None or time.monotonic() - start < args.duration:
+            now = time.monotonic()
+            while script and start + script[0][0] <= now:
+                _, name, distance = script.pop(0)
+                picos[name].start_ball(distance)
+                if watcher:
+                    watcher.ball()
+                print(f"🎾 Ball on {name} at {distance}mm")
+            if next_random_ball is not None and now >= next_random_ball:
+                name = rng.choice(list(picos))
+                picos[name].start_ball()
+                if watcher:
+                    watcher.ball()
+                print(f"🎾 Ball on {name}")
+                next_random_ball += args.ball_every
+
+            for pico in picos.values():
+                data = pico.frame()
+                if data:
+                    os.write(pico.fd, data)
+
+            if now >= next_report:
+                sent = sum(pico.frames_sent for pico in picos.values())
+                print(f"📊 {sent / (now - start):.0f} frames/s total, {sent} sent")
+                next_report += 5
+
+            if interval:
+                next_frame += interval
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        elapsed = max(time.monotonic() - start, 1e-9)
+        for pico in picos.values():
+            pico.close()
+
+    print(f"\nStatistics ({elapsed:.1f}s):")
+    for pico in picos.values():
+        print(f"  {pico.name}: {pico.frames_sent} frames ({pico.frames_sent / elapsed:.0f}/s), "
+              f"{pico.frames_dropped} dropped, {pico.malformed_lines} malformed")
+
+    if watcher is not None:
+        if watcher.latencies:
+            latencies = sorted(watcher.latencies)
+            print(f"  Detection latency: {len(latencies)} points, "
+                  f"p50 {latencies[len(latencies) // 2]:.1f} ms, max {latencies[-1]:.1f} ms")
+        backend = watcher.picodata()
+        if backend:
+            for name in picos:
+                info = backend.get(name)
+                if info:
+                    print(f"  Backend {name}: {info.get('frame_count')} frames, "
+                          f"{info.get('error_count')} errors, {info.get('dropped_frames')} dropped")
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
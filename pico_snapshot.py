@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Pico State Snapshots
+The reader threads publish an immutable snapshot of each Pico's state
+(connection, counters, newest frame, baseline) after every batch of frames.
+Publishing is a single reference assignment, which is atomic in CPython, so
+HTTP handlers and broadcasters read the latest snapshot without taking the
+lock the reader threads use while ingesting frames. A slow /picodata client
+can no longer hold up frame ingestion.
+
+Each Pico has exactly one writer (its reader thread); readers never see a
+half-updated snapshot because a snapshot is never modified once published.
+"""
+
+import collections
+
+# ============================================================================
+# SNAPSHOT
+# ============================================================================
+PicoSnapshot = collections.namedtuple("PicoSnapshot", [
+    "connected",
+    "frame_count",
+    "error_count",
+    "dropped_frames",
+    "overruns",
+    "zones",
+    "timestamp",        # Arrival time of the newest frame, None before the first
+    "distances",        # Newest frame as tuples, None before the first
+    "statuses",
+    "baseline",         # ZoneBaseline.to_json() or None
+    "link",             # LinkMetrics.to_json(): reconnects and recovery times
+])
+
+EMPTY_SNAPSHOT = PicoSnapshot(False, 0, 0, 0, 0, None, None, None, None, None,
+                              {"reconnects": 0, "last_downtime_ms": None, "max_downtime_ms": None,
+                               "reopen_delay_ms": None})
+
+
+def frame_dicts(snapshot):
+    """Newest frame as the list of zone dicts /picodata has always returned"""
+    if snapshot.distances is None:
+        return None
+    return [
+        {"zone": zone, "distance_mm": distance, "status": status}
+        for zone, (distance, status) in enumerate(zip(snapshot.distances, snapshot.statuses))
+    ]
+
+
+# ============================================================================
+# BOARD
+# ============================================================================
+class SnapshotBoard:
+    """Latest snapshot per source: one writer per source, lock-free readers"""
+
+    def __init__(self, names):
+        self._snapshots = dict.fromkeys(names, EMPTY_SNAPSHOT)
+
+    def publish(self, name, snapshot):
+        # Replacing the value of an existing key never resizes the dict, so
+        # concurrent readers (including all()) are safe
+        self._snapshots[name] = snapshot
+
+    def update(self, name, **changes):
+        """Publish the current snapshot with some fields replaced (writer only)"""
+        snapshot = self._snapshots[name]._replace(**changes)
+        self.publish(name, snapshot)
+        return snapshot
+
+    def get(self, name):
+        return self._snapshots[name]
+
+    def all(self):
+        """Name -> snapshot for every source"""
+        return dict(self._snapshots)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Pico Sensor Stream
+Opt-in live stream of Pico frames for diagnostics UIs, served on its own
+Socket.IO namespace (/sensors) so scoreboard clients on "/" never see it.
+
+A client connects to /sensors and emits 'subscribe' with its options:
+    {"picos": ["PICO_1"],       # default: all
+     "every": 3,                # send every 3rd frame of each Pico
+     "delta": true,             # only zones that changed since the last frame sent
+     "deadband": 20,            # delta mode: ignore changes smaller than this (mm)
+     "max_in_flight": 4}        # unacknowledged frames before frames are dropped
+
+and then receives 'frame' events:
+    {"pico": "PICO_1", "seq": 1234, "zones": 16, "delta": false, "data": <bytes>}
+
+data is little-endian and packed so it maps straight onto typed arrays:
+    full frame:  distances uint16[zones], statuses uint8[zones]
+    delta:       distances uint16[n], zone indices uint8[n], statuses uint8[n]
+The first frame after subscribing is always full.
+
+Every 'frame' event must be acknowledged (return from the handler, or call
+the ack callback in JS). A subscriber with max_in_flight frames not yet
+acknowledged has frames dropped for it alone; deltas are always computed
+against what that subscriber last received, so drops never corrupt its view.
+
+Frames are sent from one background thread that reads the published Pico
+snapshots (pico_snapshot.py); the ingest path only sets an Event, and only
+while someone is subscribed.
+"""
+
+import threading
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+NAMESPACE = "/sensors"
+MAX_EVERY = 1000
+DEFAULT_MAX_IN_FLIGHT = 4
+MAX_IN_FLIGHT = 64
+
+
+def encode_frame(distances, statuses):
+    """Full frame payload"""
+    return distances.astype("<u2").tobytes() + statuses.astype(np.uint8).tobytes()
+
+
+def encode_delta(distances, statuses, changed):
+    """Delta payload for the zones in changed"""
+    return (distances[changed].astype("<u2").tobytes() + changed.astype(np.uint8).tobytes()
+            + statuses[changed].astype(np.uint8).tobytes())
+
+
+# ============================================================================
+# SUBSCRIBER
+# ============================================================================
+class Subscriber:
+    """One /sensors client and what it has been sent"""
+
+    def __init__(self, sid, picos, every=1, delta=False, deadband=0, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.sid = sid
+        self.picos = picos
+        self.every = every
+        self.delta = delta
+        self.deadband = deadband
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.sent = 0
+        self.dropped = 0
+        self.next_seq = {}          # Pico -> first frame number due
+        self.last = {}              # Pico -> (distances, statuses) as the client has them
+
+    def options(self):
+        return {"picos": self.picos, "every": self.every, "delta": self.delta,
+                "deadband": self.deadband, "max_in_flight": self.max_in_flight}
+
+
+def parse_options(options, known_picos):
+    """Validate a 'subscribe' payload; ValueError with a message for the client"""
+    options = options or {}
+    picos = options.get("picos") or list(known_picos)
+    unknown = [name for name in picos if name not in known_picos]
+    if unknown:
+        raise ValueError(f"Unknown Pico: {', '.join(map(str, unknown))}")
+    every = int(options.get("every", 1))
+    deadband = int(options.get("deadband", 0))
+    max_in_flight = int(options.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT))
+    if not 1 <= every <= MAX_EVERY:
+        raise ValueError(f"every must be 1-{MAX_EVERY}")
+    if deadband < 0:
+        raise ValueError("deadband must be >= 0")
+    if not 1 <= max_in_flight <= MAX_IN_FLIGHT:
+        raise ValueError(f"max_in_flight must be 1-{MAX_IN_FLIGHT}")
+    return {"picos": picos, "every": every, "delta": bool(options.get("delta", False)),
+            "deadband": deadband, "max_in_flight": max_in_flight}
+
+
+# ============================================================================
+# STREAM
+# ============================================================================
+class SensorStream:
+    """Subscribers plus the sender loop.
+
+    emit(event, data, to, callback) sends one event to one client; snapshots()
+    returns the current {pico: PicoSnapshot}. Both come from the backend, so
+    this module does not depend on Flask.
+    """
+
+    def __init__(self, emit, snapshots):
+        self.emit = emit
+        self.snapshots = snapshots
+        self.subscribers = {}       # sid -> Subscriber
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+
+    @property
+    def active(self):
+        return bool(self.subscribers)
+
+    def notify(self):
+        """New frames were published (ingest threads; cheap, no-op without subscribers)"""
+        if self.subscribers:
+            self.wakeup.set()
+
+    def subscribe(self, sid, options, known_picos):
+        subscriber = Subscriber(sid, **parse_options(options, known_picos))
+        with self.lock:
+            self.subscribers[sid] = subscriber
+        self.wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, sid):
+        with self.lock:
+            return self.subscribers.pop(sid, None)
+
+    def stats(self):
+        with self.lock:
+            return [{"sid": s.sid, "sent": s.sent, "dropped": s.dropped, "in_flight": s.in_flight,
+                     **s.options()} for s in self.subscribers.values()]
+
+    def run(self):
+        """Sender loop (background thread)"""
+        self.running = True
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            if self.running and self.subscribers:
+                self.send_pending()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def send_pending(self):
+        """Send the newest frame of each Pico to every subscriber it is due for"""
+        frames = {}
+        for name, snapshot in self.snapshots().items():
+            if snapshot.distances is not None:
+                frames[name] = (snapshot.frame_count, np.array(snapshot.distances, dtype=np.uint16),
+                                np.array(snapshot.statuses, dtype=np.uint8))
+
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+
+        for subscriber in subscribers:
+            for name in subscriber.picos:
+                if name in frames:
+                    self._send(subscriber, name, *frames[name])
+
+    def _send(self, subscriber, name, seq, distances, statuses):
+        if seq < subscriber.next_seq.get(name, 0):
+            return
+        subscriber.next_seq[name] = seq + subscriber.every
+
+        with self.lock:
+            if subscriber.in_flight >= subscriber.max_in_flight:
+                subscriber.dropped += 1
+                return
+            subscriber.in_flight += 1
+
+        last = subscriber.last.get(name)
+        delta = subscriber.delta and last is not None and len(last[0]) == len(distances)
+        if delta:
+            last_distances, last_statuses = last
+            moved = np.abs(distances.astype(np.int32) - last_distances) >= max(subscriber.deadband, 1)
+            changed = np.flatnonzero(moved | (statuses != last_statuses))
+            data = encode_delta(distances, statuses, changed)
+            # Only the zones sent change on the client's side
+            last_distances[changed] = distances[changed]
+            last_statuses[changed] = statuses[changed]
+        else:
+            data = encode_frame(distances, statuses)
+            subscriber.last[name] = (distances.astype(np.int32), statuses.copy())
+
+        def acked(*_):
+            with self.lock:
+                subscriber.in_flight -= 1
+
+        self.emit("frame", {"pico": name, "seq": seq, "zones": len(distances),
+                            "delta": delta, "data": data}, subscriber.sid, acked)
+        subscriber.sent += 1
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Pico Stream Tee
+Fans one Pico's raw byte stream out to several sinks, so traffic can be
+recorded or inspected while the backend keeps reading its FIFO:
+
+- PipeSink        the backend FIFO (or any pipe)
+- CaptureSink     rotating raw capture file
+- SocketServer    Unix socket; every client that connects becomes a sink
+
+On Linux each chunk is written once into a private staging pipe and then
+duplicated into pipe sinks with tee(2) and moved into the capture file with
+splice(2), so the kernel copies pages instead of the bridge writing the same
+bytes N times. Anywhere else (or for socket clients) sinks are written from
+the same buffer with os.write.
+
+Every sink has its own backpressure policy:
+- block         wait until the sink accepts the data (stalls the writing thread)
+- drop-oldest   queue up to max_queue bytes, then throw away the oldest
+- disconnect    queue up to max_queue bytes, then close the sink
+"""
+
+import collections
+import ctypes
+import errno
+import os
+import socket
+import stat
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+BLOCK = "block"
+DROP_OLDEST = "drop-oldest"
+DISCONNECT = "disconnect"
+POLICIES = (BLOCK, DROP_OLDEST, DISCONNECT)
+
+SINK_QUEUE_BYTES = 256 * 1024
+STAGE_CHUNK = 65536                 # Default Linux pipe capacity
+CAPTURE_MAX_BYTES = 16 * 1024 * 1024
+CAPTURE_BACKUPS = 5
+
+SPLICE_F_NONBLOCK = 2
+
+
+def _load_tee():
+    """tee(2) through libc, or None where it (or os.splice) is unavailable"""
+    if not hasattr(os, "splice"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        tee = libc.tee
+    except (OSError, AttributeError):
+        return None
+    tee.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_size_t, ctypes.c_uint]
+    tee.restype = ctypes.c_ssize_t
+    return tee
+
+
+_tee = _load_tee()
+
+
+# ============================================================================
+# SINKS
+# ============================================================================
+class Sink:
+    """One output of the tee with its own queue and backpressure policy"""
+
+    is_pipe = False
+
+    def __init__(self, name, fd, policy=BLOCK, max_queue=SINK_QUEUE_BYTES):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.name = name
+        self.fd = fd
+        self.policy = policy
+        self.max_queue = max_queue
+        self.queue = collections.deque()
+        self.queued_bytes = 0
+        self.written_bytes = 0
+        self.dropped_bytes = 0
+        self.closed = False
+        os.set_blocking(fd, policy == BLOCK)
+
+    def fileno(self):
+        return self.fd
+
+    def _write(self, data):
+        """Write as much as the sink takes now; blocking sinks take everything"""
+        view = memoryview(data)
+        total = 0
+        while total < len(view):
+            try:
+                written = os.write(self.fd, view[total:])
+            except BlockingIOError:
+                break
+            total += written
+            if self.policy != BLOCK:
+                break
+        self.written_bytes += total
+        return total
+
+    def flush(self):
+        """Write queued data until the sink would block"""
+        while self.queue:
+            chunk = self.queue[0]
+            written = self._write(chunk)
+            self.queued_bytes -= written
+            if written < len(chunk):
+                self.queue[0] = chunk[written:]
+                return
+            self.queue.popleft()
+
+    def send(self, data, offset=0):
+        """Deliver data[offset:], queueing whatever the sink cannot take yet"""
+        if self.queue:
+            self.flush()
+        if not self.queue and offset < len(data):
+            offset += self._write(memoryview(data)[offset:])
+        if offset < len(data):
+            self._enqueue(bytes(data[offset:]))
+
+    def _enqueue(self, data):
+        if self.queued_bytes + len(data) > self.max_queue:
+            if self.policy == DISCONNECT:
+                self.close()
+                return
+            # DROP_OLDEST
+            while self.queue and self.queued_bytes + len(data) > self.max_queue:
+                dropped = self.queue.popleft()
+                self.queued_bytes -= len(dropped)
+                self.dropped_bytes += len(dropped)
+            if len(data) > self.max_queue:
+                self.dropped_bytes += len(data) - self.max_queue
+                data = data[-self.max_queue:]
+        self.queue.append(data)
+        self.queued_bytes += len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self.queued_bytes = 0
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class PipeSink(Sink):
+    """A pipe or FIFO; fed with tee(2) from the staging pipe when possible"""
+
+    is_pipe = True
+
+    def tee_from(self, stage_fd, length):
+        """Duplicate up to length staged bytes into this pipe; return the count"""
+        flags = 0 if self.policy == BLOCK else SPLICE_F_NONBLOCK
+        count = _tee(stage_fd, self.fd, length, flags)
+        if count < 0:
+            err = ctypes.get_errno()
+            if err == errno.EAGAIN:
+                return 0
+            raise OSError(err, os.strerror(err))
+        self.written_bytes += count
+        return count
+
+
+class CaptureSink(Sink):
+    """Raw capture file, rotated to path.1 ... path.N once it reaches max_bytes"""
+
+    def __init__(self, name, path, policy=DROP_OLDEST, max_bytes=CAPTURE_MAX_BYTES,
+                 backups=CAPTURE_BACKUPS, max_queue=SINK_QUEUE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file_bytes = 0
+        # Each run starts a fresh file; the previous capture becomes path.1
+        if os.path.exists(path) and os.path.getsize(path):
+            self._shift()
+        super().__init__(name, self._open(), policy, max_queue)
+
+    def _open(self):
+        # No O_APPEND: splice(2) refuses append-mode files
+        return os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+    def _shift(self):
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write(self, data):
+        written = super()._write(data)
+        self._account(written)
+        return written
+
+    def splice_from(self, stage_fd, length):
+        """Move length staged bytes into the file (consumes the staging pipe)"""
+        total = 0
+        while total < length:
+            total += os.splice(stage_fd, self.fd, length - total)
+        self.written_bytes += total
+        self._account(total)
+        return total
+
+    def _account(self, written):
+        self.file_bytes += written
+        if self.file_bytes >= self.max_bytes and not self.closed:
+            os.close(self.fd)
+            self._shift()
+            self.fd = self._open()
+            self.file_bytes = 0
+
+
+class SocketServer:
+    """Listening Unix socket for diagnostics clients (read-only taps)"""
+
+    def __init__(self, path, policy=DISCONNECT, max_queue=SINK_QUEUE_BYTES):
+        self.path = path
+        self.policy = policy
+        self.max_queue = max_queue
+        self.client_count = 0
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(path)
+        self.sock.listen(4)
+        self.sock.setblocking(False)
+
+    def accept(self):
+        """Return sinks for clients that connected since the last call"""
+        sinks = []
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return sinks
+            self.client_count += 1
+            client.shutdown(socket.SHUT_RD)
+            sinks.append(Sink(f"{os.path.basename(self.path)}#{self.client_count}",
+                              client.detach(), self.policy, self.max_queue))
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+# ============================================================================
+# TEE
+# ============================================================================
+class StreamTee:
+    """Writes every chunk to all sinks; a sink that fails or disconnects is dropped"""
+
+    def __init__(self, use_kernel=True):
+        self.sinks = []
+        self.servers = []
+        self.closed_sinks = 0
+        self.stage = None
+        if use_kernel and _tee is not None:
+            self.stage = os.pipe()
+            self.null_fd = os.open(os.devnull, os.O_WRONLY)
+
+    @property
+    def kernel(self):
+        return self.stage is not None
+
+    def add(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def add_server(self, server):
+        self.servers.append(server)
+        return server
+
+    def remove(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+        sink.close()
+
+    def write(self, data):
+        """Fan one chunk out to every sink"""
+        for server in self.servers:
+            for sink in server.accept():
+                self.add(sink)
+        if not data:
+            return
+
+        view = memoryview(data)
+        for start in range(0, len(view), STAGE_CHUNK):
+            chunk = view[start:start + STAGE_CHUNK]
+            if self.stage is not None:
+                self._write_kernel(chunk)
+            else:
+                for sink in self.sinks:
+                    self._deliver(sink, sink.send, chunk)
+
+        open_sinks = [sink for sink in self.sinks if not sink.closed]
+        self.closed_sinks += len(self.sinks) - len(open_sinks)
+        self.sinks = open_sinks
+
+    def _write_kernel(self, chunk):
+        stage_r, stage_w = self.stage
+        length = len(chunk)
+        os.write(stage_w, chunk)
+
+        consumer = None
+        for sink in self.sinks:
+            if sink.is_pipe and not sink.queue:
+                copied = self._deliver(sink, sink.tee_from, stage_r, length)
+                if copied is not None and copied < length:
+                    self._deliver(sink, sink.send, chunk, copied)
+            elif consumer is None and isinstance(sink, CaptureSink) and not sink.queue:
+                consumer = sink
+            else:
+                self._deliver(sink, sink.send, chunk)
+
+        # Empty the staging pipe: into the capture file, or into /dev/null
+        if consumer is not None and self._deliver(consumer, consumer.splice_from, stage_r, length) is not None:
+            return
+        while True:
+            try:
+                if not os.splice(stage_r, self.null_fd, STAGE_CHUNK, flags=SPLICE_F_NONBLOCK):
+                    return
+            except BlockingIOError:
+                return
+
+    def _deliver(self, sink, method, *args):
+        if sink.closed:
+            return None
+        try:
+            return method(*args)
+        except OSError:
+            sink.close()
+            return None
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        for server in self.servers:
+            server.close()
+        self.servers = []
+        if self.stage is not None:
+            for fd in (*self.stage, self.null_fd):
+                os.close(fd)
+            self.stage = None
+
+    def stats(self):
+        """One line per sink: bytes written / queued / dropped"""
+        return [f"{sink.name}: {sink.written_bytes} written, {sink.queued_bytes} queued, "
+                f"{sink.dropped_bytes} dropped ({sink.policy})" for sink in self.sinks]
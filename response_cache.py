@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Pre-serialized Response Cache
+Keeps the encoded JSON body (and, once asked for, its gzip version) of
+polled GET endpoints until the scoring thread changes something, so a poll
+that finds nothing new costs a dict lookup instead of copying the game
+state and running the JSON encoder. Bodies carry a strong ETag (a hash of
+the bytes); a client sending it back in If-None-Match gets 304 and no body.
+
+invalidate() is called by the scoring path whenever a batch publishes a new
+state version, and by the few commands that change other served data
+(match storage, Pico mapping); read-only commands leave the cache alone.
+An entry built from an older generation is rebuilt on its next request.
+Entries for data that also changes outside scoring (Pico counters, clock)
+get a max_age in seconds on top.
+
+Usage:
+    cache = ResponseCache(encode=json_codec.dumps_bytes)
+    status, body, headers = cache.lookup("gamestate", build, if_none_match_header, accept_encoding)
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+GZIP_MIN_BYTES = 512        # Smaller bodies are sent as they are
+GZIP_LEVEL = 6
+
+
+def _matches(etag, if_none_match):
+    """If-None-Match header lists etag (weak comparison, as RFC 9110 asks for this header)"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CachedBody:
+    """One encoded response"""
+
+    __slots__ = ("generation", "built", "status", "body", "gzipped", "etag")
+
+    def __init__(self, generation, status, body):
+        self.generation = generation
+        self.built = time.monotonic()
+        self.status = status
+        self.body = body
+        self.gzipped = None
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class ResponseCache:
+    """Encoded JSON bodies of GET endpoints, by name"""
+
+    def __init__(self, encode):
+        self.encode = encode        # object -> bytes (or str, sent as UTF-8)
+        self.generation = 0
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def invalidate(self):
+        """Scoring thread: what is served changed, everything cached so far is stale"""
+        self.generation += 1
+
+    def lookup(self, name, build, if_none_match="", accept_encoding="", max_age=None):
+        """(status, body bytes, headers) for name; build() -> (data, status) on a miss"""
+        entry = self.entries.get(name)
+        if (entry is None or entry.generation != self.generation
+                or (max_age is not None and time.monotonic() - entry.built > max_age)):
+            generation = self.generation        # Read first: a change during build() is not missed
+            data, status = build()
+            body = self.encode(data)
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            entry = CachedBody(generation, status, body)
+            self.entries[name] = entry
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if if_none_match and _matches(entry.etag, if_none_match):
+            self.not_modified += 1
+            return 304, b"", headers
+
+        body = entry.body
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in accept_encoding:
+            if entry.gzipped is None:
+                with self.lock:
+                    if entry.gzipped is None:
+                        entry.gzipped = gzip.compress(body, GZIP_LEVEL, mtime=0)
+            body = entry.gzipped
+            headers["Content-Encoding"] = "gzip"
+        headers["Content-Type"] = "application/json"
+        return entry.status, body, headers
+
+    def stats(self):
+        return {
+            "generation": self.generation,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified
+        }
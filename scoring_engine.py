@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Padel Scoring Engine
+The scoring rules on their own: no Flask, no Socket.IO, no globals, no
+printing. A MatchState holds the score; applying a point changes it and
+returns the domain events that happened (point, game, set, tie-break, side
+switch, match won). The backends turn those events into history entries,
+broadcasts and sounds, and map the state onto their own JSON keys.
+
+Two ways to use it:
+    events = apply_point(state, BLACK)          # in place, fastest
+    state, events = add_point(state, BLACK)     # pure: new state, old one untouched
+
+Events are (kind, team, detail) tuples; team is BLACK (0), YELLOW (1) or
+None. Rules cover the differences between the backends: advantage or golden
+point, and tie-breaks at 6-6 (a super tie-break when the sets are level at
+the deciding set) or sets played out until someone leads by two games.
+"""
+
+import collections
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+BLACK = 0
+YELLOW = 1
+TEAMS = ("black", "yellow")
+
+# Set phases (MatchState.mode)
+NORMAL = "normal"
+TIEBREAK = "tiebreak"
+SUPERTIEBREAK = "supertiebreak"
+
+NORMAL_SCORES = (0, 15, 30, 40)
+
+# Event kinds
+EVENT_POINT = "point"
+EVENT_POINT_SUBTRACT = "point_subtract"
+EVENT_GAME = "game"
+EVENT_SET = "set"                   # detail: SetResult
+EVENT_TIEBREAK = "tiebreak"         # detail: TIEBREAK or SUPERTIEBREAK
+EVENT_SIDE_SWITCH = "sideswitch"    # detail: games played in the set
+EVENT_MATCH_WON = "matchwon"
+
+SetResult = collections.namedtuple("SetResult", [
+    "label",            # As in sethistory: "6-4", "7-6(5)", "10-8(STB)"
+    "games",            # Games when the set ended
+    "scores",           # Scores when the set ended (tie-break points)
+    "sets_before",
+    "sets"
+])
+
+NO_EVENTS = ()
+POINT_EVENTS = (((EVENT_POINT, BLACK, None),), ((EVENT_POINT, YELLOW, None),))
+SUBTRACT_EVENTS = (((EVENT_POINT_SUBTRACT, BLACK, None),), ((EVENT_POINT_SUBTRACT, YELLOW, None),))
+
+# Keys of MatchState.as_dict(); a backend passes {name: its key} to rename
+FIELDS = ("point1", "point2", "score1", "score2", "game1", "game2", "set1", "set2", "mode",
+          "matchwon", "sethistory", "gamemode", "initial_switch_done", "shouldswitchsides",
+          "totalgamesinset")
+
+
+def team_index(team):
+    """BLACK for "black", YELLOW for "yellow"; ValueError for anything else"""
+    if team == "black":
+        return BLACK
+    if team == "yellow":
+        return YELLOW
+    raise ValueError(f"Unknown team: {team!r} (must be black or yellow)")
+
+
+# ============================================================================
+# RULES AND STATE
+# ============================================================================
+class Rules:
+    """Scoring variant"""
+
+    __slots__ = ("golden_point", "tiebreaks", "games_per_set", "sets_to_win",
+                 "tiebreak_points", "supertiebreak_points")
+
+    def __init__(self, golden_point=False, tiebreaks=True, games_per_set=6, sets_to_win=2,
+                 tiebreak_points=7, supertiebreak_points=10):
+        self.golden_point = golden_point            # 40-40: next point wins the game
+        self.tiebreaks = tiebreaks                  # False: a set needs a two-game lead
+        self.games_per_set = games_per_set
+        self.sets_to_win = sets_to_win
+        self.tiebreak_points = tiebreak_points
+        self.supertiebreak_points = supertiebreak_points
+
+
+DEFAULT_RULES = Rules()
+
+
+class MatchState:
+    """Score of one match. Scores are derived from points, so they never disagree."""
+
+    __slots__ = ("point1", "point2", "game1", "game2", "set1", "set2", "mode", "winner",
+                 "sethistory", "gamemode", "initial_switch_done", "shouldswitchsides",
+                 "totalgamesinset")
+
+    def __init__(self, gamemode=None):
+        self.point1 = 0
+        self.point2 = 0
+        self.game1 = 0
+        self.game2 = 0
+        self.set1 = 0
+        self.set2 = 0
+        self.mode = NORMAL
+        self.winner = None              # BLACK / YELLOW once the match is won
+        self.sethistory = ()
+        self.gamemode = gamemode        # Side switch rule: "basic", "competition", "lock" or None
+        self.initial_switch_done = False
+        self.shouldswitchsides = False
+        self.totalgamesinset = 0
+
+    def copy(self):
+        state = MatchState.__new__(MatchState)
+        state.point1 = self.point1
+        state.point2 = self.point2
+        state.game1 = self.game1
+        state.game2 = self.game2
+        state.set1 = self.set1
+        state.set2 = self.set2
+        state.mode = self.mode
+        state.winner = self.winner
+        state.sethistory = self.sethistory
+        state.gamemode = self.gamemode
+        state.initial_switch_done = self.initial_switch_done
+        state.shouldswitchsides = self.shouldswitchsides
+        state.totalgamesinset = self.totalgamesinset
+        return state
+
+    @property
+    def score1(self):
+        return NORMAL_SCORES[min(self.point1, 3)] if self.mode == NORMAL else self.point1
+
+    @property
+    def score2(self):
+        return NORMAL_SCORES[min(self.point2, 3)] if self.mode == NORMAL else self.point2
+
+    @property
+    def matchwon(self):
+        return self.winner is not None
+
+    def as_dict(self, keys=None):
+        """FIELDS as a dict, or only those in keys ({field: key}) under the backend's names"""
+        values = {
+            "point1": self.point1, "point2": self.point2,
+            "score1": self.score1, "score2": self.score2,
+            "game1": self.game1, "game2": self.game2,
+            "set1": self.set1, "set2": self.set2,
+            "mode": self.mode,
+            "matchwon": self.winner is not None,
+            "sethistory": list(self.sethistory),
+            "gamemode": self.gamemode,
+            "initial_switch_done": self.initial_switch_done,
+            "shouldswitchsides": self.shouldswitchsides,
+            "totalgamesinset": self.totalgamesinset
+        }
+        if keys is None:
+            return values
+        return {key: values[field] for field, key in keys.items()}
+
+
+# ============================================================================
+# TRANSITIONS (in place)
+# ============================================================================
+def apply_point(state, team, rules=DEFAULT_RULES):
+    """Point for team; returns the events. No-op once the match is won."""
+    if state.winner is not None:
+        return NO_EVENTS
+    if team:
+        state.point2 = won = state.point2 + 1
+        lost = state.point1
+    else:
+        state.point1 = won = state.point1 + 1
+        lost = state.point2
+
+    mode = state.mode
+    if mode == NORMAL:
+        if won >= 4 and (won - lost >= 2 or rules.golden_point):
+            return _win_game(state, team, rules)
+    elif won - lost >= 2 and won >= (rules.tiebreak_points if mode == TIEBREAK else rules.supertiebreak_points):
+        return _win_tiebreak(state, team, rules)
+    return POINT_EVENTS[team]
+
+
+def apply_subtract(state, team):
+    """Take back one raw point of the current game (never a game or set)"""
+    if state.winner is not None:
+        return NO_EVENTS
+    if team:
+        state.point2 = max(0, state.point2 - 1)
+    else:
+        state.point1 = max(0, state.point1 - 1)
+    return SUBTRACT_EVENTS[team]
+
+
+def apply_basic_side_switch(state, rules=DEFAULT_RULES):
+    """Basic mode: switch sides once at the start of every set after the first"""
+    events = []
+    _basic_side_switch(state, rules, events)
+    return events
+
+
+def _win_game(state, team, rules):
+    events = [(EVENT_GAME, team, None)]
+    if team:
+        state.game2 += 1
+    else:
+        state.game1 += 1
+    state.point1 = state.point2 = 0
+
+    g1 = state.game1
+    g2 = state.game2
+    won, lost = (g2, g1) if team else (g1, g2)
+    if won >= rules.games_per_set and won - lost >= 2:
+        _win_set(state, team, f"{g1}-{g2}", (g1, g2), (0, 0), rules, events)
+    elif rules.tiebreaks and g1 == g2 == rules.games_per_set:
+        deciding = state.set1 == state.set2 == rules.sets_to_win - 1
+        state.mode = SUPERTIEBREAK if deciding else TIEBREAK
+        events.append((EVENT_TIEBREAK, None, state.mode))
+
+    if state.winner is None and state.mode == NORMAL:
+        _competition_side_switch(state, events)
+    return events
+
+
+def _win_tiebreak(state, team, rules):
+    events = []
+    p1 = state.point1
+    p2 = state.point2
+    if state.mode == TIEBREAK:
+        games = rules.games_per_set
+        label = f"{games + 1}-{games}({p2})" if team == BLACK else f"{games}-{games + 1}({p1})"
+        _win_set(state, team, label, (state.game1, state.game2), (p1, p2), rules, events,
+                 phase_over=True)
+    else:
+        # The deciding set: games stay as they were when the super tie-break started
+        _win_set(state, team, f"{p1}-{p2}(STB)", (state.game1, state.game2), (p1, p2), rules, events,
+                 phase_over=True, reset_games=False)
+    return events
+
+
+def _win_set(state, team, label, games, scores, rules, events, phase_over=False, reset_games=True):
+    sets_before = (state.set1, state.set2)
+    if team:
+        state.set2 += 1
+    else:
+        state.set1 += 1
+    state.sethistory += (label,)
+    events.append((EVENT_SET, team, SetResult(label, games, scores, sets_before, (state.set1, state.set2))))
+
+    if reset_games:
+        state.game1 = state.game2 = 0
+        state.totalgamesinset = 0
+        state.shouldswitchsides = False
+    state.initial_switch_done = False
+    if phase_over:
+        state.point1 = state.point2 = 0
+        state.mode = NORMAL
+
+    if (state.set2 if team else state.set1) >= rules.sets_to_win:
+        state.winner = team
+        events.append((EVENT_MATCH_WON, team, None))
+    elif reset_games:
+        _basic_side_switch(state, rules, events)
+
+
+def _basic_side_switch(state, rules, events):
+    if state.winner is not None or state.gamemode != "basic":
+        return
+    total_games = state.game1 + state.game2
+    total_sets = state.set1 + state.set2
+    if (total_games == 0 and 0 < total_sets <= 2 * (rules.sets_to_win - 1)
+            and not state.initial_switch_done):
+        state.initial_switch_done = True
+        state.shouldswitchsides = True
+        state.totalgamesinset = 0
+        events.append((EVENT_SIDE_SWITCH, None, 0))
+
+
+def _competition_side_switch(state, events):
+    """Competition / lock: switch after every odd game of the set"""
+    if state.gamemode is None or state.gamemode == "basic":
+        return
+    total_games = state.game1 + state.game2
+    if total_games % 2:
+        state.shouldswitchsides = True
+        state.totalgamesinset = total_games
+        events.append((EVENT_SIDE_SWITCH, None, total_games))
+    else:
+        state.shouldswitchsides = False
+
+
+# ============================================================================
+# TRANSITIONS (pure)
+# ============================================================================
+def add_point(state, team, rules=DEFAULT_RULES):
+    """(new state, events); state itself is not modified"""
+    state = state.copy()
+    return state, apply_point(state, team, rules)
+
+
+def subtract_point(state, team):
+    state = state.copy()
+    return state, apply_subtract(state, team)
+
+
+def basic_side_switch(state, rules=DEFAULT_RULES):
+    state = state.copy()
+    return state, apply_basic_side_switch(state, rules)
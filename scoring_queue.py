@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Scoring Command Queue
+Every change to the game state goes through one actor thread: HTTP handlers,
+Socket.IO handlers and the Pico reader threads submit commands to a queue,
+the actor applies them one at a time in arrival order, and callers get a
+Future for the result. Nothing else writes the game state, so a sensor point
+and a button press can no longer interleave half-way through scoring.
+
+The actor takes whatever is queued (up to max_batch commands) as one batch.
+After applying a batch it calls on_batch(version, changed, commands) before
+resolving the batch's futures, so the backend can publish the new state and
+broadcast it once per batch, and a caller that got its result never reads an
+older published state afterwards.
+
+version counts applied commands: the state published with version N is the
+result of the first N commands.
+
+call() waits with wait(future, timeout) when one is given - server_mode.py
+passes one that parks a green thread instead of the event loop's OS thread.
+
+Usage:
+    scoring = ScoringQueue(on_batch=publish)
+
+    @scoring.command("addpoint")
+    def process_add_point(team): ...
+
+    scoring.call("addpoint", "black")       # wait for the result (HTTP)
+    scoring.submit("addpoint", "black")     # fire and forget (sensors)
+"""
+
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+MAX_BATCH = 64              # Commands applied before state is published
+COMMAND_TIMEOUT = 5.0       # Seconds call() waits for its result
+
+Command = collections.namedtuple("Command", ["name", "args", "future", "submitted"])
+
+
+class ScoringQueue:
+    """Single-writer actor for scoring commands"""
+
+    def __init__(self, on_batch=None, max_batch=MAX_BATCH, wait=None):
+        self.on_batch = on_batch
+        self.wait = wait
+        self.max_batch = max_batch
+        self.handlers = {}
+        self.queue = queue.SimpleQueue()
+        self.version = 0
+        self.changed = False
+        self.running = False
+        self.thread_id = None
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.failures = 0
+
+    def command(self, name):
+        """Decorator registering a handler; handlers run on the actor thread only"""
+        def register(handler):
+            self.handlers[name] = handler
+            return handler
+        return register
+
+    def in_actor(self):
+        return threading.get_ident() == self.thread_id
+
+    def submit(self, name, *args):
+        """Queue a command; returns a Future for the handler's return value"""
+        if name not in self.handlers:
+            raise KeyError(f"Unknown scoring command: {name}")
+        future = Future()
+        if self.in_actor():
+            # A handler issuing a command: run it now rather than deadlock on itself
+            self.version += 1
+            future.set_result(self.handlers[name](*args))
+            return future
+        self.queue.put(Command(name, args, future, time.perf_counter()))
+        return future
+
+    def call(self, name, *args, timeout=COMMAND_TIMEOUT):
+        """Submit and wait for the result (re-raises the handler's exception)"""
+        future = self.submit(name, *args)
+        if self.wait is not None:
+            return self.wait(future, timeout)
+        return future.result(timeout)
+
+    def mark_changed(self):
+        """Called by handlers: the state changed and should be broadcast after this batch"""
+        self.changed = True
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "batches": self.batches,
+            "max_batch": self.max_batch_seen,
+            "queued": self.queue.qsize(),
+            "failures": self.failures,
+            "running": self.running
+        }
+
+    def run(self):
+        """Actor loop (background thread)"""
+        self.thread_id = threading.get_ident()
+        self.running = True
+        while self.running:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.apply(batch)
+
+    def stop(self):
+        self.running = False
+        self.queue.put(None)        # Wake the actor
+
+    def apply(self, batch):
+        """Apply one batch of commands in order (actor thread)"""
+        applied = []
+        outcomes = []
+        for command in batch:
+            if command is None or not command.future.set_running_or_notify_cancel():
+                continue
+            self.version += 1
+            try:
+                outcomes.append((True, self.handlers[command.name](*command.args)))
+            except Exception as e:
+                self.failures += 1
+                print(f"✗ Scoring command {command.name}{command.args} failed: {e}")
+                outcomes.append((False, e))
+            applied.append(command)
+
+        if applied:
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(applied))
+            if self.on_batch is not None:
+                try:
+                    self.on_batch(self.version, self.changed, applied)
+                except Exception as e:
+                    print(f"✗ Scoring batch callback failed: {e}")
+            self.changed = False
+
+        for command, (ok, outcome) in zip(applied, outcomes):
+            if ok:
+                command.future.set_result(outcome)
+            else:
+                command.future.set_exception(outcome)
@@ -10,11 +10,12 @@ VL53L5CX Dual Sensors Detection - FIXED Duration-Based Action System
   * 10.5-15.0s: Send reset_match with detection_time
 - LED turns green after 0.2s and stays on until detection ends
 - FIXED: Proper state management, no more detection spam
+- RESOLUTION selects 4x4 or 8x8 ranging; filters run on all zones at once (NumPy)
 """
 
 import time
-import collections
-import statistics
+import warnings
+import numpy as np
 import requests
 import RPi.GPIO as GPIO
 import sys
@@ -74,6 +75,12 @@ def cleanup_leds():
 
 atexit.register(cleanup_leds)
 
+# Sensor resolution: 4*4 (16 zones) or 8*8 (64 zones)
+RESOLUTION = 4*4
+ZONES = RESOLUTION
+GRID_SIDE = int(ZONES ** 0.5)
+BLOCK = GRID_SIDE // 4          # 8x8 zones per 4x4 zone side
+
 # Calibration settings
 CALIBRATION_SAMPLES = 60
 MEDIAN_WINDOW = 3
@@ -81,11 +88,21 @@ MOVING_AVG_WINDOW = 1
 OUTLIER_THRESHOLD = 100
 MAX_VALID_CALIBRATION = 50
 MIN_VALID_CALIBRATION = 3
+MIN_VALID_ZONES = ZONES * 13 // 16  # Valid zones needed for a calibration sample
 
 # Detection settings
 DETECTION_THRESHOLD = 8
-MIN_ZONES_FOR_DETECTION = 3
-GOOD_ZONES = [0, 5, 6, 9, 10, 11, 12, 13]
+MIN_ZONES_FOR_DETECTION = 3     # Counted in 4x4 zones at either resolution
+GOOD_ZONES = [0, 5, 6, 9, 10, 11, 12, 13]   # 4x4 zones; at 8x8 the 2x2 blocks they cover
+
+def zone_mask(good_zones):
+    """Boolean mask over all ZONES for 4x4 zone indices"""
+    mask = np.zeros((4, BLOCK, 4, BLOCK), dtype=bool)
+    for zone in good_zones:
+        mask[zone // 4, :, zone % 4, :] = True
+    return mask.reshape(ZONES)
+
+GOOD_ZONE_MASK = zone_mask(GOOD_ZONES)
 
 # Auto-reset settings
 AUTO_RESET_THRESHOLD = 80
@@ -173,22 +190,33 @@ def determine_action(detection_duration):
     else:
         return None  # No valid action
 
-def median_filter(window, value):
-    """Apply median filter to reduce noise"""
-    window.append(value)
-    if len(window) < 2:
-        return value
-    return statistics.median(window)
+def new_window(size):
+    """Filter window for all zones: size rows of the latest values, NaN = empty"""
+    return np.full((size, ZONES), np.nan)
+
+def push(window, values):
+    """Shift the window by one row and append the values"""
+    window[:-1] = window[1:]
+    window[-1] = values
+
+def median_filter(window, values):
+    """Apply median filter to reduce noise (per zone, over the values it holds)"""
+    push(window, values)
+    return np.nanmedian(window, axis=0)
 
-def moving_average(window, value):
+def moving_average(window, values):
     """Apply moving average for smoothing"""
-    window.append(value)
-    return sum(window) / len(window)
+    push(window, values)
+    return np.nanmean(window, axis=0)
+
+def read_zones(data):
+    """Distances of all zones as a float array"""
+    return np.array(data.distance_mm[0][:ZONES], dtype=float)
 
 def calibrate_baseline(sensor, name):
     """Calibrate baseline with spike filtering"""
     print(f"📊 Calibrating {name} (target: {CALIBRATION_SAMPLES} valid samples)...")
-    samples = {i: [] for i in range(16)}
+    samples = np.full((CALIBRATION_SAMPLES, ZONES), np.nan)
     collected = 0
     rejected = 0
     total_attempts = 0
@@ -196,25 +224,11 @@ def calibrate_baseline(sensor, name):
     while collected < CALIBRATION_SAMPLES:
         total_attempts += 1
         if sensor.data_ready():
-            data = sensor.get_data()
-            valid_sample = True
-            zone_readings = []
-            
-            for i in range(16):
-                try:
-                    val = int(data.distance_mm[0][i])
-                except:
-                    val = 0
-                
-                if MIN_VALID_CALIBRATION < val < MAX_VALID_CALIBRATION:
-                    zone_readings.append((i, val))
-                elif val >= MAX_VALID_CALIBRATION:
-                    valid_sample = False
-                    break
+            values = read_zones(sensor.get_data())
+            valid = (values > MIN_VALID_CALIBRATION) & (values < MAX_VALID_CALIBRATION)
             
-            if valid_sample and len(zone_readings) > 12:
-                for zone_idx, val in zone_readings:
-                    samples[zone_idx].append(val)
+            if not (values >= MAX_VALID_CALIBRATION).any() and valid.sum() >= MIN_VALID_ZONES:
+                samples[collected] = np.where(valid, values, np.nan)
                 collected += 1
                 
                 if collected % 10 == 0:
@@ -223,51 +237,39 @@ def calibrate_baseline(sensor, name):
                 rejected += 1
         time.sleep(0.02)
     
-    baseline = {}
-    for i in range(16):
-        if samples[i]:
-            baseline[i] = statistics.median(samples[i])
-        else:
-            baseline[i] = 0
-            print(f"  ⚠️ {name} zone {i}: No valid samples, defaulting to 0")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)     # All-NaN zones
+        baseline = np.nanmedian(samples, axis=0)
+    for i in np.flatnonzero(np.isnan(baseline)):
+        print(f"  ⚠️ {name} zone {i}: No valid samples, defaulting to 0")
+    baseline = np.nan_to_num(baseline)
     
     print(f"✅ {name} calibration complete!")
     print(f"  Valid: {collected} | Rejected: {rejected} | Total: {total_attempts}")
     return baseline
 
 def process_sensor(sensor, baseline, median_windows, movavg_windows, last_valid):
-    """Process sensor data with filtering and outlier rejection"""
+    """Process sensor data with filtering and outlier rejection (all zones at once)"""
     if not sensor.data_ready():
         return None, None
     
-    data = sensor.get_data()
-    results = []
-    zones_above_thresh = 0
+    corrected = read_zones(sensor.get_data()) - baseline
     
-    for i in range(16):
-        try:
-            raw_dist = int(data.distance_mm[0][i])
-        except:
-            raw_dist = 0
-        
-        corrected = raw_dist - baseline[i]
-        
-        if last_valid[i] is not None:
-            if last_valid[i] > AUTO_RESET_THRESHOLD and corrected < AUTO_RESET_RAW_LIMIT:
-                median_windows[i].clear()
-                movavg_windows[i].clear()
-                last_valid[i] = corrected
-            elif abs(corrected - last_valid[i]) > OUTLIER_THRESHOLD:
-                corrected = last_valid[i]
-        
-        med_val = median_filter(median_windows[i], corrected)
-        smooth_val = moving_average(movavg_windows[i], med_val)
-        smooth_val = max(smooth_val, 0)
-        last_valid[i] = smooth_val
-        results.append(int(round(smooth_val)))
-        
-        if i in GOOD_ZONES and smooth_val > DETECTION_THRESHOLD:
-            zones_above_thresh += 1
+    seen = ~np.isnan(last_valid)
+    reset = seen & (last_valid > AUTO_RESET_THRESHOLD) & (corrected < AUTO_RESET_RAW_LIMIT)
+    outlier = seen & ~reset & (np.abs(corrected - last_valid) > OUTLIER_THRESHOLD)
+    median_windows[:, reset] = np.nan
+    movavg_windows[:, reset] = np.nan
+    corrected = np.where(outlier, last_valid, corrected)
+    
+    med_val = median_filter(median_windows, corrected)
+    smooth_val = np.maximum(moving_average(movavg_windows, med_val), 0)
+    last_valid[:] = smooth_val
+    results = np.rint(smooth_val).astype(int).tolist()
+    
+    # A 4x4 zone sees the object when any of its zones does
+    above = (smooth_val > DETECTION_THRESHOLD) & GOOD_ZONE_MASK
+    zones_above_thresh = above.reshape(4, BLOCK, 4, BLOCK).any(axis=(1, 3)).sum()
     
     detected = zones_above_thresh >= MIN_ZONES_FOR_DETECTION
     return results, detected
@@ -283,8 +285,8 @@ def main():
         sensor1 = VL53L5CX(i2c_addr=SENSOR1_ADDR)
         sensor2 = VL53L5CX(i2c_addr=SENSOR2_ADDR)
         
-        sensor1.set_resolution(4*4)
-        sensor2.set_resolution(4*4)
+        sensor1.set_resolution(RESOLUTION)
+        sensor2.set_resolution(RESOLUTION)
         sensor1.set_ranging_frequency_hz(15)
         sensor2.set_ranging_frequency_hz(15)
         
@@ -305,13 +307,13 @@ def main():
     print("=" * 70)
     
     # Initialize filtering windows
-    median_windows1 = {i: collections.deque(maxlen=MEDIAN_WINDOW) for i in range(16)}
-    movavg_windows1 = {i: collections.deque(maxlen=MOVING_AVG_WINDOW) for i in range(16)}
-    last_valid1 = {i: None for i in range(16)}
+    median_windows1 = new_window(MEDIAN_WINDOW)
+    movavg_windows1 = new_window(MOVING_AVG_WINDOW)
+    last_valid1 = np.full(ZONES, np.nan)
     
-    median_windows2 = {i: collections.deque(maxlen=MEDIAN_WINDOW) for i in range(16)}
-    movavg_windows2 = {i: collections.deque(maxlen=MOVING_AVG_WINDOW) for i in range(16)}
-    last_valid2 = {i: None for i in range(16)}
+    median_windows2 = new_window(MEDIAN_WINDOW)
+    movavg_windows2 = new_window(MOVING_AVG_WINDOW)
+    last_valid2 = np.full(ZONES, np.nan)
     
     # FIXED: Proper state management - global detection tracking
     detection_states = {
@@ -325,6 +327,7 @@ def main():
     }
     
     print("🎯 Starting duration-based detection...")
+    print(f" Resolution: {GRID_SIDE}x{GRID_SIDE} ({ZONES} zones)")
     print(f" Detection threshold: {DETECTION_THRESHOLD}mm")
     print(f" Min zones required: {MIN_ZONES_FOR_DETECTION}")
     print(f" Action windows:")
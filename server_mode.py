@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Socket.IO Server Modes
+How a backend serves HTTP and Socket.IO clients:
+
+  threading  Werkzeug dev server, one OS thread per connected client. Fine
+             for a handful of displays; the default.
+  eventlet   One event loop (green threads) serves every client, through
+  gevent     eventlet.wsgi or gevent's WSGI server. For venues with many
+             TVs and phones following a match.
+
+In the event loop modes only the HTTP and Socket.IO handlers run on the
+loop. The Pico readers, the scoring actor and the sensor stream stay on
+real OS threads (start_thread), so a blocking read or a detection pass
+never stalls the loop. Only the socket module is monkey-patched, and
+threading, select and time are left alone for those threads.
+
+The two sides meet in two places:
+- Emits from the OS threads go through threadsafe(socketio.emit). It queues
+  the call and wakes the loop through a pipe, because the loop's sockets and
+  queues are not thread-safe.
+- Handlers that wait for a scoring result use wait(future). It parks the
+  green thread instead of blocking the loop's OS thread.
+
+select() must run before Flask and Flask-SocketIO are imported.
+
+Usage:
+    SERVER_MODE = os.environ.get("PADEL_SERVER_MODE", "threading")
+    server = server_mode.select(SERVER_MODE)     # before importing flask
+    socketio = SocketIO(app, async_mode=server.name, ...)
+    emit_to_clients = server.threadsafe(socketio.emit)
+    server.start_thread(scoring.run, name="scoring")
+    server.run(socketio, app, "127.0.0.1", 5000)
+"""
+
+import collections
+import os
+import queue
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+MODES = ("threading", "eventlet", "gevent")
+WAKE_BYTE = b"\0"
+
+
+class ServerMode:
+    """Server mode chosen at startup, plus the bridge between OS threads and the event loop"""
+
+    def __init__(self, name):
+        self.name = name
+        self.green = name != "threading"
+        self.loop_thread = None         # ident of the OS thread running the event loop
+        self.calls = collections.deque()
+        self.posted = 0
+        self.run_on_loop = 0
+        self.failures = 0
+        self.wake_read = self.wake_write = None
+        if self.green:
+            self.wake_read, self.wake_write = os.pipe()
+            os.set_blocking(self.wake_read, False)
+            os.set_blocking(self.wake_write, False)
+
+    # ----- OS threads -----
+    def start_thread(self, target, *args, name=None):
+        """Run target on a real OS thread in every mode (never on the event loop)"""
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def on_loop(self):
+        return threading.get_ident() == self.loop_thread
+
+    def call_soon(self, fn, *args, **kwargs):
+        """Run fn on the event loop (any thread); in threading mode, run it now"""
+        if not self.green or self.on_loop():
+            return fn(*args, **kwargs)
+        self.calls.append((fn, args, kwargs))
+        self.posted += 1
+        try:
+            os.write(self.wake_write, WAKE_BYTE)
+        except BlockingIOError:
+            pass                        # Pipe full: the loop has wake-ups pending anyway
+
+    def threadsafe(self, fn):
+        """fn wrapped with call_soon, for emits from OS threads; fn itself in threading mode"""
+        if not self.green:
+            return fn
+
+        def call(*args, **kwargs):
+            self.call_soon(fn, *args, **kwargs)
+        return call
+
+    # ----- Event loop -----
+    def wait(self, future, timeout):
+        """future.result(timeout) that parks only the calling green thread on the loop"""
+        if future.done() or not self.on_loop():
+            return future.result(timeout)
+        done = self._queue()
+        future.add_done_callback(lambda _: self.call_soon(done.put, None))
+        try:
+            done.get(timeout=timeout)
+        except queue.Empty:
+            raise FutureTimeout() from None
+        return future.result(0)
+
+    def lock(self):
+        """Lock for state only the loop's handlers touch (held across emits)"""
+        if self.name == "eventlet":
+            from eventlet.semaphore import Semaphore
+            return Semaphore()
+        if self.name == "gevent":
+            from gevent.lock import Semaphore
+            return Semaphore()
+        return threading.Lock()
+
+    def run(self, socketio, app, host, port):
+        """Serve until interrupted"""
+        if not self.green:
+            socketio.run(app, debug=False, host=host, port=port, allow_unsafe_werkzeug=True)
+            return
+        self.loop_thread = threading.get_ident()
+        socketio.start_background_task(self._drain)
+        socketio.run(app, debug=False, host=host, port=port)
+
+    def stats(self):
+        return {
+            "mode": self.name,
+            "loop_calls": self.posted,
+            "loop_calls_run": self.run_on_loop,
+            "loop_calls_pending": len(self.calls),
+            "loop_call_failures": self.failures
+        }
+
+    def _queue(self):
+        if self.name == "eventlet":
+            from eventlet.queue import LightQueue
+            return LightQueue()
+        from gevent.queue import Queue
+        return Queue()
+
+    def _wait_readable(self, fd):
+        if self.name == "eventlet":
+            from eventlet.hubs import trampoline
+            trampoline(fd, read=True)
+        else:
+            from gevent.socket import wait_read
+            wait_read(fd)
+
+    def _drain(self):
+        """Green thread: run what OS threads posted with call_soon, in order"""
+        while True:
+            self._wait_readable(self.wake_read)
+            try:
+                while os.read(self.wake_read, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+            while self.calls:
+                fn, args, kwargs = self.calls.popleft()
+                self.run_on_loop += 1
+                try:
+                    fn(*args, **kwargs)
+                except Exception as e:
+                    self.failures += 1
+                    print(f"✗ Event loop call {getattr(fn, '__name__', fn)} failed: {e}")
+
+
+def select(name):
+    """ServerMode for name; monkey-patches the socket module for the event loop modes"""
+    if name not in MODES:
+        raise ValueError(f"Unknown server mode {name!r}: must be one of {', '.join(MODES)}")
+    if name == "eventlet":
+        import eventlet
+        eventlet.monkey_patch(all=False, socket=True)
+    elif name == "gevent":
+        from gevent import monkey
+        monkey.patch_socket()
+    return ServerMode(name)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Versioned Game State Deltas
+Keeps the last game state sent to clients and, for each new one, works out
+which top-level fields changed. Every change gets the next version number,
+and the broadcast carries only the changed fields plus that version:
+
+    {"version": 42, "changes": {"score1": 30, "lastupdated": "..."}}
+
+A client applies a delta only if its version is exactly one more than the
+version it has; otherwise it missed one and asks for the full state, which
+carries the version it is at ({..., "version": 42}).
+
+Usage:
+    deltas = StateDeltas()
+    delta = deltas.update(game_state)       # None if nothing changed
+    if delta: socketio.emit("gamestatedelta", delta)
+    socketio.emit("gamestateupdate", deltas.snapshot())
+"""
+
+
+def _frozen(value):
+    """Copy of a list/dict field, so later in-place changes still show up as changes"""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class StateDeltas:
+    """Version counter and last-sent copy of one game state dict"""
+
+    def __init__(self, skip=()):
+        self.version = 0
+        self.last = {}
+        self.skip = frozenset(skip)     # Fields never sent (kept server-side)
+        self.deltas = 0
+        self.changed_fields = 0
+
+    def update(self, state):
+        """Delta message for what changed since the last update, or None"""
+        last = self.last
+        changes = {}
+        for key, value in state.items():
+            if key in self.skip:
+                continue
+            if key not in last or last[key] != value:
+                changes[key] = last[key] = _frozen(value)
+        removed = [key for key in last if key not in state]
+        for key in removed:
+            del last[key]
+        if not changes and not removed:
+            return None
+
+        self.version += 1
+        self.deltas += 1
+        self.changed_fields += len(changes)
+        delta = {"version": self.version, "changes": changes}
+        if removed:
+            delta["removed"] = removed
+        return delta
+
+    def snapshot(self):
+        """Full state as last sent, with its version"""
+        return dict(self.last, version=self.version)
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "deltas": self.deltas,
+            "avg_fields": round(self.changed_fields / self.deltas, 1) if self.deltas else 0
+        }
@@ -0,0 +1,40 @@
+"""Undo/redo step parsing shared by the HTTP routes and the Socket.IO handlers"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from match_log import parse_steps
+
+
+@pytest.mark.parametrize("payload, steps", [
+    (None, 1),
+    ({}, 1),
+    ({"steps": 1}, 1),
+    ({"steps": 12}, 12),
+])
+def test_valid_steps(payload, steps):
+    assert parse_steps(payload) == steps
+
+
+@pytest.mark.parametrize("payload", [
+    {"steps": True},
+    {"steps": False},
+    {"steps": 1.9},
+    {"steps": 2.0},
+    {"steps": "2"},
+    {"steps": "two"},
+    {"steps": None},
+    {"steps": 0},
+    {"steps": -3},
+])
+def test_invalid_steps(payload):
+    assert parse_steps(payload) is None
+
+
+@pytest.mark.parametrize("payload", [[1], "abc", 5, True])
+def test_non_object_payload(payload):
+    assert parse_steps(payload) is None
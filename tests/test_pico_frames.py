@@ -0,0 +1,59 @@
+"""Sequence accounting of binary Pico frames: drops, duplicates and reboots"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pico_frames import MAX_SEQUENCE_GAP, FrameCounter, FrameParser, encode_binary_frame
+
+
+def stream(*sequences):
+    return b"".join(encode_binary_frame(seq, 0, [1000] * 16, [5] * 16) for seq in sequences)
+
+
+def counts(data):
+    """(parser, counter) after feeding data to both"""
+    parser = FrameParser(compact=True)
+    counter = FrameCounter()
+    parser.feed(data)
+    counter.feed(data)
+    return parser, counter
+
+
+@pytest.mark.parametrize("which", [0, 1])
+def test_gap_is_dropped_frames(which):
+    tracker = counts(stream(10, 11, 14, 15))[which]
+    assert (tracker.dropped_frames, tracker.duplicate_frames, tracker.sequence_resyncs) == (2, 0, 0)
+
+
+@pytest.mark.parametrize("which", [0, 1])
+def test_wraparound_is_not_a_drop(which):
+    tracker = counts(stream(65534, 65535, 0, 1))[which]
+    assert (tracker.dropped_frames, tracker.sequence_resyncs) == (0, 0)
+
+
+@pytest.mark.parametrize("which", [0, 1])
+def test_reboot_is_a_resync(which):
+    tracker = counts(stream(100, 101, 102, 0, 1, 2))[which]
+    assert (tracker.dropped_frames, tracker.sequence_resyncs) == (0, 1)
+    assert tracker.last_sequence == 2
+
+
+@pytest.mark.parametrize("which", [0, 1])
+def test_duplicate_is_not_a_drop(which):
+    tracker = counts(stream(100, 101, 102, 0, 1, 1))[which]
+    assert (tracker.dropped_frames, tracker.duplicate_frames, tracker.sequence_resyncs) == (0, 1, 1)
+
+
+@pytest.mark.parametrize("which", [0, 1])
+def test_huge_gap_is_a_resync(which):
+    tracker = counts(stream(5, 5 + MAX_SEQUENCE_GAP + 2, 5 + MAX_SEQUENCE_GAP + 3))[which]
+    assert (tracker.dropped_frames, tracker.sequence_resyncs) == (0, 1)
+
+
+def test_frames_still_delivered():
+    parser = FrameParser(compact=True)
+    assert len(parser.feed(stream(7, 7, 0))) == 3
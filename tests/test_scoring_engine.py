@@ -0,0 +1,21 @@
+"""Team names accepted by the scoring engine"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scoring_engine import BLACK, YELLOW, team_index
+
+
+def test_known_teams():
+    assert team_index("black") == BLACK
+    assert team_index("yellow") == YELLOW
+
+
+@pytest.mark.parametrize("team", ["blue", "", "Black", None, 1])
+def test_unknown_team_raises(team):
+    with pytest.raises(ValueError):
+        team_index(team)